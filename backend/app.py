@@ -1,20 +1,48 @@
-from flask import Flask, request, jsonify
-from pymongo import MongoClient
+from flask import Flask, Response, request, jsonify
+from pymongo import MongoClient, UpdateOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson.objectid import ObjectId
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hashing import HashingBusy, PasswordHasher
 
 from flask_cors import CORS
 
-from generate_workout import generate_workout  
+from generate_workout import generate_workout, parse_workout, stream_workout, PROMPT_VERSION as WORKOUT_PROMPT_VERSION
 
-from generate_meal import generate_meal 
+from generate_meal import generate_meal, generate_meals, stream_meal, finalize_meal, basic_fallback_meal
 
 import openai
+import json
+import os
+
+from pagination import paged_response
+from dates import date_range, parse_date, range_query, utcnow
+from lift_sets import exercise_key, exercises_pipeline, replace_log_sets, sessions_pipeline, sets_from_log
+from projections import list_projection
+from db_indexes import ensure_indexes
+from llm_cache import LLMResponseCache
+from llm_client import llm
+from recipe_index import RECIPE_CACHE_ENABLED, RecipeIndex
+from write_behind import WriteBehindQueue
+from local_workout import generate_local_workout
+from reference_cache import ReferenceCache
+from exercise_search import MATCH_MODES
+from ingredient_parser import parse_ingredients
+from sse import sse_event, sse_response
+from stream_json import ArrayItemStream
+from dashboard import build_dashboard, server_timing
+from bson.errors import InvalidId
+import metrics
+import profiling
+import compression
+from json_provider import FastJSONProvider, dumps as json_dumps
 
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# orjson-backed jsonify that also handles ObjectId/datetime - see json_provider.py
+app.json = FastJSONProvider(app)
+
 
 
 
@@ -22,13 +50,87 @@ app = Flask(__name__)
 # Fixed CORS error by allowing credentials & headers, which were blocked in the previous config.
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, supports_credentials=True)
 
+# Route latency / status / size hooks and the /metrics endpoint - see metrics.py
+metrics.init_app(app)
+
+# gzip/brotli for larger responses - after metrics so the size histogram records bytes on the wire
+compression.init_app(app)
+
+# Opt-in cProfile/tracemalloc for single requests (X-Profile header or sampling) - see profiling.py
+profiling.init_app(app)
 
 
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
+
+# Connect to MongoDB - MONGO_URI lets the benchmarks point the app at a throwaway database
+# the command listener times every query, so it's only attached when /metrics is on
+client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"),
+                     event_listeners=[metrics.mongo_listener] if metrics.METRICS_ENABLED else [])
 db = client["fitness_app"]
 
+# Make sure every route has its index (no-op when they already exist) - see db_indexes.py
+try:
+    ensure_indexes(db)
+except Exception as e:
+    print(f"Could not ensure indexes at startup: {e}")
+
+# "ai" (default) or "local" - which generator /api/generate-workout uses when the request doesn't say
+WORKOUT_GENERATOR = os.getenv("WORKOUT_GENERATOR", "ai")
+
+# Cached AI workouts - same goal/level/time combinations are served from here instead of another OpenAI call
+workout_cache = LLMResponseCache(db.llm_cache, namespace="workout", prompt_version=WORKOUT_PROMPT_VERSION)
+
+# History, log and shopping list inserts can be batched in the background (WRITE_BEHIND_ENABLED) - see write_behind.py
+write_queue = WriteBehindQueue(db)
+
+# Views that read what those inserts wrote - pending writes to these collections are flushed before they run
+READ_AFTER_WRITE = {
+    "get_dashboard": ("workout_history",),
+    "get_workout_history": ("workout_history",),
+    "get_workout_history_entry": ("workout_history",),
+    "get_workout_logs": ("workout_logs",),
+    "get_workout_log": ("workout_logs",),
+    "update_workout_log": ("workout_logs", "workout_sets"),
+    "get_workout_insights": ("workout_logs",),
+    "get_analytics": ("workout_logs",),
+    "get_exercise_list": ("workout_sets",),
+    "get_exercise_sets": ("workout_sets",),
+    "get_meal_history": ("meal_history",),
+    "get_meal_history_entry": ("meal_history",),
+    "get_shopping_list": ("shopping_list",),
+    "update_shopping_item": ("shopping_list",),
+    "delete_shopping_item": ("shopping_list",),
+    "bulk_update_shopping_list": ("shopping_list",),
+}
+write_queue.init_app(app, READ_AFTER_WRITE)
+
+
+def write_sync():
+    """Clients that need the document written before the response (not just readable through this API) send X-Write-Sync: 1"""
+    return request.headers.get("X-Write-Sync") == "1"
+
+# Meals close enough to one already in meal_history / saved_recipes are served from there - see recipe_index.py
+recipe_index = RecipeIndex(db)
+if RECIPE_CACHE_ENABLED:
+    try:
+        recipe_index.load()
+    except Exception as e:
+        print(f"Could not build the recipe index at startup: {e}")
+
+
+def match_recipe(data, meal_type, preferences, meal_request, calories, exclude=()):
+    """recipe_index match for a meal request, None when the cache is off or the client asked for a fresh meal"""
+    if not RECIPE_CACHE_ENABLED or data.get('fresh'):
+        return None
+    try:
+        return recipe_index.match(meal_type, preferences, meal_request, calories, exclude)
+    except Exception as e:
+        print(f"Recipe index lookup failed: {e}")
+        return None
+
+# Password hashing runs in a process pool sized to the cores, see password_hashing.py
+password_hasher = PasswordHasher()
+
 # Home route to verify the API is running
 @app.route('/')
 def home():
@@ -49,8 +151,16 @@ def signup():
         return jsonify({"error": "Password is required"}), 400
 
     # Use pbkdf2 explicitly to hash the password - a cryptographic algorithm that takes a password and makes it harder for brute-forced attacks
-    data["password"] = generate_password_hash(data["password"], method='pbkdf2:sha256', salt_length=8)
-    result = db.users.insert_one(data)
+    # hashed in the process pool (password_hashing.py) so it doesn't block other requests
+    try:
+        data["password"] = password_hasher.hash_password(data["password"])
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+    try:
+        result = db.users.insert_one(data)
+    except DuplicateKeyError:
+        # a concurrent signup with the same email got past the check above - the unique index stops it here
+        return jsonify({"error": "Email already exists"}), 400
     return jsonify({"message": "User created", "user_id": str(result.inserted_id)}), 201
 
     # Add dietary preferences with a default empty list if not provided
@@ -72,9 +182,17 @@ def login():
         return jsonify({"error": "Invalid email or password"}), 401
 
     # Check password
-    if not check_password_hash(user["password"], data["password"]):
+    try:
+        matches, new_hash = password_hasher.verify_password(user["password"], data["password"])
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+    if not matches:
         return jsonify({"error": "Invalid email or password"}), 401 #the error message is the same for email and password , for security reasons
 
+    # Stored hash used an older work factor - replace it now that we have the plain password
+    if new_hash:
+        db.users.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+
     return jsonify({"message": "Login successful", "user_id": str(user["_id"])}), 200
 
 # Route to get user details by ID
@@ -82,7 +200,6 @@ def login():
 def get_user(id):
     user = db.users.find_one({"_id": ObjectId(id)}, {"password": 0})  # Exclude password from response
     if user:
-        user["_id"] = str(user["_id"])
         return jsonify(user), 200
     return jsonify({"error": "User not found"}), 404
 
@@ -105,8 +222,6 @@ def update_user(id):
 
 
     
-import random
-
 # List of fitness tips or motivational quotes , currently hardcoded but will change depending on nature of app/theme - future plan is to make it personal
 TIPS_AND_QUOTES = [
     "Habit Builder: Consistency is your most reliable power-up. Track your progress daily!",
@@ -117,27 +232,59 @@ TIPS_AND_QUOTES = [
     "Track Your Wins: Keep a record of your achievements to stay motivated and see how far you've come.",
     "Hydration Habit: Make drinking water a consistent and non-negotiable part of your daily routine."]
 
+# Tips, goal workouts and the exercise library are served from memory - see reference_cache.py
+reference_cache = ReferenceCache(db, TIPS_AND_QUOTES)
+try:
+    reference_cache.load()
+except Exception as e:
+    print(f"Could not preload reference data at startup: {e}")
+
+def cached_json_response(entry):
+    """Response for a pre-serialised (status, body, etag) entry, 304 when the client's If-None-Match matches"""
+    status, body, etag = entry
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
 # Route to fetch a random tip or motivational quote
 @app.route('/api/tip', methods=['GET'])
 def get_tip():
-    tip = random.choice(TIPS_AND_QUOTES)
-    return jsonify({"tip": tip})
+    return cached_json_response(reference_cache.tip())
 
 
 # Route to get workouts by goal
 @app.route('/api/workouts/<goal>', methods=['GET'])
 def get_workouts_by_goal(goal):
-    print(f"Received goal: {goal}")  # Add this for debugging
-    # Find workouts that match the goal
-    workouts = list(db.workouts.find({"goal": goal}, {"_id": 0}))  # Exclude the MongoDB ID
-    if workouts:
-        return jsonify({"workouts": workouts}), 200 #this line caused the front end to display that "no workouts were available"
-        #adding jsonify({"workouts": workouts}) instead of just (workouts) was causing the data to be fetched correctly as debugged in console.log, but it was not recognising the workouts array.
-    else:
-        return jsonify({"error": "No workouts found for this goal"}), 404
+    # Find workouts that match the goal - served from the reference cache in the same {"workouts": [...]} shape the front end expects
+    try:
+        return cached_json_response(reference_cache.workouts_for_goal(goal))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 
 
+# Everything the dashboard shows on load in one round trip - the mongo reads run concurrently (dashboard.py)
+@app.route('/api/dashboard/<user_id>', methods=['GET'])
+def get_dashboard(user_id):
+    try:
+        payload, timings = build_dashboard(db, reference_cache, user_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid user ID"}), 400
+    except Exception as e:
+        print(f"Error building dashboard: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    if payload is None:
+        response = jsonify({"error": "User not found"})
+        response.status_code = 404
+    else:
+        response = jsonify(payload)
+    # per-section times (ms), visible in the browser's network panel
+    response.headers["Server-Timing"] = server_timing(timings)
+    response.headers["Timing-Allow-Origin"] = "http://localhost:3000"
+    return response
+
 
 #open ai integration for ai coaching advice/workouts
 
@@ -150,37 +297,157 @@ def api_generate_workout():
     time_available = data.get('time_available')
     #parameters to be passed to generate_workout
 
-    workout = generate_workout(goal, experience_level, time_available)
+    # "local" skips OpenAI and builds the workout from the exercise library (local_workout.py)
+    mode = data.get('mode', WORKOUT_GENERATOR)
+    source = "local" if mode == "local" else "ai"
 
+    if source == "local":
+        workout = generate_local_workout(goal, experience_level, time_available, reference_cache.workout_index())
+    else:
+        workout = workout_cache.get_or_generate(
+            (goal, experience_level, time_available),
+            lambda: generate_workout(goal, experience_level, time_available)
+        )
+
+    # Fall back to the local generator when the AI one fails, rather than showing an error
     if isinstance(workout, dict) and 'error' in workout:
-        return jsonify({"error": workout["error"]}), 400
+        print(f"AI workout generation failed, using local generator: {workout['error']}")
+        workout = generate_local_workout(goal, experience_level, time_available, reference_cache.workout_index())
+        source = "local"
 
     # save the workout to workout_history collection
     workout_entry = {
         "user_id": user_id,
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "date": utcnow(),
         "workout_details": workout,
         "goal": goal,
         "experience_level": experience_level,
-        "time_available": time_available
+        "time_available": time_available,
+        "source": source
     }
 
     try:
-        db.workout_history.insert_one(workout_entry)
+        write_queue.insert("workout_history", workout_entry, sync=write_sync())
         return jsonify({
             "message": "Workout generated and saved successfully!", 
-            "workout": workout
+            "workout": workout,
+            "source": source
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Streaming version of /api/generate-workout (server-sent events, same JSON body):
+#   start     sent straight away, before the model is called
+#   token     {"text"} each piece of the completion as it arrives
+#   exercise  each exercise as soon as its JSON object is complete
+#   fallback  the AI stream failed - drop what was shown, the local workout follows
+#   done      {"workout", "source", "id"} once it's been saved to workout_history
+@app.route('/api/generate-workout/stream', methods=['POST'])
+def api_generate_workout_stream():
+    data = request.json or {}
+    user_id = data.get('user_id')
+    goal = data.get('goal')
+    experience_level = data.get('experience_level')
+    time_available = data.get('time_available')
+    mode = data.get('mode', WORKOUT_GENERATOR)
+
+    def events():
+        yield sse_event("start", {"goal": goal, "experience_level": experience_level, "time_available": time_available})
+        source = "local" if mode == "local" else "ai"
+        workout = None
+        streamed = False
+
+        if source == "ai":
+            key, workout = workout_cache.lookup((goal, experience_level, time_available))
+            if workout is None:
+                exercises = ArrayItemStream("exercises")
+                chunks = []
+                try:
+                    for text in stream_workout(goal, experience_level, time_available):
+                        chunks.append(text)
+                        yield sse_event("token", {"text": text})
+                        for exercise in exercises.feed(text):
+                            yield sse_event("exercise", exercise)
+                    workout = parse_workout("".join(chunks))
+                    if isinstance(workout, dict):
+                        print(f"Streamed AI workout unusable, using local generator: {workout['error']}")
+                        workout = None
+                    streamed = True
+                except Exception as e:
+                    print(f"Streamed AI workout failed, using local generator: {e}")
+                    workout = None
+                if workout:
+                    workout_cache.store(key, workout)
+                elif chunks:
+                    yield sse_event("fallback", {"reason": "AI generation failed"})
+
+        if not workout:
+            workout = generate_local_workout(goal, experience_level, time_available, reference_cache.workout_index())
+            source = "local"
+            streamed = False
+        if not streamed:
+            # cached or local - the whole workout is already here
+            for exercise in ArrayItemStream("exercises").feed(workout):
+                yield sse_event("exercise", exercise)
+
+        workout_entry = {
+            "user_id": user_id,
+            "date": utcnow(),
+            "workout_details": workout,
+            "goal": goal,
+            "experience_level": experience_level,
+            "time_available": time_available,
+            "source": source
+        }
+        try:
+            inserted_id = write_queue.insert("workout_history", workout_entry, sync=write_sync())
+            yield sse_event("done", {"workout": workout, "source": source, "id": str(inserted_id)})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
+# Hit/miss counters for the AI workout cache
+@app.route('/api/llm-cache/stats', methods=['GET'])
+def get_llm_cache_stats():
+    return jsonify(workout_cache.stats()), 200
+
+# Retry / circuit breaker / coalescing counters for the shared OpenAI client (llm_client.py)
+@app.route('/api/llm-client/stats', methods=['GET'])
+def get_llm_client_stats():
+    return jsonify(llm.stats()), 200
+
+# Hit/miss counters and size of the local recipe index
+@app.route('/api/recipe-index/stats', methods=['GET'])
+def get_recipe_index_stats():
+    return jsonify(recipe_index.stats()), 200
+
+# Queue depth and batch counters of the write-behind queue
+@app.route('/api/write-behind/stats', methods=['GET'])
+def get_write_behind_stats():
+    return jsonify(write_queue.stats()), 200
+
 @app.route('/api/workout-history/<user_id>', methods=['GET'])
 def get_workout_history(user_id):
+    # ?view=summary or ?fields= leaves workout_details in the database - see projections.py
+    # ?from=&to= limits it to a date range - see dates.py
+    try:
+        projection = list_projection("workout_history")
+        query = range_query({"user_id": user_id})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
+        # ?limit=&cursor= for pages, ?stream=ndjson to stream - see pagination.py
+        paged = paged_response(db.workout_history, query, "workout_logs",
+                               projection=projection, include_id=projection is not None)
+        if paged is not None:
+            return paged
+
         # Fetch workout history for the given user
         workout_logs = list(db.workout_history.find(
-            {"user_id": user_id}, 
-            {"_id": 0}
+            query, 
+            projection or {"_id": 0}
         ).sort("date", -1))  # Sort by date descending
         
         return jsonify({"workout_logs": workout_logs}), 200
@@ -188,6 +455,17 @@ def get_workout_history(user_id):
         print(f"Error fetching workout history: {str(e)}")  # Add logging
         return jsonify({"error": str(e)}), 500
 
+# One full workout history entry - what a summary list item opens
+@app.route('/api/workout-history/<user_id>/<entry_id>', methods=['GET'])
+def get_workout_history_entry(user_id, entry_id):
+    try:
+        entry = db.workout_history.find_one({"_id": ObjectId(entry_id), "user_id": user_id})
+        if entry:
+            return jsonify(entry), 200
+        return jsonify({"error": "Workout not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 
 
@@ -220,21 +498,40 @@ from datetime import datetime
 @app.route('/api/workout-logs', methods=['POST'])
 def log_workout():
     data = request.json
-    data['date'] = datetime.now().strftime('%Y-%m-%d')
+    data['date'] = utcnow()  # a full timestamp, so same-day logs keep their order
     
+    sync = write_sync()
     try:
-        result = db.workout_logs.insert_one(data)
-        return jsonify({"message": "Workout logged successfully", "id": str(result.inserted_id)}), 201
+        inserted_id = write_queue.insert("workout_logs", data, sync=sync)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # one document per set for the per-exercise routes - see lift_sets.py
+    try:
+        write_queue.insert_many("workout_sets", sets_from_log(data), sync=sync)
+    except Exception as e:
+        # the log itself is saved; `python lift_sets.py backfill` rebuilds the missing sets
+        print(f"Could not record sets for workout log {inserted_id}: {str(e)}")
+    return jsonify({"message": "Workout logged successfully", "id": str(inserted_id)}), 201
+
 # Route to get user's workout history
 @app.route('/api/workout-logs/<user_id>', methods=['GET'])
 def get_workout_logs(user_id):
     try:
+        projection = list_projection("workout_logs")
+        query = range_query({"user_id": user_id})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        paged = paged_response(db.workout_logs, query, "workout_logs",
+                               projection=projection, include_id=projection is not None)
+        if paged is not None:
+            return paged
+
         logs = list(db.workout_logs.find(
-            {"user_id": user_id},
-            {"_id": 0}  # Exclude MongoDB ID
+            query,
+            projection or {"_id": 0}  # Exclude MongoDB ID unless a summary asked for it
         ).sort("date", -1))  # Sort by date descending
         return jsonify({"workout_logs": logs}), 200
     except Exception as e:
@@ -259,13 +556,62 @@ def get_workout_log(user_id, log_id):
 def update_workout_log(log_id):
     try:
         data = request.json
+        if "date" in data:
+            data["date"] = parse_date(data["date"])
+            if data["date"] is None:
+                return jsonify({"error": "date must be a date (YYYY-MM-DD) or an ISO 8601 time"}), 400
         result = db.workout_logs.update_one(
             {"_id": ObjectId(log_id)},
             {"$set": data}
         )
-        if result.modified_count:
-            return jsonify({"message": "Workout log updated successfully"}), 200
-        return jsonify({"error": "Workout log not found"}), 404
+        if not result.modified_count:
+            return jsonify({"error": "Workout log not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    try:
+        replace_log_sets(db, db.workout_logs.find_one({"_id": ObjectId(log_id)}))
+    except Exception as e:
+        # the log itself is updated; `python lift_sets.py backfill` rebuilds its sets (same as log_workout)
+        print(f"Could not update sets for workout log {log_id}: {str(e)}")
+    return jsonify({"message": "Workout log updated successfully"}), 200
+
+
+
+
+# Per-exercise history from workout_sets (one document per logged set) - see lift_sets.py
+@app.route('/api/workout-sets/<user_id>', methods=['GET'])
+def get_exercise_list(user_id):
+    """Every exercise the user has logged, with set/session counts, heaviest weight and last date"""
+    try:
+        exercises = list(db.workout_sets.aggregate(exercises_pipeline(user_id)))
+        return jsonify({"exercises": exercises}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/workout-sets/<user_id>/<path:exercise>', methods=['GET'])
+def get_exercise_sets(user_id, exercise):
+    """
+    One exercise's sets, newest first. ?from=&to= for a date range, ?limit=&cursor= / ?stream=ndjson like the
+    other history routes, ?view=sessions for one row per session (top weight, best e1RM, volume) instead
+    """
+    try:
+        query = range_query({"user_id": user_id, "exercise": exercise_key(exercise)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if request.args.get("view") == "sessions":
+            sessions = list(db.workout_sets.aggregate(sessions_pipeline(query)))
+            return jsonify({"exercise": exercise_key(exercise), "sessions": sessions}), 200
+
+        projection = {"user_id": 0, "exercise": 0}
+        paged = paged_response(db.workout_sets, query, "sets", projection=projection)
+        if paged is not None:
+            return paged
+
+        sets = list(db.workout_sets.find(query, {**projection, "_id": 0}).sort([("date", -1), ("_id", -1)]))
+        return jsonify({"exercise": exercise_key(exercise), "sets": sets}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -309,7 +655,18 @@ def get_workout_bank(user_id):
     Retrieve all saved exercises for a user from the workout bank.
     """
     try:
-        exercises = list(db.workout_bank.find({"user_id": user_id}, {"_id": 0}))  # Exclude MongoDB ID
+        projection = list_projection("workout_bank", date_field=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # workout bank entries have no date, so pages are keyed on _id alone
+        paged = paged_response(db.workout_bank, {"user_id": user_id}, "exercises", date_field=None,
+                               projection=projection, include_id=projection is not None)
+        if paged is not None:
+            return paged
+
+        exercises = list(db.workout_bank.find({"user_id": user_id}, projection or {"_id": 0}))  # Exclude MongoDB ID
         if not exercises:
             return jsonify({"message": "No exercises saved in the workout bank."}), 404
         return jsonify({"exercises": exercises}), 200
@@ -364,7 +721,12 @@ def save_workout_plan():
 @app.route('/api/workout-plans/<user_id>', methods=['GET'])
 def get_workout_plans(user_id):
     try:
-        plans = list(db.workout_plans.find({"user_id": user_id}, {"_id": 0}))
+        projection = list_projection("workout_plans", date_field=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        plans = list(db.workout_plans.find({"user_id": user_id}, projection or {"_id": 0}))
         return jsonify({"plans": plans}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -424,15 +786,43 @@ def delete_workout_plan():
 def get_exercise_library():
     category = request.args.get('category', None)
     try:
-        # Apply category filter if provided
-        filter_query = {"category": category} if category else {}
-        exercises = list(db.exercise_library.find(filter_query, {"_id": 0}))
-        return jsonify({"exercises": exercises}), 200
+        # Apply category filter if provided - each category's response is pre-serialised in the reference cache
+        return cached_json_response(reference_cache.exercise_library(category))
     except Exception as e:
         print(f"Error fetching exercise library: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+# Search the exercise library - ?q= (name/instruction prefix), ?muscles=Chest,Triceps&match=any|all, ?difficulty=, ?category=
+# answered from the in-memory index in exercise_search.py, paginated with ?limit=&offset=
+@app.route('/api/exercise-library/search', methods=['GET'])
+def search_exercise_library():
+    muscles = [m.strip() for m in request.args.get('muscles', '').split(',') if m.strip()]
+    match = request.args.get('match', 'any')
+    if match not in MATCH_MODES:
+        return jsonify({"error": "match must be 'any' or 'all'"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    try:
+        total, exercises = reference_cache.exercise_search().search(
+            text=request.args.get('q'),
+            muscles=muscles,
+            match=match,
+            category=request.args.get('category'),
+            difficulty=request.args.get('difficulty'),
+            limit=limit,
+            offset=offset
+        )
+        return jsonify({"exercises": exercises, "total": total, "limit": limit, "offset": offset}), 200
+    except Exception as e:
+        print(f"Error searching exercise library: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 #Nutrition Section: 
 @app.route('/api/generate-meal', methods=['POST'])
 def api_generate_meal():
@@ -447,7 +837,13 @@ def api_generate_meal():
     preferences = user.get("dietary_preferences", []) if user else []
     
 
-    meal = generate_meal(meal_type, preferences, meal_request, calories) 
+    match = match_recipe(data, meal_type, preferences, meal_request, calories)
+    if match:
+        meal = recipe_index.serve(match, meal_type, preferences, calories)
+        source = "recipe_cache"
+    else:
+        meal = generate_meal(meal_type, preferences, meal_request, calories)
+        source = "ai"
 
      # Debugging statements for now
     print(f"Meal request: {meal_request}")
@@ -460,28 +856,197 @@ def api_generate_meal():
     # Save the meal to meal_history collection
     meal_entry = {
         "user_id": user_id,
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "date": utcnow(),
         "meal_details": meal,
         "meal_type": meal_type,
-        "calories": calories
+        "calories": calories,
+        "meal_request": meal_request,
+        "source": source
     }
     
     try:
-        db.meal_history.insert_one(meal_entry)
+        write_queue.insert("meal_history", meal_entry, sync=write_sync())
+        recipe_index.add_meal(meal_entry)
         return jsonify({
             "message": "Meal generated and saved successfully!", 
-            "meal": meal
+            "meal": meal,
+            "source": source
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Streaming version of /api/generate-meal (server-sent events, same JSON body):
+#   start, token {"text"}, dish (each dish as soon as it's complete), done {"meal", "id"} after saving to meal_history
+@app.route('/api/generate-meal/stream', methods=['POST'])
+def api_generate_meal_stream():
+    data = request.json or {}
+    user_id = data.get('user_id')
+    meal_type = data.get('meal_type')
+    calories = data.get('calories')
+    meal_request = data.get('meal_request')
+
+    try:
+        user = db.users.find_one({"_id": ObjectId(user_id)}, {"dietary_preferences": 1})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    preferences = user.get("dietary_preferences", []) if user else []
+
+    def events():
+        yield sse_event("start", {"meal_type": meal_type, "calories": calories})
+        match = match_recipe(data, meal_type, preferences, meal_request, calories)
+        if match:
+            # already have one - no tokens, just the dishes
+            meal = recipe_index.serve(match, meal_type, preferences, calories)
+            source = "recipe_cache"
+            for dish in json.loads(meal)["dishes"]:
+                yield sse_event("dish", dish)
+        else:
+            source = "ai"
+            dishes = ArrayItemStream("dishes")
+            chunks = []
+            streamed = []
+            try:
+                for text in stream_meal(meal_type, preferences, meal_request, calories):
+                    chunks.append(text)
+                    yield sse_event("token", {"text": text})
+                    for dish in dishes.feed(text):
+                        streamed.append(dish)
+                        yield sse_event("dish", dish)
+                # same clean-up and fallbacks as the blocking route
+                meal = finalize_meal("".join(chunks).strip(), meal_type, preferences, meal_request, calories)
+            except Exception as e:
+                print(f"Exception in streamed meal generation: {e}")
+                meal = basic_fallback_meal(meal_type, preferences, meal_request, calories)
+            final_dishes = json.loads(meal).get("dishes", [])
+            if streamed and final_dishes != streamed:
+                # the saved meal isn't what was streamed (fallback or repaired) - like the workout stream, tell the
+                # client to drop the dishes it has and send the ones that count
+                yield sse_event("fallback", {"reason": "AI meal unusable, dishes replaced"})
+                for dish in final_dishes:
+                    yield sse_event("dish", dish)
+
+        meal_entry = {
+            "user_id": user_id,
+            "date": utcnow(),
+            "meal_details": meal,
+            "meal_type": meal_type,
+            "calories": calories,
+            "meal_request": meal_request,
+            "source": source
+        }
+        try:
+            inserted_id = write_queue.insert("meal_history", meal_entry, sync=write_sync())
+            recipe_index.add_meal(meal_entry)
+            yield sse_event("done", {"meal": meal, "id": str(inserted_id), "source": source})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
+# Batch version for weekly meal plans - one request for every slot (day x meal_type x calories)
+MAX_MEAL_SLOTS = 28
+
+@app.route('/api/generate-meal-plan', methods=['POST'])
+def api_generate_meal_plan():
+    data = request.json or {}
+    user_id = data.get('user_id')
+    slots = data.get('slots', [])
+    stream = data.get('stream', False)
+
+    if not user_id or not slots:
+        return jsonify({"error": "User ID and meal slots are required"}), 400
+    if len(slots) > MAX_MEAL_SLOTS:
+        return jsonify({"error": f"A meal plan can have at most {MAX_MEAL_SLOTS} slots"}), 400
+    if any(not isinstance(slot, dict) or not slot.get('meal_type') for slot in slots):
+        return jsonify({"error": "Every slot needs a meal_type"}), 400
+
+    user = db.users.find_one({"_id": ObjectId(user_id)}, {"dietary_preferences": 1})
+    preferences = user.get("dietary_preferences", []) if user else []
+    sync = write_sync()  # read here - the streamed results run outside the request context
+
+    def meal_entry(slot, meal, source):
+        return {
+            "user_id": user_id,
+            "date": utcnow(),
+            "meal_details": meal,
+            "meal_type": slot.get('meal_type'),
+            "calories": slot.get('calories'),
+            "day": slot.get('day'),
+            "meal_request": slot.get('meal_request'),
+            "source": source
+        }
+
+    def result(index, meal, source):
+        return {"index": index, "day": slots[index].get('day'), "meal_type": slots[index].get('meal_type'),
+                "meal": meal, "source": source}
+
+    def results():
+        # Slots the recipe index can answer go out first, each stored meal used at most once per plan
+        entries = []
+        used = set()
+        missing = []
+        try:
+            for index, slot in enumerate(slots):
+                match = match_recipe(data, slot.get('meal_type'), preferences, slot.get('meal_request'), slot.get('calories'), used)
+                if match is None:
+                    missing.append(index)
+                    continue
+                used.add(match["row"])
+                meal = recipe_index.serve(match, slot.get('meal_type'), preferences, slot.get('calories'))
+                entries.append(meal_entry(slot, meal, "recipe_cache"))
+                yield result(index, meal, "recipe_cache")
+
+            # The calls run concurrently (bounded by MEAL_BATCH_CONCURRENCY); each meal is sent as soon as it is ready
+            for position, meal in generate_meals([slots[index] for index in missing], preferences):
+                index = missing[position]
+                entries.append(meal_entry(slots[index], meal, "ai"))
+                yield result(index, meal, "ai")
+        finally:
+            # Also runs when a streaming client disconnects or a slot fails part way - the meals made so far
+            # are kept, in one round trip for all of them instead of one insert per meal
+            if entries:
+                write_queue.insert_many("meal_history", entries, sync=sync)
+                for entry in entries:
+                    recipe_index.add_meal(entry)
+
+    if stream:
+        def ndjson():
+            meals = results()
+            try:
+                for result in meals:
+                    yield json_dumps(result) + "\n"
+                yield json_dumps({"done": True, "count": len(slots)}) + "\n"
+            except Exception as e:
+                yield json_dumps({"error": str(e)}) + "\n"
+            finally:
+                meals.close()  # saves what was generated if the client went away mid-plan
+        return Response(ndjson(), mimetype="application/x-ndjson")
+
+    try:
+        meals = sorted(results(), key=lambda result: result["index"])
+        return jsonify({"message": f"Generated and saved {len(meals)} meals!", "meals": meals}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/meal-history/<user_id>', methods=['GET'])
 def get_meal_history(user_id):
+    # ?view=summary or ?fields= leaves the meal_details JSON in the database
+    try:
+        projection = list_projection("meal_history")
+        query = range_query({"user_id": user_id})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
+        paged = paged_response(db.meal_history, query, "meal_logs",
+                               projection=projection, include_id=projection is not None)
+        if paged is not None:
+            return paged
+
         # Fetch meal history for the given user
         meal_logs = list(db.meal_history.find(
-            {"user_id": user_id}, 
-            {"_id": 0} # Exclude MongoDB ID, this may cause issues with the front-end and updating/delete - when i add that function in as this is a unique mongodb id that is assigned to each document, thus the front-end couldnt tell my backend which specific meal i could update or delete , when i do it?
+            query, 
+            projection or {"_id": 0} # Exclude MongoDB ID (summaries keep it), this may cause issues with the front-end and updating/delete - when i add that function in as this is a unique mongodb id that is assigned to each document, thus the front-end couldnt tell my backend which specific meal i could update or delete , when i do it?
         ).sort("date", -1))  # Sort by date descending
         
         return jsonify({"meal_logs": meal_logs}), 200
@@ -489,6 +1054,17 @@ def get_meal_history(user_id):
         print(f"Error fetching meal history: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# One full meal history entry - what a summary list item opens
+@app.route('/api/meal-history/<user_id>/<entry_id>', methods=['GET'])
+def get_meal_history_entry(user_id, entry_id):
+    try:
+        entry = db.meal_history.find_one({"_id": ObjectId(entry_id), "user_id": user_id})
+        if entry:
+            return jsonify(entry), 200
+        return jsonify({"error": "Meal not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/save-recipe', methods=['POST'])
 def save_recipe():
     """
@@ -511,11 +1087,12 @@ def save_recipe():
         "ingredients": ingredients,
         "instructions": instructions,
         "nutrition": nutrition,
-        "date_saved": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "date_saved": utcnow()
     }
     
     try:
         db.saved_recipes.insert_one(recipe_entry)
+        recipe_index.add_recipe(recipe_entry)
         return jsonify({"message": "Recipe saved successfully!"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -526,11 +1103,33 @@ def get_saved_recipes(user_id):
     Retrieve all saved recipes for a user.
     """
     try:
-        recipes = list(db.saved_recipes.find({"user_id": user_id}, {"_id": 0}))
+        projection = list_projection("saved_recipes", date_field="date_saved")
+        query = range_query({"user_id": user_id}, "date_saved")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        paged = paged_response(db.saved_recipes, query, "recipes", date_field="date_saved",
+                               projection=projection, include_id=projection is not None)
+        if paged is not None:
+            return paged
+
+        recipes = list(db.saved_recipes.find(query, projection or {"_id": 0}))
         return jsonify({"recipes": recipes}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# One saved recipe with its ingredients and instructions
+@app.route('/api/saved-recipes/<user_id>/<recipe_id>', methods=['GET'])
+def get_saved_recipe(user_id, recipe_id):
+    try:
+        recipe = db.saved_recipes.find_one({"_id": ObjectId(recipe_id), "user_id": user_id})
+        if recipe:
+            return jsonify(recipe), 200
+        return jsonify({"error": "Recipe not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 
 
@@ -540,10 +1139,7 @@ def get_saved_recipes(user_id):
 def get_shopping_list(user_id):
     try:
         shopping_list = list(db.shopping_list.find({"user_id": user_id})) #when querying the mongodb , makes sure url userid matches with the one in the db
-        # Convert ObjectId to string for each item
-        for item in shopping_list:
-            item['_id'] = str(item['_id']) #was having issues with update/delete. this is because mongo db assign a unique id to each document in the db - this example, the shopping list. so that you can specifically target it (delete/update etc) ensures you can find unique docs even if you have multiple items. e.g - apple and apple #2 
-            #original api route was filtering out these document id's : we removed: {"_id": 0}, as my front-end couldnt tell my backend which specific ingredient i could update or delete.
+        # _id is kept (the provider sends it as a string) - the front end needs it to target a specific item for update/delete, e.g apple and apple #2
         return jsonify({"shopping_list": shopping_list}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -567,14 +1163,14 @@ def add_shopping_item():
         "category": category,
         "quantity": quantity,
         "purchased": False,
-        "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "date_added": utcnow()
     }
     
     try:
-        result = db.shopping_list.insert_one(item)
+        inserted_id = write_queue.insert("shopping_list", item, sync=write_sync())
         return jsonify({
             "message": "Item added to shopping list",
-            "item_id": str(result.inserted_id)
+            "item_id": str(inserted_id)
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -606,6 +1202,105 @@ def delete_shopping_item(item_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Bulk changes to the shopping list (checking off a grocery run, clearing purchased items) in one request.
+# {"user_id", "ordered": true|false, "operations": [{"op": "purchase", "item_id", "purchased": true},
+#   {"op": "quantity", "item_id", "quantity"}, {"op": "delete", "item_id"}, {"op": "clear_purchased"}]}
+# Everything runs as a single bulk_write scoped to the user, with a result per operation.
+MAX_BULK_OPERATIONS = 500
+
+@app.route('/api/shopping-list/bulk', methods=['POST'])
+def bulk_update_shopping_list():
+    data = request.json or {}
+    user_id = data.get('user_id')
+    operations = data.get('operations', [])
+    ordered = data.get('ordered', True)
+
+    if not user_id or not operations:
+        return jsonify({"error": "User ID and operations are required"}), 400
+    if not isinstance(ordered, bool):
+        return jsonify({"error": "ordered must be true or false"}), 400
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return jsonify({"error": f"At most {MAX_BULK_OPERATIONS} operations per request"}), 400
+
+    results = [None] * len(operations)
+    item_ids = {}
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in ('purchase', 'quantity', 'delete', 'clear_purchased'):
+            results[index] = {"status": "error", "error": "Unknown op"}
+        elif op == 'purchase' and not isinstance(operation.get('purchased', True), bool):
+            # a JSON boolean only - bool("false") would mark the item purchased
+            results[index] = {"status": "error", "error": "purchased must be true or false"}
+        elif op != 'clear_purchased':
+            try:
+                item_ids[index] = ObjectId(operation.get('item_id'))
+            except Exception:
+                results[index] = {"status": "error", "error": "Invalid item_id"}
+        if ordered and results[index] is not None:
+            # like bulk_write(ordered=True), nothing after the first invalid operation runs
+            for later in range(index + 1, len(operations)):
+                results[later] = {"status": "skipped"}
+            break
+
+    try:
+        # One lookup for every referenced item, so items that aren't the user's are reported instead of silently skipped
+        owned = {doc["_id"] for doc in db.shopping_list.find(
+            {"_id": {"$in": list(item_ids.values())}, "user_id": user_id}, {"_id": 1}
+        )}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    requests_to_run = []
+    request_index = []  # position in requests_to_run -> position in operations
+    for index, operation in enumerate(operations):
+        if results[index] is not None:
+            continue
+        op = operation['op']
+        if op == 'clear_purchased':
+            write = DeleteMany({"user_id": user_id, "purchased": True})
+        elif item_ids[index] not in owned:
+            results[index] = {"status": "not_found"}
+            continue
+        elif op == 'purchase':
+            write = UpdateOne({"_id": item_ids[index], "user_id": user_id},
+                              {"$set": {"purchased": operation.get('purchased', True)}})
+        elif op == 'quantity':
+            write = UpdateOne({"_id": item_ids[index], "user_id": user_id},
+                              {"$set": {"quantity": str(operation.get('quantity', '1'))}})
+        else:
+            write = DeleteOne({"_id": item_ids[index], "user_id": user_id})
+        requests_to_run.append(write)
+        request_index.append(index)
+
+    summary = {"matched": 0, "modified": 0, "deleted": 0}
+    if requests_to_run:
+        try:
+            outcome = db.shopping_list.bulk_write(requests_to_run, ordered=ordered)
+            summary = {"matched": outcome.matched_count, "modified": outcome.modified_count, "deleted": outcome.deleted_count}
+            for index in request_index:
+                results[index] = {"status": "ok"}
+        except BulkWriteError as e:
+            details = e.details
+            summary = {"matched": details.get("nMatched", 0), "modified": details.get("nModified", 0), "deleted": details.get("nRemoved", 0)}
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in details.get("writeErrors", [])}
+            first_failure = min(failed) if failed else None
+            for position, index in enumerate(request_index):
+                if position in failed:
+                    results[index] = {"status": "error", "error": failed[position]}
+                elif ordered and first_failure is not None and position > first_failure:
+                    results[index] = {"status": "skipped"}  # ordered writes stop at the first error
+                else:
+                    results[index] = {"status": "ok"}
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    for index, operation in enumerate(operations):
+        if isinstance(operation, dict) and operation.get('item_id') is not None:
+            results[index]["item_id"] = str(operation.get('item_id'))
+        results[index]["op"] = operation.get('op') if isinstance(operation, dict) else None
+
+    return jsonify({"results": results, **summary}), 200
+
 @app.route('/api/shopping-list/from-recipe', methods=['POST']) #add recipe to shopping list
 def add_recipe_to_shopping_list():
     """Add all ingredients from a recipe to the shopping list"""
@@ -616,39 +1311,16 @@ def add_recipe_to_shopping_list():
     if not user_id or not ingredients:
         return jsonify({"error": "User ID and ingredients are required"}), 400
     
-    items = []
-    for ingredient in ingredients:
-        # Simple parsing to extract quantity and category
-        # This is a basic implementation - could be enhanced with NLP
-        parts = ingredient.split()
-        quantity = "1"
-        
-        # Try to extract a numeric quantity
-        if parts and parts[0].replace('.', '', 1).isdigit():
-            quantity = parts[0]
-            ingredient = ' '.join(parts[1:])
-            
-        # Simplistic category determination - could be improved
-        category = "Other"
-        if any(keyword in ingredient.lower() for keyword in ["fruit", "apple", "banana", "berry"]):
-            category = "Fruits"
-        elif any(keyword in ingredient.lower() for keyword in ["vegetable", "carrot", "broccoli", "onion"]):
-            category = "Vegetables"
-        elif any(keyword in ingredient.lower() for keyword in ["meat", "chicken", "beef", "pork"]):
-            category = "Meat"
-        elif any(keyword in ingredient.lower() for keyword in ["milk", "cheese", "yogurt"]):
-            category = "Dairy"
-        elif any(keyword in ingredient.lower() for keyword in ["flour", "rice", "pasta", "bread"]):
-            category = "Grains"
-            
-        items.append({
-            "user_id": user_id,
-            "item_name": ingredient,
-            "category": category,
-            "quantity": quantity,
-            "purchased": False,
-            "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
+    # Quantities, units and categories come from the compiled parser in ingredient_parser.py
+    date_added = utcnow()
+    items = [{
+        "user_id": user_id,
+        "item_name": parsed["item_name"],
+        "category": parsed["category"],
+        "quantity": parsed["quantity"],
+        "purchased": False,
+        "date_added": date_added
+    } for parsed in parse_ingredients(ingredients)]
     
     try:
         if items:
@@ -659,51 +1331,62 @@ def add_recipe_to_shopping_list():
         return jsonify({"error": str(e)}), 500
 
 # Import the analysis function
-from workout_analytics import analyze_logged_workouts
+from workout_analytics import analyze_logged_workouts, compute_workout_stats, logs_hash
 @app.route('/api/workout-insights/<user_id>', methods=['GET'])
 def get_workout_insights(user_id):
     # Check if we should generate new insights
     generate_new = request.args.get('generate', 'false').lower() == 'true'
     
     try:
-        if not generate_new:
-            # Try to fetch the most recent saved insights first
-            saved_insights = db.workout_insights.find_one(
-                {"user_id": user_id},
-                sort=[("generation_date", -1)]
-            )
-            
-            if saved_insights:
-                # Convert ObjectId to string for JSON serialization
-                if "_id" in saved_insights:
-                    saved_insights["_id"] = str(saved_insights["_id"])
-                
-                return jsonify({
-                    "insights": saved_insights["insights"],
-                    "generated_on": saved_insights["generation_date"],
-                    "is_new": False
-                }), 200
+        # The most recent saved insights, used directly or to check whether the logs changed since
+        saved_insights = db.workout_insights.find_one(
+            {"user_id": user_id},
+            sort=[("generation_date", -1)]
+        )
+
+        if not generate_new and saved_insights:
+            return jsonify({
+                "insights": saved_insights["insights"],
+                "generated_on": saved_insights["generation_date"],
+                "stats": saved_insights.get("stats"),
+                "is_new": False
+            }), 200
         
-        # Either we need to generate new insights or there are no saved insights
+        # Either we need to generate new insights or there are no saved insights - only the fields the stats use are loaded
         workout_logs = list(db.workout_logs.find(
-            {"user_id": user_id}
+            {"user_id": user_id},
+            {"_id": 0, "date": 1, "exercises": 1, "duration": 1, "mood": 1}
         ).sort("date", -1))
         
         if not workout_logs or len(workout_logs) < 3:
             return jsonify({
                 "message": "Need at least 3 logged workouts for meaningful analysis."
             }), 200
+
+        # Same logs as last time -> same insights, skip the OpenAI call
+        current_hash = logs_hash(workout_logs)
+        if saved_insights and saved_insights.get("logs_hash") == current_hash:
+            return jsonify({
+                "insights": saved_insights["insights"],
+                "generated_on": saved_insights["generation_date"],
+                "stats": saved_insights.get("stats"),
+                "is_new": False,
+                "unchanged": True
+            }), 200
         
-        # Generate new insights using the imported function
-        new_insights = analyze_logged_workouts(workout_logs)
+        # Exact numbers are computed here, the model only interprets them
+        stats = compute_workout_stats(workout_logs)
+        new_insights = analyze_logged_workouts(workout_logs, stats)
         
         # Save the new insights
-        generation_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        generation_date = utcnow()
         
-        # Save to database
+        # Save to database - the hash is left out for failed analyses so the next request tries again
         insights_entry = {
             "user_id": user_id,
             "insights": new_insights,
+            "stats": stats,
+            "logs_hash": None if "error" in new_insights else current_hash,
             "generation_date": generation_date
         }
         
@@ -712,6 +1395,7 @@ def get_workout_insights(user_id):
         return jsonify({
             "insights": new_insights,
             "generated_on": generation_date,
+            "stats": stats,
             "is_new": True
         }), 200
         
@@ -720,5 +1404,32 @@ def get_workout_insights(user_id):
         return jsonify({"error": str(e)}), 500
 
 
+#Analytics section - the charts on the analytics page are summarised in mongo instead of sending every log to the browser
+from workout_analytics import ANALYTICS_BUCKETS, build_analytics_pipeline, format_analytics
+from datetime import timedelta
+
+@app.route('/api/analytics/<user_id>', methods=['GET'])
+def get_analytics(user_id):
+    # Optional range (YYYY-MM-DD inclusive, or ISO 8601 times) and bucket size (day/week/month) for longer views
+    bucket = request.args.get('bucket', 'day')
+
+    if bucket not in ANALYTICS_BUCKETS:
+        return jsonify({"error": f"bucket must be one of: {', '.join(ANALYTICS_BUCKETS)}"}), 400
+
+    try:
+        date_condition = date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        today = datetime.combine(utcnow().date(), datetime.min.time())
+        pipeline = build_analytics_pipeline(user_id, date_condition, bucket, recent_since=today - timedelta(days=7))
+        result = next(db.workout_logs.aggregate(pipeline), {})
+        return jsonify(format_analytics(result)), 200
+    except Exception as e:
+        print(f"Error building analytics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,193 @@
+# fake_openai.py
+# Local stand-in for the OpenAI chat completion API so the benchmarks never call (or pay for) the real thing.
+# Point the app at it with OPENAI_API_BASE=http://127.0.0.1:<port>/v1 before openai is imported.
+#   python benchmarks/fake_openai.py --port 8099 --latency 1.5 --jitter 0.5 --malformed-rate 0.1 --fail-rate 0.2
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORKOUT_RESPONSE = {
+    "goal": "Lose Weight",
+    "experience_level": "beginner",
+    "time_available": 30,
+    "exercises": [
+        {"name": "Jumping Jacks", "sets": 3, "reps": 30},
+        {"name": "Squats", "sets": 3, "reps": 15},
+        {"name": "Push-ups", "sets": 3, "reps": 10},
+        {"name": "Plank", "sets": 3, "reps": "30 seconds"}
+    ]
+}
+
+MEAL_RESPONSE = {
+    "meal_type": "Lunch",
+    "calories": 500,
+    "dietary_preferences": [],
+    "dishes": [{
+        "name": "Grilled Chicken Quinoa Bowl",
+        "ingredients": ["150g chicken breast", "1 cup quinoa", "1/2 avocado", "Handful of spinach"],
+        "instructions": "Grill the chicken, cook the quinoa and serve over spinach with sliced avocado.",
+        "protein": 40,
+        "carbs": 45,
+        "fat": 15
+    }]
+}
+
+# streamed completions (stream=True) come back in pieces of about a token
+STREAM_CHUNK_CHARS = 4
+FIRST_TOKEN_SHARE = 0.1
+
+INSIGHTS_RESPONSE = {
+    "consistency": "You trained 3 times a week on average.",
+    "progress": "Bench press weight is going up steadily.",
+    "focus_areas": ["Chest", "Legs"],
+    "strength_areas": ["Upper body pushing"],
+    "improvement_areas": ["Back", "Mobility"],
+    "mood_patterns": "Sessions logged as Energetic were longer.",
+    "recommendations": ["Add a pull day", "Keep the 3x/week rhythm", "Stretch after sessions"]
+}
+
+
+def pick_response(messages):
+    """Choose a canned body that matches what the app asked for"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system").lower()
+    if "culinary" in system:
+        return MEAL_RESPONSE
+    if "analytics" in system:
+        return INSIGHTS_RESPONSE
+    return WORKOUT_RESPONSE
+
+
+def malform(content):
+    """The kinds of broken output the real model sends back now and then"""
+    return random.choice([
+        "```json\n" + content + "\n```",
+        content[: len(content) // 2],
+        "Sure! Here is your plan:\n" + content + "\nEnjoy!",
+        content.replace("]", ",]", 1),
+    ])
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out and hung up before the answer was written
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        settings = self.server.settings
+
+        with settings["lock"]:
+            settings["requests"] += 1
+
+        latency = max(0.0, random.gauss(settings["latency"], settings["jitter"]))
+        if random.random() < settings["fail_rate"]:
+            self.fail(settings["fail_status"])
+            return
+        if not body.get("stream"):
+            time.sleep(latency)
+
+        content = json.dumps(pick_response(body.get("messages", [])), indent=2)
+        if random.random() < settings["malformed_rate"]:
+            content = malform(content)
+
+        if body.get("stream"):
+            self.stream(content, body, latency)
+            return
+
+        payload = json.dumps({
+            "id": f"chatcmpl-fake-{random.randrange(10**9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 200, "completion_tokens": len(content) // 4, "total_tokens": 200 + len(content) // 4}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def fail(self, status):
+        """An overloaded / broken upstream - answers straight away with an OpenAI style error body"""
+        payload = json.dumps({"error": {"message": f"Fake upstream error {status}", "type": "server_error"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def stream(self, content, body, latency):
+        """stream=True: the first token after FIRST_TOKEN_SHARE of the latency, the rest spread over the remainder"""
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        time.sleep(latency * FIRST_TOKEN_SHARE)
+        gap = latency * (1 - FIRST_TOKEN_SHARE) / max(len(pieces), 1)
+        chunk_id = f"chatcmpl-fake-{random.randrange(10**9)}"
+        deltas = [{"role": "assistant"}] + [{"content": piece} for piece in pieces] + [{}]
+        for n, delta in enumerate(deltas):
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-3.5-turbo"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if n == len(deltas) - 1 else None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if "content" in delta:
+                time.sleep(gap)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+
+def start_server(port=0, latency=0.5, jitter=0.1, malformed_rate=0.0, fail_rate=0.0, fail_status=503):
+    """
+    Start the fake server on a background thread, returns (server, base_url).
+    server.settings can be changed while it runs, e.g. fail_rate = 1.0 for an outage.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.settings = {
+        "latency": latency,
+        "jitter": jitter,
+        "malformed_rate": malformed_rate,
+        "fail_rate": fail_rate,
+        "fail_status": fail_status,
+        "requests": 0,
+        "lock": threading.Lock()
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completion server")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1, help="std dev of the latency")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of responses with broken JSON")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--fail-status", type=int, default=503, help="HTTP status of those errors (429, 500, 503...)")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, args.latency, args.jitter, args.malformed_rate,
+                                    args.fail_rate, args.fail_status)
+    print(f"Fake OpenAI listening on {base_url} (set OPENAI_API_BASE to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
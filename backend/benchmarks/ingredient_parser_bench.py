@@ -0,0 +1,92 @@
+# ingredient_parser_bench.py
+# Throughput of ingredient_parser against the old inline parsing in add_recipe_to_shopping_list.
+#   python benchmarks/ingredient_parser_bench.py --lines 20000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingredient_parser import IngredientEngine, load_categories  # noqa: E402
+
+SAMPLE_LINES = [
+    "1 1/2 cups brown rice", "200g chicken breast", "2 eggs", "½ tsp smoked paprika", "2-3 garlic cloves",
+    "1 can of chickpeas", "Salt and black pepper to taste", "2 tbsp peanut butter", "3 strawberries",
+    "1 cup almond milk", "Handful of spinach", "2 large sweet potatoes, diced", "1.5 kg beef mince",
+    "1 tbsp extra virgin olive oil", "250ml vegetable stock", "100 g feta cheese, crumbled", "1 red onion",
+    "2 cups frozen peas", "1/4 cup chopped walnuts", "4 slices wholemeal bread", "1 lime, juiced",
+]
+
+
+def legacy_parse(ingredient):
+    """The loop body add_recipe_to_shopping_list used before ingredient_parser.py"""
+    parts = ingredient.split()
+    quantity = "1"
+    if parts and parts[0].replace('.', '', 1).isdigit():
+        quantity = parts[0]
+        ingredient = ' '.join(parts[1:])
+    category = "Other"
+    if any(keyword in ingredient.lower() for keyword in ["fruit", "apple", "banana", "berry"]):
+        category = "Fruits"
+    elif any(keyword in ingredient.lower() for keyword in ["vegetable", "carrot", "broccoli", "onion"]):
+        category = "Vegetables"
+    elif any(keyword in ingredient.lower() for keyword in ["meat", "chicken", "beef", "pork"]):
+        category = "Meat"
+    elif any(keyword in ingredient.lower() for keyword in ["milk", "cheese", "yogurt"]):
+        category = "Dairy"
+    elif any(keyword in ingredient.lower() for keyword in ["flour", "rice", "pasta", "bread"]):
+        category = "Grains"
+    return ingredient, quantity, category
+
+
+def legacy_parse_large(ingredient, categories):
+    """The old any(keyword in ...) chain, fed the full category dictionary - how it scales with more keywords"""
+    parts = ingredient.split()
+    quantity = "1"
+    if parts and parts[0].replace('.', '', 1).isdigit():
+        quantity = parts[0]
+        ingredient = ' '.join(parts[1:])
+    category = "Other"
+    for name, keywords in categories.items():
+        if any(keyword in ingredient.lower() for keyword in keywords):
+            category = name
+            break
+    return ingredient, quantity, category
+
+
+def timed(label, fn, lines):
+    start = time.perf_counter()
+    fn(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{label:45} {len(lines) / elapsed:>12,.0f} lines/s   {elapsed * 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingredient parser throughput")
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    lines = [random.choice(SAMPLE_LINES) for _ in range(args.lines)]
+    categories = load_categories()
+
+    start = time.perf_counter()
+    engine = IngredientEngine(categories)
+    keyword_count = sum(len(k) for k in categories.values())
+    print(f"Compiled {keyword_count} keywords in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    timed("legacy (5 categories, 18 keywords)", lambda ls: [legacy_parse(l) for l in ls], lines)
+    timed(f"legacy chain over full dictionary ({keyword_count})", lambda ls: [legacy_parse_large(l, categories) for l in ls], lines)
+    timed("ingredient_parser.parse_many", engine.parse_many, lines)
+
+    print("\nSample output:")
+    for line in SAMPLE_LINES[:6]:
+        parsed = engine.parse(line)
+        print(f"  {line:35} -> {parsed['quantity']!r:14} {parsed['item_name']!r:22} {parsed['category']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# json_compression_bench.py
+# Encode time and bytes on the wire for a workout history response: Flask's stdlib-based jsonify path
+# vs json_provider (orjson), then identity vs gzip vs brotli at the levels compression.py uses.
+#   python benchmarks/json_compression_bench.py --logs 500
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_provider  # noqa: E402
+from compression import BROTLI_QUALITY, GZIP_LEVEL, brotli  # noqa: E402
+
+EXERCISES = ["Squat", "Bench Press", "Deadlift", "Pull Up", "Lunges", "Plank", "Rowing", "Burpees"]
+MOODS = ["Great", "Good", "Okay", "Tired"]
+
+
+def make_logs(count, seed):
+    random.seed(seed)
+    start = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "user_id": "65f1c0ffee0000000000beef",
+        "date": start + timedelta(days=n, minutes=random.randint(0, 600)),
+        "duration": random.randint(20, 90),
+        "mood": random.choice(MOODS),
+        "notes": "Felt strong today, increased weight on the last set",
+        "exercises": [
+            {"name": name, "sets": random.randint(2, 5), "reps": random.randint(5, 15), "weight": random.randint(0, 120)}
+            for name in random.sample(EXERCISES, 4)
+        ],
+    } for n in range(count)]
+
+
+def stdlib_encode(payload):
+    """Roughly what jsonify did before: sorted keys, str() fallback for ObjectId/datetime"""
+    return (json.dumps(payload, default=str, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+def provider_encode(payload):
+    return json_provider.dumps_bytes(payload) + b"\n"
+
+
+def best_time(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON encoder and response compression comparison")
+    parser.add_argument("--logs", type=int, default=500, help="workout logs in the response")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    payload = {"workout_logs": make_logs(args.logs, args.seed)}
+    print(f"{args.logs} workout logs, best of {args.repeat}  (orjson {'on' if json_provider.orjson else 'NOT installed'})\n")
+
+    print("Encoding")
+    stdlib_time, body = best_time(stdlib_encode, payload, args.repeat)
+    provider_time, fast_body = best_time(provider_encode, payload, args.repeat)
+    print(f"  {'stdlib json (old jsonify)':28} {stdlib_time * 1000:8.2f} ms   {len(body):>9,} bytes")
+    print(f"  {'json_provider':28} {provider_time * 1000:8.2f} ms   {len(fast_body):>9,} bytes"
+          f"   {stdlib_time / provider_time:.1f}x faster")
+
+    print("\nCompression of the json_provider body")
+    print(f"  {'identity':28} {0:8.2f} ms   {len(fast_body):>9,} bytes")
+    codecs = [(f"gzip level {GZIP_LEVEL}", lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL))]
+    if brotli is not None:
+        codecs.append((f"brotli quality {BROTLI_QUALITY}", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+    else:
+        print("  (brotli not installed, skipping)")
+    for label, codec in codecs:
+        elapsed, compressed = best_time(codec, fast_body, args.repeat)
+        print(f"  {label:28} {elapsed * 1000:8.2f} ms   {len(compressed):>9,} bytes"
+              f"   {len(fast_body) / len(compressed):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# lift_sets_bench.py
+# "All my bench sets this year": unpacking every workout_logs session (what a per-exercise view had to do before)
+# vs reading workout_sets through its (user_id, exercise, date) index. Uses a throwaway mongod when one is installed
+# (or --mongo URI). mongomock is the fallback, but it ignores indexes and scans every set, so there only the
+# documents and BSON bytes read mean anything - those are what a real server would have to send either way.
+#   python benchmarks/lift_sets_bench.py --sessions 1000 --repeat 20
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import start_ephemeral_mongod, use_mongomock  # noqa: E402
+
+EXERCISES = ["Bench Press", "Squats", "Deadlift", "Overhead Press", "Barbell Row", "Pull-ups", "Lunges", "Curls"]
+
+
+def seed(db, user_id, sessions):
+    from lift_sets import sets_from_log
+    start = datetime(2024, 1, 1)
+    logs = []
+    for n in range(sessions):
+        logs.append({
+            "_id": bson.ObjectId(),
+            "user_id": user_id,
+            "date": start + timedelta(days=n * 730 / sessions, hours=random.randint(6, 20)),
+            "exercises": [
+                {"name": name, "notes": "felt good",
+                 "sets": [{"set_number": s, "weight": random.randint(40, 140), "reps": random.randint(3, 12)}
+                          for s in range(1, 5)]}
+                for name in random.sample(EXERCISES, 5)
+            ],
+            "duration": 60, "mood": "Focused", "notes": "benchmark session",
+        })
+    db.workout_logs.insert_many(logs)
+    db.workout_sets.insert_many([record for log in logs for record in sets_from_log(log)])
+
+
+def from_logs(db, user_id, start, end):
+    """The old way - every session in range, sets pulled out in python"""
+    docs = list(db.workout_logs.find({"user_id": user_id, "date": {"$gte": start, "$lt": end}}))
+    sets = [s for log in docs for exercise in log["exercises"] if exercise["name"] == "Bench Press"
+            for s in exercise["sets"]]
+    return docs, sets
+
+
+def from_sets(db, user_id, start, end):
+    docs = list(db.workout_sets.find(
+        {"user_id": user_id, "exercise": "bench press", "date": {"$gte": start, "$lt": end}},
+        {"_id": 0, "user_id": 0, "exercise": 0}).sort([("date", -1), ("_id", -1)]))
+    return docs, docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-exercise history: workout_logs vs workout_sets")
+    parser.add_argument("--sessions", type=int, default=1000, help="logged sessions, spread over two years")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mongo", help="mongodb URI to run against instead of mongomock")
+    args = parser.parse_args()
+
+    mongod = None if args.mongo else start_ephemeral_mongod()
+    uri = args.mongo or (mongod[1] if mongod else None)
+    if uri:
+        from pymongo import MongoClient
+        db = MongoClient(uri)["lift_sets_bench"]
+        db.workout_logs.drop()
+        db.workout_sets.drop()
+    else:
+        print("mongod not found - using mongomock, which has no indexes: compare docs and KB read, not times\n")
+        use_mongomock()
+        import mongomock
+        db = mongomock.MongoClient()["lift_sets_bench"]
+    from db_indexes import INDEXES
+    for name in ("workout_logs", "workout_sets"):
+        for keys, options in INDEXES[name]:
+            db[name].create_index(keys, **options)
+
+    seed(db, "bench-user", args.sessions)
+    start, end = datetime(2025, 1, 1), datetime(2026, 1, 1)
+    print(f"{args.sessions} sessions, {db.workout_sets.count_documents({})} sets; bench sets in 2025\n")
+    print(f"  {'source':14}{'docs read':>10}{'KB read':>10}{'sets':>8}{'p50 ms':>9}")
+    for label, fn in (("workout_logs", from_logs), ("workout_sets", from_sets)):
+        times = []
+        for _ in range(args.repeat):
+            began = time.perf_counter()
+            docs, sets = fn(db, "bench-user", start, end)
+            times.append(time.perf_counter() - began)
+        size = sum(len(bson.encode(doc)) for doc in docs) / 1024
+        print(f"  {label:14}{len(docs):>10}{size:>10.0f}{len(sets):>8}{statistics.median(times) * 1000:>9.2f}")
+
+    if mongod:
+        process, _, dbpath = mongod
+        process.terminate()
+        process.wait()
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
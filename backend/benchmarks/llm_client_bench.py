@@ -0,0 +1,120 @@
+# llm_client_bench.py
+# llm_client.LLMClient against calling openai directly (metrics.chat_completion, what the generators did
+# before), using the fake OpenAI server in four situations:
+#   coalesce  many identical requests at once - upstream calls made
+#   flaky     a share of requests fail with a 503 - how many callers still get an answer
+#   outage    upstream hangs - time each caller waits before it can fall back
+#   recovery  after the outage the breaker lets a trial call through and closes again
+#   python benchmarks/llm_client_bench.py --callers 20 --fail-rate 0.3
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server  # noqa: E402
+
+
+def request(n=0):
+    # n makes the prompt unique so only deliberate duplicates are coalesced
+    return {"model": "gpt-3.5-turbo", "max_tokens": 50,
+            "messages": [{"role": "user", "content": f"Create a workout plan #{n}"}]}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    try:
+        fn()
+        ok = True
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def run_all(fn, count, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda n: timed(lambda: fn(n)), range(count)))
+
+
+def upstream(server):
+    return server.settings["requests"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resilient LLM client vs direct OpenAI calls")
+    parser.add_argument("--callers", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake completion time (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.3, help="503 share in the flaky scenario")
+    parser.add_argument("--hang", type=float, default=3.0, help="upstream latency during the outage (s)")
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency, jitter=0)
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    import openai
+    openai.api_base = base_url
+    openai.api_key = os.environ["OPENAI_API_KEY"]
+    import metrics
+    from llm_client import CircuitBreaker, LLMClient
+
+    def direct(n, body=None):
+        return metrics.chat_completion("bench", **(body or request(n)))
+
+    def client(**overrides):
+        settings = {"timeout": 1.0, "max_retries": 3, "backoff_base": 0.05, "backoff_max": 0.5,
+                    "max_concurrency": 8, "queue_timeout": 5, "breaker": CircuitBreaker(failures=5, reset_seconds=1.0)}
+        settings.update(overrides)
+        return LLMClient(**settings)
+
+    # coalesce
+    print(f"coalesce: {args.callers} identical requests at once")
+    for label, fn in (("direct", lambda n: direct(n, request())), ("llm_client", None)):
+        if fn is None:
+            llm = client()
+            fn = lambda n: llm.complete("bench", **request())  # noqa: E731
+        before = upstream(server)
+        results = run_all(fn, args.callers, args.callers)
+        print(f"  {label:12} upstream calls {upstream(server) - before:>4}   ok {sum(ok for ok, _ in results):>3}/{args.callers}"
+              f"   median {statistics.median(t for _, t in results) * 1000:>6.0f} ms")
+
+    # flaky
+    server.settings["fail_rate"] = args.fail_rate
+    print(f"\nflaky: {args.fail_rate:.0%} of upstream requests fail with 503, {args.callers * 5} distinct requests")
+    for label in ("direct", "llm_client"):
+        if label == "direct":
+            fn = direct
+        else:
+            llm = client(breaker=CircuitBreaker(failures=50, reset_seconds=1.0))
+            fn = lambda n: llm.complete("bench", **request(n))  # noqa: E731
+        before = upstream(server)
+        results = run_all(fn, args.callers * 5, 8)
+        print(f"  {label:12} ok {sum(ok for ok, _ in results):>4}/{args.callers * 5}   upstream calls {upstream(server) - before:>4}"
+              f"   p95 {sorted(t for _, t in results)[int(len(results) * 0.95) - 1] * 1000:>6.0f} ms")
+
+    # outage
+    server.settings["fail_rate"] = 0.0
+    server.settings["latency"] = args.hang
+    print(f"\noutage: upstream takes {args.hang}s, {args.callers} callers one after another")
+    results = [timed(lambda: direct(n)) for n in range(3)]
+    print(f"  {'direct':12} waited median {statistics.median(t for _, t in results):>6.2f} s (3 callers, no timeout)")
+    llm = client(timeout=0.5, max_retries=1, breaker=CircuitBreaker(failures=3, reset_seconds=1.0))
+    results = [timed(lambda: llm.complete("bench", **request(n))) for n in range(args.callers)]
+    waits = [t for _, t in results]
+    print(f"  {'llm_client':12} waited median {statistics.median(waits):>6.2f} s   max {max(waits):.2f} s"
+          f"   total {sum(waits):.2f} s   circuit {llm.breaker.state}   rejected {llm.counters['rejected']}")
+
+    # recovery
+    server.settings["latency"] = args.latency
+    time.sleep(llm.breaker.reset_seconds)
+    ok, elapsed = timed(lambda: llm.complete("bench", **request(-1)))
+    print(f"\nrecovery: trial call ok={ok} in {elapsed * 1000:.0f} ms, circuit {llm.breaker.state}")
+    print(f"  stats {llm.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# llm_json_bench.py
+# llm_json.parse_llm_json against the parsing the app did before it (clean_json + json.loads for meals,
+# a bare json.loads for insights, nothing at all for workouts).
+#   1. the hand written corpus in llm_json_corpus.jsonl must all come out as expected
+#   2. the canned fake_openai responses are broken at random the way the model breaks them, and both
+#      parsers are scored on how many they still recover (and that nothing raises outside LLMJSONError)
+#   3. throughput of both on the same inputs
+#   python benchmarks/llm_json_bench.py --samples 20000
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import INSIGHTS_RESPONSE, MEAL_RESPONSE, WORKOUT_RESPONSE  # noqa: E402
+from llm_json import INSIGHTS_SCHEMA, MEAL_SCHEMA, WORKOUT_SCHEMA, LLMJSONError, parse_llm_json, validate  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_json_corpus.jsonl")
+SCHEMAS = {"workout": WORKOUT_SCHEMA, "meal": MEAL_SCHEMA, "insights": INSIGHTS_SCHEMA}
+RESPONSES = {"workout": WORKOUT_RESPONSE, "meal": MEAL_RESPONSE, "insights": INSIGHTS_RESPONSE}
+
+
+def clean_json(json_string):
+    """generate_meal.clean_json before llm_json.py"""
+    cleaned = json_string.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+    cleaned = cleaned.replace('\\', '\\\\')
+    cleaned = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', cleaned)
+    match = re.search(r'(\{.*\})', cleaned)
+    if match:
+        cleaned = match.group(1)
+    return cleaned
+
+
+def legacy_parse(text):
+    return json.loads(clean_json(text))
+
+
+# Mutators - each takes pretty printed JSON and returns it broken in one way
+
+def fence(text):
+    return "```json\n" + text + "\n```"
+
+
+def prose(text):
+    return "Sure! Here is your plan:\n" + text + "\nLet me know if you want changes."
+
+
+def trailing_comma(text):
+    return re.sub(r'(["\d\]}])(\s*)([\]}])', r'\1,\2\3', text, count=1)
+
+
+def raw_newline(text):
+    # a line break the model put inside a string value
+    return text.replace(" ", "\n", 1) if '": "' not in text else text.replace('": "', '": "\n', 1)
+
+
+def truncate(text):
+    return text[:random.randint(len(text) // 2, len(text) - 1)]
+
+
+def bad_escape(text):
+    return text.replace("'", "\\'", 1) if "'" in text else text.replace('": "', '": "it\\\'s ', 1)
+
+
+def quoted(text):
+    # a valid escaped quote, which clean_json used to double escape
+    return text.replace('": "', '": "the \\"best\\" ', 1)
+
+
+MUTATORS = [fence, prose, trailing_comma, raw_newline, truncate, bad_escape, quoted]
+
+
+def sample(kind):
+    text = json.dumps(RESPONSES[kind], indent=random.choice([None, 2]))
+    for mutate in random.sample(MUTATORS, random.randint(0, 3)):
+        text = mutate(text)
+    return text
+
+
+def check_corpus():
+    failures = 0
+    with open(CORPUS) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    for case in cases:
+        try:
+            parse_llm_json(case["input"], SCHEMAS[case["schema"]])
+            ok = True
+        except LLMJSONError:
+            ok = False
+        if ok != case["ok"]:
+            failures += 1
+            print(f"  corpus FAIL: {case['name']} (expected {'ok' if case['ok'] else 'rejected'})")
+    print(f"corpus: {len(cases) - failures}/{len(cases)} as expected")
+    return failures
+
+
+def score(samples):
+    legacy = new = 0
+    unexpected = []
+    for kind, text in samples:
+        try:
+            # the legacy path had no schema - it counts as recovered when the schema would accept the result
+            obj = legacy_parse(text)
+            if isinstance(obj, dict) and not validate(obj, SCHEMAS[kind]):
+                legacy += 1
+        except ValueError:
+            pass
+        try:
+            parse_llm_json(text, SCHEMAS[kind])
+            new += 1
+        except LLMJSONError:
+            pass
+        except Exception as e:  # anything else would be a 500 in the app
+            unexpected.append((text, e))
+    return legacy, new, unexpected
+
+
+def throughput(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            try:
+                fn(text)
+            except ValueError:
+                pass
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="llm_json vs the old clean_json + json.loads")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    failures = check_corpus()
+
+    samples = [(kind, sample(kind)) for kind in random.choices(list(RESPONSES), k=args.samples)]
+    legacy, new, unexpected = score(samples)
+    print(f"\nfuzz: {args.samples} mutated responses")
+    print(f"  legacy clean_json + json.loads  recovered {legacy / args.samples:7.1%}")
+    print(f"  llm_json.parse_llm_json         recovered {new / args.samples:7.1%}")
+    print(f"  unexpected exceptions           {len(unexpected)}")
+    for text, e in unexpected[:5]:
+        print(f"    {type(e).__name__}: {e}\n      {text[:120]!r}")
+
+    texts = [text for _, text in samples[:2000]]
+    clean = [json.dumps(RESPONSES[kind]) for kind in RESPONSES] * 500
+    print("\nthroughput (responses/s)")
+    for label, inputs in (("mutated", texts), ("clean", clean)):
+        old_rate = throughput(legacy_parse, inputs, 3)
+        new_rate = throughput(parse_llm_json, inputs, 3)
+        print(f"  {label:8} legacy {old_rate:>10.0f}   llm_json {new_rate:>10.0f}   ({new_rate / old_rate:.2f}x)")
+
+    sys.exit(1 if failures or unexpected else 0)
+
+
+if __name__ == "__main__":
+    main()
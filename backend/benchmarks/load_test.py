@@ -0,0 +1,339 @@
+# load_test.py
+# End-to-end load benchmark for the backend. Replays a realistic route mix (logins, dashboard fetches,
+# workout logging, AI generations) and reports p50/p95/p99 latency and req/s per route.
+#
+# Nothing external is needed: OpenAI is replaced by benchmarks/fake_openai.py and mongo is either an
+# ephemeral mongod (if the binary is on PATH) or mongomock (pip install -r benchmarks/requirements.txt).
+#
+#   python benchmarks/load_test.py --duration 30 --workers 8
+#   python benchmarks/load_test.py --save-baseline          # store results in benchmarks/baseline.json
+#   python benchmarks/load_test.py --compare                # exit 1 if any route regressed past --tolerance
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000   # drive an already running server instead
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# (scenario, weight) - roughly what the frontend does in a normal session
+ROUTE_MIX = [
+    ("login", 10),
+    ("dashboard", 30),
+    ("dashboard_legacy", 5),
+    ("log_workout", 15),
+    ("workout_logs", 10),
+    ("meal_history", 10),
+    ("generate_workout", 10),
+    ("generate_meal", 5),
+    ("workout_insights", 5),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_ephemeral_mongod():
+    """Start a throwaway mongod in a temp dir, returns (process, uri, dbpath) or None if mongod isn't installed"""
+    binary = shutil.which("mongod")
+    if not binary:
+        return None
+    dbpath = tempfile.mkdtemp(prefix="fitness-bench-")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, f"mongodb://127.0.0.1:{port}/", dbpath
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("mongod did not start")
+
+
+def use_mongomock():
+    """Swap pymongo.MongoClient for mongomock before app.py is imported"""
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("Neither mongod nor mongomock is available - pip install -r benchmarks/requirements.txt")
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+class InProcessClient:
+    """Calls the Flask app directly through its test client (no sockets), one per worker thread"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Drives a running server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.statuses = {}
+
+    def timed(self, client, route, method, path, body=None):
+        start = time.perf_counter()
+        status, payload = client.request(method, path, body)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            self.statuses.setdefault(route, {}).setdefault(status, 0)
+            self.statuses[route][status] += 1
+        return status, payload
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def seed_users(client, count):
+    """Create benchmark users (through the real signup route) plus a few logged workouts each"""
+    users = []
+    run_id = random.randrange(10**6)
+    for i in range(count):
+        email = f"bench{run_id}-{i}@example.com"
+        status, payload = client.request("POST", "/api/signup", {
+            "name": f"Bench User {i}", "email": email, "password": "benchmark-password",
+            "goals": "Lose Weight", "dietary_preferences": ["halal"]
+        })
+        if status != 201:
+            raise RuntimeError(f"Could not create benchmark user: {status} {payload}")
+        user = {"email": email, "password": "benchmark-password", "user_id": payload["user_id"]}
+        for _ in range(5):
+            client.request("POST", "/api/workout-logs", workout_log(user["user_id"]))
+        users.append(user)
+    return users
+
+
+def workout_log(user_id):
+    return {
+        "user_id": user_id,
+        "exercises": [
+            {"name": "Bench Press", "sets": [{"set_number": n, "weight": 60 + 5 * n, "reps": 10 - n} for n in range(1, 4)]},
+            {"name": "Squats", "sets": [{"set_number": n, "weight": 80 + 5 * n, "reps": 8} for n in range(1, 4)]}
+        ],
+        "duration": random.choice([30, 45, 60]),
+        "mood": random.choice(["Energetic", "Tired", "Focused"]),
+        "notes": "benchmark"
+    }
+
+
+def run_scenario(name, client, user, recorder):
+    uid = user["user_id"]
+    if name == "login":
+        recorder.timed(client, "POST /api/login", "POST", "/api/login",
+                       {"email": user["email"], "password": user["password"]})
+    elif name == "dashboard":
+        # Dashboard.js loads everything from one call (it used to make the four calls in dashboard_legacy)
+        recorder.timed(client, "GET /api/dashboard/<user_id>", "GET", f"/api/dashboard/{uid}")
+    elif name == "dashboard_legacy":
+        recorder.timed(client, "GET /api/users/<id>", "GET", f"/api/users/{uid}")
+        recorder.timed(client, "GET /api/workouts/<goal>", "GET", "/api/workouts/Lose%20Weight")
+        recorder.timed(client, "GET /api/tip", "GET", "/api/tip")
+        recorder.timed(client, "GET /api/workout-history/<user_id>", "GET", f"/api/workout-history/{uid}")
+    elif name == "log_workout":
+        recorder.timed(client, "POST /api/workout-logs", "POST", "/api/workout-logs", workout_log(uid))
+    elif name == "workout_logs":
+        recorder.timed(client, "GET /api/workout-logs/<user_id>", "GET", f"/api/workout-logs/{uid}")
+    elif name == "meal_history":
+        recorder.timed(client, "GET /api/meal-history/<user_id>", "GET", f"/api/meal-history/{uid}")
+    elif name == "generate_workout":
+        recorder.timed(client, "POST /api/generate-workout", "POST", "/api/generate-workout", {
+            "user_id": uid, "goal": random.choice(["Lose Weight", "Gain Muscle"]),
+            "experience_level": random.choice(["beginner", "intermediate"]), "time_available": random.choice([30, 45])
+        })
+    elif name == "generate_meal":
+        recorder.timed(client, "POST /api/generate-meal", "POST", "/api/generate-meal", {
+            "user_id": uid, "meal_type": random.choice(["Breakfast", "Lunch", "Dinner"]), "calories": 500
+        })
+    elif name == "workout_insights":
+        recorder.timed(client, "GET /api/workout-insights/<user_id>", "GET",
+                       f"/api/workout-insights/{uid}?generate={random.choice(['true', 'false'])}")
+
+
+def run_load(make_client, users, duration, workers):
+    recorder = Recorder()
+    names = [name for name, _ in ROUTE_MIX]
+    weights = [weight for _, weight in ROUTE_MIX]
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        client = make_client()
+        while time.perf_counter() < deadline:
+            run_scenario(random.choices(names, weights)[0], client, random.choice(users), recorder)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker) for _ in range(workers)]
+        for future in futures:
+            future.result()  # re-raise anything that killed a worker
+    return recorder, time.perf_counter() - started
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for route, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        results[route] = {
+            "count": len(ordered),
+            "req_per_s": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "statuses": {str(code): n for code, n in sorted(recorder.statuses[route].items())}
+        }
+    return results
+
+
+def print_results(results, elapsed):
+    print(f"\n{'route':42} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for route, r in results.items():
+        print(f"{route:42} {r['count']:>7} {r['req_per_s']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {r['statuses']}")
+    total = sum(r["count"] for r in results.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s overall)")
+
+
+def compare_to_baseline(results, tolerance):
+    """Returns a list of human readable regressions against benchmarks/baseline.json"""
+    if not os.path.exists(BASELINE_PATH):
+        sys.exit("No baseline yet - run with --save-baseline first")
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)["routes"]
+    regressions = []
+    for route, base in baseline.items():
+        current = results.get(route)
+        if not current:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["req_per_s"] < base["req_per_s"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {base['req_per_s']} -> {current['req_per_s']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the fitness app backend")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--users", type=int, default=5, help="benchmark accounts to create")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean fake OpenAI latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--malformed-rate", type=float, default=0.05, help="fraction of fake completions with broken JSON")
+    parser.add_argument("--mongo", choices=["auto", "mongod", "mongomock"], default="auto")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="fail if results regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression before --compare fails")
+    args = parser.parse_args()
+
+    mongod = None
+    if args.url:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        # Both have to be in place before app.py (and openai) are imported
+        fake_server, base_url = start_server(0, args.llm_latency, args.llm_jitter, args.malformed_rate)
+        os.environ["OPENAI_API_BASE"] = base_url
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+
+        if args.mongo in ("auto", "mongod"):
+            mongod = start_ephemeral_mongod()
+            if mongod is None and args.mongo == "mongod":
+                sys.exit("mongod not found on PATH")
+        if mongod:
+            os.environ["MONGO_URI"] = mongod[1]
+            print(f"Using ephemeral mongod at {mongod[1]}")
+        else:
+            use_mongomock()
+            print("Using mongomock")
+
+        import openai
+        openai.api_base = base_url
+
+        from app import app, db, reference_cache
+        from reference_cache import bump_version
+        make_client = lambda: InProcessClient(app)  # noqa: E731
+        if not db.workouts.find_one({"goal": "Lose Weight"}):
+            db.workouts.insert_one({"workout_id": "bench", "goal": "Lose Weight", "name": "HIIT Cardio", "duration": 30,
+                                    "exercises": [{"name": "Burpees", "sets": 3, "reps": 15}]})
+            # the reference cache was loaded when app.py was imported - without this /api/workouts/<goal> is a 404
+            bump_version(db, "workouts")
+            reference_cache.load()
+
+    try:
+        users = seed_users(make_client(), args.users)
+        print(f"Running {args.workers} workers for {args.duration}s against {len(users)} users...")
+        recorder, elapsed = run_load(make_client, users, args.duration, args.workers)
+        results = summarize(recorder, elapsed)
+        print_results(results, elapsed)
+
+        if args.save_baseline:
+            with open(BASELINE_PATH, "w") as f:
+                json.dump({"settings": vars(args), "routes": results}, f, indent=2)
+            print(f"Saved baseline to {BASELINE_PATH}")
+
+        if args.compare:
+            regressions = compare_to_baseline(results, args.tolerance)
+            if regressions:
+                print("\nRegressions against baseline:")
+                for line in regressions:
+                    print(f"  {line}")
+                sys.exit(1)
+            print("\nNo regressions against baseline")
+    finally:
+        if mongod:
+            mongod[0].terminate()
+            mongod[0].wait()
+            shutil.rmtree(mongod[2], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
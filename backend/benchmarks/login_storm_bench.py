@@ -0,0 +1,87 @@
+# login_storm_bench.py
+# How a burst of logins affects everything else: latency of a cheap non-auth route while N threads hammer
+# /api/login, with password hashing inline on the request thread vs in the password_hashing process pool.
+# Uses mongomock, so no database is needed (pip install -r benchmarks/requirements.txt).
+#   python benchmarks/login_storm_bench.py --login-threads 8 --duration 10
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import percentile, use_mongomock  # noqa: E402
+
+
+def measure(app_module, hasher, login_threads, duration, probe_path):
+    app_module.password_hasher = hasher
+    client = app_module.app.test_client()
+    client.post("/api/signup", json={"email": "storm@example.com", "password": "storm-password"})
+
+    stop = threading.Event()
+    logins = {"ok": 0, "busy": 0}
+    lock = threading.Lock()
+
+    def storm():
+        storm_client = app_module.app.test_client()
+        while not stop.is_set():
+            status = storm_client.post("/api/login", json={"email": "storm@example.com", "password": "storm-password"}).status_code
+            with lock:
+                logins["ok" if status == 200 else "busy"] += 1
+            if status == 503:
+                time.sleep(0.1)  # a real client backs off on 503 rather than retrying immediately
+
+    probe_latencies = []
+    threads = [threading.Thread(target=storm, daemon=True) for _ in range(login_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)  # let the storm build up
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        client.get(probe_path)
+        probe_latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    ordered = sorted(probe_latencies)
+    return {
+        "probe_requests": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0,
+        "logins_per_s": round(logins["ok"] / duration, 2),
+        "logins_rejected": logins["busy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Non-auth route latency during a login storm")
+    parser.add_argument("--login-threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--probe", default="/api/tip", help="route to measure while logins run")
+    args = parser.parse_args()
+
+    use_mongomock()
+    import app as app_module
+    from password_hashing import HASH_QUEUE, HASH_WORKERS, PasswordHasher
+
+    print(f"{args.login_threads} login threads, probing {args.probe} for {args.duration}s each run, {os.cpu_count()} cpu(s)\n")
+    baseline = measure(app_module, PasswordHasher(workers=0), 0, args.duration / 2, args.probe)
+    print(f"{'no logins':28} {baseline}")
+    inline = measure(app_module, PasswordHasher(workers=0), args.login_threads, args.duration, args.probe)
+    print(f"{'inline hashing':28} {inline}")
+    pooled_hasher = PasswordHasher(workers=HASH_WORKERS, queue_size=HASH_QUEUE)
+    pooled = measure(app_module, pooled_hasher, args.login_threads, args.duration, args.probe)
+    pooled_hasher.shutdown()
+    print(f"{f'process pool ({HASH_WORKERS} workers)':28} {pooled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# recipe_index_bench.py
+# Build time, incremental add cost and lookup latency of recipe_index.RecipeIndex as the corpus grows, and how
+# often reworded requests for meals already in the corpus are answered locally (vs unrelated requests, which
+# should fall through to the model). No database needed - the corpus is synthetic.
+#   python benchmarks/recipe_index_bench.py --sizes 1000 5000 20000 --queries 500
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.objectid import ObjectId  # noqa: E402
+
+from recipe_index import RecipeIndex  # noqa: E402
+
+PROTEINS = ["chicken", "salmon", "tofu", "beef", "turkey", "shrimp", "tempeh", "lentil", "egg", "chickpea", "cod", "pork"]
+BASES = ["quinoa", "rice", "pasta", "noodle", "couscous", "sweet potato", "oat", "wrap", "salad", "barley", "polenta"]
+STYLES = ["bowl", "stir fry", "curry", "tacos", "skillet", "bake", "soup", "salad", "burrito", "risotto", "kebab"]
+FLAVOURS = ["teriyaki", "lemon herb", "cajun", "pesto", "thai peanut", "smoky bbq", "garlic ginger", "mediterranean",
+            "harissa", "miso", "chipotle", "coconut lime"]
+VEGETABLES = ["spinach", "broccoli", "peppers", "kale", "zucchini", "mushrooms", "carrots", "avocado", "tomatoes",
+              "cucumber", "onion", "peas", "cauliflower", "cabbage"]
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snack"]
+DIETS = [[], [], [], ["Vegetarian"], ["Vegan"], ["Gluten-free"], ["Halal"]]
+
+
+def synthetic_meal():
+    protein, base, style, flavour = (random.choice(PROTEINS), random.choice(BASES), random.choice(STYLES),
+                                     random.choice(FLAVOURS))
+    vegetables = random.sample(VEGETABLES, 3)
+    name = f"{flavour.title()} {protein.title()} {base.title()} {style.title()}"
+    details = {
+        "meal_type": random.choice(MEAL_TYPES),
+        "calories": random.choice([300, 400, 500, 600, 700, 800]),
+        "dietary_preferences": random.choice(DIETS),
+        "dishes": [{
+            "name": name,
+            "ingredients": [f"150g {protein}", f"1 cup {base}"] + [f"1 handful {veg}" for veg in vegetables],
+            "instructions": f"Cook the {base}, sear the {protein} and toss with the vegetables.",
+            "protein": 30, "carbs": 40, "fat": 15,
+        }],
+    }
+    entry = {
+        "_id": ObjectId(), "meal_type": details["meal_type"], "calories": details["calories"],
+        "meal_request": random.choice(["", f"{flavour} {protein}", f"{protein} {style}", f"something with {base}"]),
+        "meal_details": json.dumps(details),
+    }
+    return entry, (protein, base, style, flavour, vegetables)
+
+
+def reworded(entry, parts):
+    protein, base, style, flavour, vegetables = parts
+    return random.choice([
+        f"{protein} {style} with {base}",
+        f"{flavour} {protein} and {base} {style}",
+        f"a {style} of {protein}, {vegetables[0]} and {base}",
+    ])
+
+
+def unrelated():
+    return random.choice(["pancakes with maple syrup", "chocolate protein shake", "beef wellington",
+                          "sushi platter", "greek yogurt parfait with berries", "margherita pizza"])
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def run(size, queries):
+    corpus = [synthetic_meal() for _ in range(size)]
+    index = RecipeIndex(db=None, refresh_seconds=float("inf"))
+    index._refreshed_at = time.monotonic()  # nothing to refresh from
+
+    start = time.perf_counter()
+    for entry, _ in corpus:
+        index.add_meal(entry)
+    build = time.perf_counter() - start
+
+    extra, _ = synthetic_meal()
+    start = time.perf_counter()
+    index.add_meal(extra)
+    add = time.perf_counter() - start
+    start = time.perf_counter()
+    index.match("Lunch", [], "chicken bowl", 500)  # first query after an add re-weights the corpus
+    reweight = time.perf_counter() - start
+
+    latencies, hits, false_hits = [], 0, 0
+    for _ in range(queries):
+        entry, parts = random.choice(corpus)
+        details = json.loads(entry["meal_details"])
+        start = time.perf_counter()
+        match = index.match(details["meal_type"], details["dietary_preferences"], reworded(entry, parts),
+                            details["calories"] + random.randint(-40, 40))
+        latencies.append(time.perf_counter() - start)
+        hits += match is not None
+        false_hits += index.match(random.choice(MEAL_TYPES), [], unrelated(), 500) is not None
+
+    print(f"  {size:>7} meals ({len(index):>6} indexed, {len(index.vocabulary):>4} terms)  build {build * 1000:>7.0f} ms"
+          f"  add {add * 1e6:>5.0f} us  re-weight {reweight * 1000:>5.1f} ms"
+          f"  match p50 {statistics.median(latencies) * 1000:>5.2f} ms  p99 {percentile(latencies, 0.99) * 1000:>5.2f} ms"
+          f"  reworded hit {hits / queries:>5.1%}  unrelated hit {false_hits / queries:>5.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recipe index build/match cost and hit rates")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    for size in args.sizes:
+        run(size, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# streaming_bench.py
+# Time to first byte / first model token / first exercise (or dish) / full response for the blocking
+# generation routes vs their server-sent-event versions, against the fake OpenAI server.
+# Uses mongomock, no database needed.
+#   python benchmarks/streaming_bench.py --latency 3 --runs 5
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server  # noqa: E402
+from load_test import use_mongomock  # noqa: E402
+
+
+def blocking(client, path, body):
+    start = time.perf_counter()
+    response = client.post(path, json=body)
+    elapsed = time.perf_counter() - start
+    # nothing is on screen until the whole body arrives
+    return {"first_byte": elapsed, "first_token": elapsed, "first_item": elapsed, "total": elapsed,
+            "status": response.status_code}
+
+
+def streamed(client, path, body, item_event):
+    start = time.perf_counter()
+    response = client.post(path, json=body, buffered=False)
+    timings = {"first_byte": None, "first_token": None, "first_item": None, "status": response.status_code}
+    for chunk in response.response:
+        now = time.perf_counter() - start
+        if timings["first_byte"] is None:
+            timings["first_byte"] = now
+        if timings["first_token"] is None and b"event: token" in chunk:
+            timings["first_token"] = now
+        if timings["first_item"] is None and f"event: {item_event}".encode() in chunk:
+            timings["first_item"] = now
+    response.close()
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def summarise(label, runs):
+    print(f"  {label:22}" + "".join(
+        f"{statistics.median(run[key] for run in runs) * 1000:>14.0f}" for key in ("first_byte", "first_token", "first_item", "total")
+    ) + f"   statuses {sorted({run['status'] for run in runs})}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocking vs SSE generation latency")
+    parser.add_argument("--latency", type=float, default=3.0, help="fake completion time (s)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency, jitter=0)
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LLM_CACHE_HIT_RATIO"] = "0"  # always call the (fake) model
+    use_mongomock()
+    import openai
+    openai.api_base = base_url
+    import app as app_module
+
+    client = app_module.app.test_client()
+    user_id = str(app_module.db.users.insert_one({"email": "stream@example.com", "dietary_preferences": []}).inserted_id)
+    workout = {"user_id": user_id, "goal": "Lose Weight", "experience_level": "beginner", "time_available": 30, "mode": "ai"}
+    meal = {"user_id": user_id, "meal_type": "Lunch", "calories": 500}
+
+    print(f"fake completion latency {args.latency}s, median of {args.runs} runs (ms)\n")
+    print(f"  {'':22}{'first byte':>14}{'first token':>14}{'first item':>14}{'total':>14}")
+    for name, path, body, item_event in (("workout", "/api/generate-workout", workout, "exercise"),
+                                         ("meal", "/api/generate-meal", meal, "dish")):
+        summarise(f"{name} blocking", [blocking(client, path, body) for _ in range(args.runs)])
+        summarise(f"{name} stream", [streamed(client, path + "/stream", body, item_event) for _ in range(args.runs)])
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# write_behind_bench.py
+# Insert-heavy routes (POST /api/workout-logs, POST /api/shopping-list) with inline inserts vs the write-behind
+# queue. Runs in process on mongomock with a simulated round trip added to every insert call, so the number of
+# round trips - what write-behind saves - shows up in the latency; with a real mongod the RTT is simply real.
+#   python benchmarks/write_behind_bench.py --rtt-ms 2 --workers 16 --duration 5
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import use_mongomock, workout_log  # noqa: E402
+
+
+def add_round_trip(rtt, counter):
+    """Every insert_one / insert_many costs one simulated network round trip"""
+    import mongomock
+    lock = threading.Lock()
+    for name in ("insert_one", "insert_many"):
+        original = getattr(mongomock.Collection, name)
+
+        def delayed(self, *args, _original=original, **kwargs):
+            with lock:
+                counter[0] += 1
+            time.sleep(rtt)
+            return _original(self, *args, **kwargs)
+        setattr(mongomock.Collection, name, delayed)
+
+
+def run(app, user_id, workers, duration):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(n):
+        client = app.test_client()
+        local = []
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if i % 2:
+                client.post("/api/shopping-list", json={"user_id": user_id, "item_name": f"item {n}-{i}"})
+            else:
+                client.post("/api/workout-logs", json=workout_log(user_id))
+            local.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline inserts vs write-behind batching")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="simulated mongo round trip per insert call")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    use_mongomock()
+    round_trips = [0]
+    add_round_trip(args.rtt_ms / 1000, round_trips)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    import app as app_module
+
+    user_id = str(app_module.db.users.insert_one({"email": "writes@example.com"}).inserted_id)
+    queue = app_module.write_queue
+    print(f"{args.workers} workers, {args.duration}s, {args.rtt_ms} ms per insert round trip\n")
+    print(f"  {'mode':14}{'requests':>10}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'round trips':>13}{'docs/trip':>11}")
+    for mode, enabled in (("inline", False), ("write-behind", True)):
+        queue.enabled = enabled
+        before_trips = round_trips[0]
+        before_docs = sum(app_module.db[name].count_documents({}) for name in ("workout_logs", "shopping_list"))
+        latencies, elapsed = run(app_module.app, user_id, args.workers, args.duration)
+        queue.flush()
+        trips = round_trips[0] - before_trips
+        docs = sum(app_module.db[name].count_documents({}) for name in ("workout_logs", "shopping_list")) - before_docs
+        latencies.sort()
+        print(f"  {mode:14}{len(latencies):>10}{len(latencies) / elapsed:>10.0f}"
+              f"{statistics.median(latencies) * 1000:>9.2f}{latencies[int(len(latencies) * 0.99)] * 1000:>9.2f}"
+              f"{trips:>13}{docs / max(trips, 1):>11.1f}")
+        if docs != len(latencies):
+            print(f"  !! {len(latencies)} requests but {docs} documents written")
+    queue.close()
+    print(f"\n  {queue.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# dashboard.py
+# Everything Dashboard.js needs on load in one response: the profile, the workouts for the user's goal,
+# their latest AI workouts and a tip. The mongo reads are independent so they run concurrently on a small
+# shared thread pool; goal workouts and the tip come from the in-memory reference cache.
+# Each section's time is returned too, and the route sends it as a Server-Timing header.
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from projections import SUMMARY_FIELDS
+
+load_dotenv()
+
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", 8))
+DASHBOARD_RECENT_WORKOUTS = int(os.getenv("DASHBOARD_RECENT_WORKOUTS", 5))
+
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+
+def _timed(timings, name, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+def _profile(db, user_id):
+    return db.users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
+
+
+def _recent_workouts(db, user_id, limit):
+    # summary fields only - the dashboard lists these by date and goal
+    projection = {field: 1 for field in SUMMARY_FIELDS["workout_history"]}
+    return list(db.workout_history.find({"user_id": user_id}, projection).sort("date", -1).limit(limit))
+
+
+def _latest_workout(db, user_id):
+    # the one workout the dashboard renders in full
+    return db.workout_history.find_one({"user_id": user_id}, {"_id": 0}, sort=[("date", -1)])
+
+
+def build_dashboard(db, reference_cache, user_id, recent_limit=DASHBOARD_RECENT_WORKOUTS):
+    """
+    Returns (payload, timings_ms) or (None, timings_ms) when the user doesn't exist.
+    Raises bson.errors.InvalidId for a malformed user id.
+    """
+    ObjectId(user_id)  # fail fast before anything is submitted
+    timings = {}
+    start = time.perf_counter()
+
+    profile_future = _executor.submit(_timed, timings, "profile", _profile, db, user_id)
+    recent_future = _executor.submit(_timed, timings, "recent", _recent_workouts, db, user_id, recent_limit)
+    latest_future = _executor.submit(_timed, timings, "latest", _latest_workout, db, user_id)
+    tip = _timed(timings, "tip", reference_cache.tip_text)
+
+    profile = profile_future.result()
+    if profile is None:
+        recent_future.cancel()
+        latest_future.cancel()
+        return None, timings
+    goal = profile.get("goals")
+    # needs the profile's goal, but it's an in-memory lookup
+    goal_workouts = _timed(timings, "goal_workouts", reference_cache.workout_list, goal) if goal else []
+
+    payload = {
+        "user": profile,
+        "workouts": goal_workouts,
+        "ai_workouts": recent_future.result(),
+        "latest_ai_workout": latest_future.result(),
+        "tip": tip,
+    }
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return payload, timings
+
+
+def server_timing(timings):
+    """Server-Timing header value - shows up per section in the browser's network panel"""
+    return ", ".join(f"{name};dur={value:.1f}" for name, value in timings.items())
@@ -0,0 +1,89 @@
+# dates.py
+# Dates are stored as native BSON datetimes (naive, UTC - what pymongo hands back) instead of formatted strings,
+# so the (user_id, date) indexes sort and range-scan on real time and TTL indexes can expire old documents.
+# Older documents still carry '%Y-%m-%d' / '%Y-%m-%d %H:%M:%S' strings until migrate_dates.py has converted them;
+# parse_date() reads both.
+# The history routes take ?from=&to= (YYYY-MM-DD or full ISO 8601) - range_query() turns them into the filter.
+from datetime import datetime, time, timedelta, timezone
+
+from flask import request
+
+# collection -> the date fields it stores; migrate_dates.py converts these, db_indexes.py puts TTLs on them
+DATE_FIELDS = {
+    "workout_history": ("date",),
+    "workout_logs": ("date",),
+    "workout_sets": ("date",),
+    "meal_history": ("date",),
+    "saved_recipes": ("date_saved",),
+    "shopping_list": ("date_added",),
+    "workout_insights": ("generation_date",),
+}
+
+
+def utcnow():
+    """Now as a naive UTC datetime, truncated to the millisecond BSON keeps so it reads back unchanged"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def _to_utc(value, local):
+    """Naive UTC from an aware datetime, or from a naive one in local time (local=True) or already UTC"""
+    if value.tzinfo is None and not local:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_date(value, local=False):
+    """
+    A stored or requested date as a naive UTC datetime, None if it isn't one.
+    Plain days ('2025-01-29') are midnight UTC - they name a calendar day, not a moment, so no zone applies.
+    Times without an offset are UTC, or server local time with local=True (how the legacy strings were written).
+    """
+    if isinstance(value, datetime):
+        return _to_utc(value, False)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if len(value) == 10:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return None
+    try:
+        # covers the legacy '%Y-%m-%d %H:%M:%S' too
+        return _to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")), local)
+    except ValueError:
+        return None
+
+
+def date_range(start=None, end=None):
+    """
+    Mongo condition for start <= date <= end, None when neither is given. A plain day as `end` covers that
+    whole day. Raises ValueError for values that aren't dates or a range that ends before it starts.
+    """
+    condition = {}
+    if start:
+        parsed = parse_date(start)
+        if parsed is None:
+            raise ValueError("from must be a date (YYYY-MM-DD) or an ISO 8601 time")
+        condition["$gte"] = parsed
+    if end:
+        parsed = parse_date(end)
+        if parsed is None:
+            raise ValueError("to must be a date (YYYY-MM-DD) or an ISO 8601 time")
+        if len(end.strip()) == 10:
+            condition["$lt"] = datetime.combine(parsed.date() + timedelta(days=1), time.min)
+        else:
+            condition["$lte"] = parsed
+    lower = condition.get("$gte")
+    if lower and (lower >= condition.get("$lt", datetime.max) or lower > condition.get("$lte", datetime.max)):
+        raise ValueError("from must not be after to")
+    return condition or None
+
+
+def range_query(query, date_field="date"):
+    """query with the request's ?from=&to= range on date_field added (unchanged when neither was sent)"""
+    condition = date_range(request.args.get("from"), request.args.get("to"))
+    if condition is None:
+        return query
+    return {**query, date_field: condition}
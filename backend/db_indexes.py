@@ -0,0 +1,194 @@
+# db_indexes.py
+# Every index the app relies on lives here, so app.py and db_setup.py create the same ones.
+#   python db_indexes.py         -> create any missing indexes (safe to re-run)
+#   python db_indexes.py audit   -> explain() each route's query and fail if any of them is a COLLSCAN
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+from dates import DATE_FIELDS
+
+load_dotenv()
+
+# collection -> list of (keys, options). create_index is a no-op when the index already exists.
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    "workout_logs": [
+        ([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    # lift_sets.py - per-exercise reads, and the sets to replace when a log is edited
+    "workout_sets": [
+        ([("user_id", ASCENDING), ("exercise", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("log_id", ASCENDING)], {}),
+    ],
+    "workout_history": [
+        ([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "meal_history": [
+        ([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "saved_recipes": [
+        ([("user_id", ASCENDING), ("date_saved", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "shopping_list": [
+        ([("user_id", ASCENDING), ("purchased", ASCENDING)], {}),
+    ],
+    "workout_bank": [
+        ([("user_id", ASCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "workout_plans": [
+        ([("user_id", ASCENDING), ("plan_name", ASCENDING)], {}),
+    ],
+    "workout_insights": [
+        ([("user_id", ASCENDING), ("generation_date", DESCENDING)], {}),
+    ],
+    "workouts": [
+        ([("goal", ASCENDING)], {}),
+    ],
+    "exercise_library": [
+        ([("category", ASCENDING)], {}),
+    ],
+    # llm_cache.py - each document carries its own expiry, so the TTL index uses expireAfterSeconds=0
+    "llm_cache": [
+        ([("key", ASCENDING), ("created_at", DESCENDING)], {}),
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+# Optional retention: RETENTION_DAYS_<COLLECTION>=N (e.g. RETENTION_DAYS_MEAL_HISTORY=365) adds a TTL index on that
+# collection's date field (dates.DATE_FIELDS) and mongo deletes documents N days after their date. Only BSON dates
+# ever expire, so run migrate_dates.py first or older documents stay. Unsetting the variable doesn't drop the index.
+def retention_indexes():
+    specs = {}
+    for collection, fields in DATE_FIELDS.items():
+        days = os.getenv(f"RETENTION_DAYS_{collection.upper()}")
+        if days:
+            specs[collection] = [([(fields[0], ASCENDING)], {"expireAfterSeconds": int(float(days) * 86400)})]
+    return specs
+
+
+SAMPLE_RANGE = {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 2, 1)}
+
+# The query each route runs: (route, collection, filter, sort). Sample values are fine - only the shape matters to the planner.
+QUERY_SHAPES = [
+    ("POST /api/signup, /api/login", "users", {"email": "audit@example.com"}, None),
+    ("GET /api/workouts/<goal>", "workouts", {"goal": "Lose Weight"}, None),
+    ("GET /api/workout-history/<user_id>", "workout_history", {"user_id": "audit"}, [("date", -1)]),
+    ("GET /api/workout-logs/<user_id>", "workout_logs", {"user_id": "audit"}, [("date", -1)]),
+    ("GET /api/workout-history/<user_id>?from=&to=", "workout_history", {"user_id": "audit", "date": SAMPLE_RANGE},
+     [("date", -1)]),
+    ("GET /api/workout-logs/<user_id>?from=&to=", "workout_logs", {"user_id": "audit", "date": SAMPLE_RANGE},
+     [("date", -1)]),
+    ("GET /api/analytics/<user_id>", "workout_logs", {"user_id": "audit", "date": SAMPLE_RANGE}, None),
+    ("GET /api/workout-sets/<user_id>/<exercise>", "workout_sets",
+     {"user_id": "audit", "exercise": "bench press", "date": SAMPLE_RANGE}, [("date", -1), ("_id", -1)]),
+    ("GET /api/workout-sets/<user_id>", "workout_sets", {"user_id": "audit"}, None),
+    ("PUT /api/workout-logs/<log_id> (sets)", "workout_sets", {"log_id": "audit"}, None),
+    ("GET /api/workout-bank/<user_id>", "workout_bank", {"user_id": "audit"}, None),
+    ("PUT/DELETE /api/workout-plan", "workout_plans", {"user_id": "audit", "plan_name": "audit"}, None),
+    ("GET /api/workout-plans/<user_id>", "workout_plans", {"user_id": "audit"}, None),
+    ("GET /api/exercise-library?category=", "exercise_library", {"category": "strength"}, None),
+    ("GET /api/meal-history/<user_id>", "meal_history", {"user_id": "audit"}, [("date", -1)]),
+    ("GET /api/meal-history/<user_id>?from=&to=", "meal_history", {"user_id": "audit", "date": SAMPLE_RANGE},
+     [("date", -1)]),
+    ("GET /api/saved-recipes/<user_id>", "saved_recipes", {"user_id": "audit"}, None),
+    ("GET /api/saved-recipes/<user_id>?from=&to=", "saved_recipes", {"user_id": "audit", "date_saved": SAMPLE_RANGE},
+     [("date_saved", -1)]),
+    ("GET /api/shopping-list/<user_id>", "shopping_list", {"user_id": "audit"}, None),
+    ("GET /api/workout-insights/<user_id>", "workout_insights", {"user_id": "audit"}, [("generation_date", -1)]),
+    ("POST /api/generate-workout (cache)", "llm_cache", {"key": "audit"}, [("created_at", -1)]),
+]
+
+
+INDEX_OPTIONS_CONFLICT = 85
+
+# Older (user_id, date) indexes that are prefixes of the (user_id, date, _id) ones above - the planner can use the
+# longer index for everything they served, and each extra index costs every insert, so they are dropped
+SUPERSEDED_INDEXES = {
+    "workout_logs": ["user_id_1_date_-1"],
+    "workout_history": ["user_id_1_date_-1"],
+    "meal_history": ["user_id_1_date_-1"],
+    "saved_recipes": ["user_id_1_date_saved_-1"],
+}
+
+
+def ensure_indexes(db):
+    """Create every index in INDEXES plus the retention TTLs and drop SUPERSEDED_INDEXES. Returns the names created/confirmed; failures are printed, not raised."""
+    names = []
+    retention = retention_indexes()
+    for collection in dict.fromkeys([*INDEXES, *retention]):
+        for keys, options in INDEXES.get(collection, []) + retention.get(collection, []):
+            try:
+                names.append(f"{collection}.{db[collection].create_index(keys, **options)}")
+            except OperationFailure as e:
+                if e.code == INDEX_OPTIONS_CONFLICT and "expireAfterSeconds" in options:
+                    # the retention period changed - collMod updates the TTL in place
+                    try:
+                        db.command("collMod", collection, index={"keyPattern": dict(keys),
+                                                                 "expireAfterSeconds": options["expireAfterSeconds"]})
+                        names.append(f"{collection}.{keys[0][0]}_ttl_updated")
+                        continue
+                    except OperationFailure as collmod_error:
+                        e = collmod_error
+                # e.g. duplicate emails already in users blocking the unique index
+                print(f"Could not create index on {collection} {keys}: {e}")
+    for collection, index_names in SUPERSEDED_INDEXES.items():
+        try:
+            existing = db[collection].index_information()
+            for name in index_names:
+                if name in existing:
+                    db[collection].drop_index(name)
+                    print(f"Dropped {collection}.{name} (superseded)")
+        except OperationFailure as e:
+            print(f"Could not drop superseded indexes on {collection}: {e}")
+    return names
+
+
+def plan_stages(plan):
+    """Every 'stage' name anywhere in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+def audit_queries(db):
+    """explain() each entry in QUERY_SHAPES, returns a list of (route, collection, stages) that use a COLLSCAN"""
+    failures = []
+    for route, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(plan_stages(winning_plan))
+        print(f"{route:45} {collection:18} {' > '.join(stages)}")
+        if "COLLSCAN" in stages:
+            failures.append((route, collection, stages))
+    return failures
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    db = client["fitness_app"]
+
+    created = ensure_indexes(db)
+    print(f"Ensured {len(created)} indexes")
+
+    if len(sys.argv) > 1 and sys.argv[1] == "audit":
+        failures = audit_queries(db)
+        if failures:
+            print(f"\n{len(failures)} route(s) fall back to a collection scan:")
+            for route, collection, _ in failures:
+                print(f"  {route} on {collection}")
+            sys.exit(1)
+        print("\nNo collection scans found")
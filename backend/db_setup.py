@@ -1,5 +1,10 @@
+from datetime import datetime
+
 from pymongo import MongoClient
 
+from db_indexes import ensure_indexes
+from reference_cache import bump_version
+
 # MongoDB Connection URI
 MONGO_URI = "mongodb://localhost:27017/"
 
@@ -63,6 +68,7 @@ def setup_database():
         }
     ])
     print("Inserted sample workouts into 'workouts' collection.")
+    bump_version(db, "workouts")  # running servers reload their cached workouts
 
 
     # Create Meals Collection
@@ -76,17 +82,21 @@ def setup_database():
     })
     print("Inserted sample meal into 'meals' collection.")
 
+    # Indexes for every collection (including workout_logs) - see db_indexes.py
+    ensure_indexes(db)
+    print("Ensured indexes.")
+
 
     # Add this to your existing db_setup.py
 
 def setup_workout_tracking():
-    # Create Workout Logs Collection
-    db.workout_logs.create_index([("user_id", 1), ("date", -1)])
+    # Create Workout Logs Collection - the (user_id, date) index now comes from db_indexes.py
+    ensure_indexes(db)
     
     # Sample workout log
     db.workout_logs.insert_one({
         "user_id": "sample_user_id",
-        "date": "2025-01-29",
+        "date": datetime(2025, 1, 29),
         "exercises": [
             {
                 "name": "Bench Press",
@@ -115,7 +125,7 @@ def setup_workout_tracking():
     # Create the workout_history collection with sample data (optional)
     db.workout_history.insert_one({
         "user_id": "example_user_id",
-        "date": "2025-01-21",
+        "date": datetime(2025, 1, 21),
         "workout_details": "Sample workout plan goes here."
     })
     print("Workout history collection created!")
@@ -0,0 +1,100 @@
+# exercise_search.py
+# In-memory inverted index over the exercise library for /api/exercise-library/search.
+# Filters (muscles, category, difficulty) are set intersections over posting lists, and free text is
+# matched by prefix against a sorted vocabulary of words from names and instructions, so lookups stay
+# fast as the library grows. Built by reference_cache.py whenever the library is (re)loaded.
+import heapq
+import re
+from bisect import bisect_left
+
+# Weight of a word depending on where it appears - a hit in the name counts more than one in the instructions
+FIELD_WEIGHTS = {"name": 3, "instructions": 1}
+EXACT_WORD_BONUS = 2
+NAME_PREFIX_BONUS = 5
+MATCH_MODES = ("any", "all")
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class ExerciseSearchIndex:
+    def __init__(self, exercises):
+        self.exercises = list(exercises)
+        self.by_muscle = {}
+        self.by_category = {}
+        self.by_difficulty = {}
+        self.postings = {}  # word -> {exercise id: best field weight}
+
+        for i, exercise in enumerate(self.exercises):
+            for muscle in exercise.get("muscles_targeted", []):
+                self.by_muscle.setdefault(muscle.lower(), set()).add(i)
+            self.by_category.setdefault((exercise.get("category") or "").lower(), set()).add(i)
+            self.by_difficulty.setdefault((exercise.get("difficulty") or "").lower(), set()).add(i)
+            for field, weight in FIELD_WEIGHTS.items():
+                for word in tokenize(exercise.get(field)):
+                    docs = self.postings.setdefault(word, {})
+                    docs[i] = max(docs.get(i, 0), weight)
+
+        self.vocabulary = sorted(self.postings)
+        self.names = [(exercise.get("name") or "").lower() for exercise in self.exercises]
+
+    def _prefix_matches(self, prefix):
+        """{exercise id: score} for every word starting with prefix"""
+        matches = {}
+        start = bisect_left(self.vocabulary, prefix)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            bonus = EXACT_WORD_BONUS if word == prefix else 1
+            for i, weight in self.postings[word].items():
+                matches[i] = max(matches.get(i, 0), weight * bonus)
+        return matches
+
+    def search(self, text=None, muscles=None, match="any", category=None, difficulty=None, limit=20, offset=0):
+        """Returns (total matches, exercises for the requested page) ranked best match first"""
+        candidates = None
+        scores = {}
+
+        def narrow(ids):
+            nonlocal candidates
+            candidates = set(ids) if candidates is None else candidates & ids
+
+        if category:
+            narrow(self.by_category.get(category.lower(), set()))
+        if difficulty:
+            narrow(self.by_difficulty.get(difficulty.lower(), set()))
+
+        if muscles:
+            muscle_sets = [self.by_muscle.get(m.lower(), set()) for m in muscles]
+            if match == "all":
+                narrow(set.intersection(*muscle_sets))
+            else:
+                narrow(set().union(*muscle_sets))
+            # more of the requested muscles hit = better match
+            for ids in muscle_sets:
+                for i in ids:
+                    scores[i] = scores.get(i, 0) + 1
+
+        words = tokenize(text)
+        if words:
+            # every word has to match something (as a prefix), scores add up across words
+            for word in words:
+                matches = self._prefix_matches(word)
+                narrow(set(matches))
+                for i, score in matches.items():
+                    scores[i] = scores.get(i, 0) + score
+            phrase = " ".join(words)
+            for i in candidates:
+                if self.names[i].startswith(phrase):
+                    scores[i] = scores.get(i, 0) + NAME_PREFIX_BONUS
+
+        if candidates is None:
+            candidates = range(len(self.exercises))
+
+        # only the top offset+limit need ordering, not every match
+        candidates = list(candidates)
+        ranked = heapq.nsmallest(offset + limit, candidates, key=lambda i: (-scores.get(i, 0), self.names[i]))
+        return len(candidates), [self.exercises[i] for i in ranked[offset:]]
@@ -3,36 +3,28 @@ import json
 import os
 import re
 import random
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from llm_client import llm
+from llm_json import MEAL_SCHEMA, parse_llm_json
 
 # Load environment variables from .env file
 load_dotenv()
 
-def clean_json(json_string):
-    """Clean a potentially dirty JSON string with control characters"""
-    # Replace common control characters
-    cleaned = json_string.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-    
-    # Handle escape characters properly
-    cleaned = cleaned.replace('\\', '\\\\')
-    
-    # Remove any other control characters
-    cleaned = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', cleaned)
-    
-    # Sometimes the API returns extra text before or after the JSON
-    # Try to extract just the JSON part
-    json_pattern = r'(\{.*\})'
-    match = re.search(json_pattern, cleaned)
-    if match:
-        cleaned = match.group(1)
-        
-    return cleaned
+# Max OpenAI calls in flight for one batch (weekly meal plan) request
+MEAL_BATCH_CONCURRENCY = int(os.getenv("MEAL_BATCH_CONCURRENCY", 4))
 
-def generate_meal(meal_type, preferences, meal_request=None, calories=None):
-    # Get API key from env
-    openai.api_key = os.getenv('OPENAI_API_KEY')
-    
+# Filler instructions of the fallback meals - recipe_index.py leaves meals containing them out of the corpus
+FILLER_INSTRUCTIONS = "Prepare ingredients according to dietary preferences. Cook thoroughly and serve hot."
+FALLBACK_INSTRUCTIONS = "Cook ingredients according to dietary preferences. Season to taste and serve fresh."
+BASIC_FALLBACK_INSTRUCTIONS = "Prepare according to dietary preferences"
+PLACEHOLDER_INSTRUCTIONS = {FILLER_INSTRUCTIONS, FALLBACK_INSTRUCTIONS, BASIC_FALLBACK_INSTRUCTIONS}
+
+def meal_request_args(meal_type, preferences, meal_request=None, calories=None, seed=None):
+    """
+    Chat completion arguments for the meal prompt - shared by the blocking and streamed calls.
+    seed sets apart calls that would otherwise be identical (the slots of one plan), so they aren't coalesced.
+    """
     # Create calorie restriction text if provided
     calorie_text = f"around {calories} calories" if calories else "a reasonable calorie count"
     
@@ -41,23 +33,21 @@ def generate_meal(meal_type, preferences, meal_request=None, calories=None):
     if preferences and len(preferences) > 0:
         preference_text = f"The meal must strictly adhere to these dietary preferences: {', '.join(preferences)}."
     
-    # Create a unique seed for each request to force variation
-    random_seed = int(time.time()) + random.randint(1, 10000)
-    
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are a culinary AI that specializes in structured data output.
+    # No seed for a single meal: identical requests then have identical kwargs, which llm_client coalesces
+    # into one OpenAI call. Variety comes from the temperature.
+    args = dict(
+        model="gpt-3.5-turbo",
+        messages=[
+            {
+                "role": "system", 
+                "content": """You are a culinary AI that specializes in structured data output.
                     You MUST ALWAYS return ONLY valid JSON with NO control characters.
                     Do not include any text or explanations outside the JSON structure.
                     The JSON must be properly escaped and formatted."""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Generate a unique {meal_type} recipe with {calorie_text}.
+            },
+            {
+                "role": "user",
+                "content": f"""Generate a unique {meal_type} recipe with {calorie_text}.
                     
                     {"SPECIFIC REQUEST: " + meal_request if meal_request else "Create something original and unexpected."}
                     
@@ -88,121 +78,163 @@ def generate_meal(meal_type, preferences, meal_request=None, calories=None):
                     Do NOT include a 'meal_request' field in your JSON response.
                     Make sure the dish name is descriptive and based on {meal_request if meal_request else "creative culinary concepts"}.
                     """
-                }
-            ],
-            max_tokens=1000,
-            temperature=0.9,
-            presence_penalty=0.6,
-            frequency_penalty=0.6,
-            seed=random_seed
-        )
-        
-        meal_plan = response['choices'][0]['message']['content'].strip()
-        
-        # Clean the JSON string
-        cleaned_json = clean_json(meal_plan)
-        print(f"Cleaned JSON: {cleaned_json[:100]}...")  # Print first 100 chars
-        
-        try:
-            meal_data = json.loads(cleaned_json)
+            }
+        ],
+        max_tokens=1000,
+        temperature=0.9,
+        presence_penalty=0.6,
+        frequency_penalty=0.6
+    )
+    if seed is not None:
+        args["seed"] = seed
+    return args
+
+
+def finalize_meal(meal_plan, meal_type, preferences, meal_request=None, calories=None):
+    """Completion text -> meal JSON string, tidied up, or a fallback meal built from the request if it won't parse"""
+    try:
+        # pulls the object out of any surrounding text, repairs it and checks it looks like a meal (llm_json.py)
+        meal_data = parse_llm_json(meal_plan, MEAL_SCHEMA)
             
-            # Remove meal_request field if it exists
-            if "meal_request" in meal_data:
-                del meal_data["meal_request"]
+        # Remove meal_request field if it exists
+        if "meal_request" in meal_data:
+            del meal_data["meal_request"]
             
-            # Ensure the dish has a proper name (not just "Creative 400" or similar)
-            if "dishes" in meal_data and len(meal_data["dishes"]) > 0:
-                dish_name = meal_data["dishes"][0].get("name", "")
+        # Ensure the dish has a proper name (not just "Creative 400" or similar)
+        if "dishes" in meal_data and len(meal_data["dishes"]) > 0:
+            dish_name = meal_data["dishes"][0].get("name", "")
                 
-                # Check if the name is just "Creative" followed by a number
-                if re.match(r'^Creative\s+\d+$', dish_name) or dish_name.isdigit():
-                    if meal_request:
-                        meal_data["dishes"][0]["name"] = f"{meal_request.title()} Special"
-                    else:
-                        meal_data["dishes"][0]["name"] = f"Chef's {meal_type} Special"
+            # Check if the name is just "Creative" followed by a number
+            if re.match(r'^Creative\s+\d+$', dish_name) or dish_name.isdigit():
+                if meal_request:
+                    meal_data["dishes"][0]["name"] = f"{meal_request.title()} Special"
+                else:
+                    meal_data["dishes"][0]["name"] = f"Chef's {meal_type} Special"
             
-            # Ensure calories match what was requested
-            if calories:
-                meal_data["calories"] = int(calories)
+        # Ensure calories match what was requested
+        if calories:
+            meal_data["calories"] = int(calories)
             
-            # Ensure the dish has actual ingredients and instructions
-            if "dishes" in meal_data:
-                for dish in meal_data["dishes"]:
-                    if "ingredients" not in dish or len(dish["ingredients"]) <= 1:
-                        dish["ingredients"] = [
-                            f"Protein source compatible with {', '.join(preferences)}",
-                            "Fresh vegetables",
-                            "Herbs and spices",
-                            "Healthy fats",
-                            "Optional garnishes"
-                        ]
+        # Ensure the dish has actual ingredients and instructions
+        if "dishes" in meal_data:
+            for dish in meal_data["dishes"]:
+                if "ingredients" not in dish or len(dish["ingredients"]) <= 1:
+                    dish["ingredients"] = [
+                        f"Protein source compatible with {', '.join(preferences)}",
+                        "Fresh vegetables",
+                        "Herbs and spices",
+                        "Healthy fats",
+                        "Optional garnishes"
+                    ]
                     
-                    if "instructions" not in dish or dish["instructions"] == "Preparation instructions would go here":
-                        dish["instructions"] = f"Prepare ingredients according to dietary preferences. Cook thoroughly and serve hot."
+                if "instructions" not in dish or dish["instructions"] == "Preparation instructions would go here":
+                    dish["instructions"] = FILLER_INSTRUCTIONS
             
-            return json.dumps(meal_data)
+        return json.dumps(meal_data)
             
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error processing meal JSON: {e}")
-            # Create a more detailed fallback meal
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error processing meal JSON: {e}")
+        # Create a more detailed fallback meal
             
-            # Intelligently create a meal name based on request and preferences
-            meal_name = meal_request
-            if not meal_name:
-                if any(pref.lower() == "vegetarian" or pref.lower() == "vegan" for pref in preferences):
-                    meal_name = "Plant-based Bowl"
-                elif any(pref.lower() == "gluten-free" for pref in preferences):
-                    meal_name = "Gluten-free Plate"
-                elif any(pref.lower() == "halal" for pref in preferences):
-                    meal_name = "Halal Special"
-                else:
-                    meal_name = f"{meal_type} Special"
-            
-            # Intelligently create ingredients based on preferences
-            ingredients = []
+        # Intelligently create a meal name based on request and preferences
+        meal_name = meal_request
+        if not meal_name:
             if any(pref.lower() == "vegetarian" or pref.lower() == "vegan" for pref in preferences):
-                ingredients.extend(["Tofu", "Chickpeas", "Quinoa", "Mixed vegetables"])
-                if any(pref.lower() == "vegetarian" for pref in preferences) and not any(pref.lower() == "vegan" for pref in preferences):
-                    ingredients.append("Feta cheese")
+                meal_name = "Plant-based Bowl"
+            elif any(pref.lower() == "gluten-free" for pref in preferences):
+                meal_name = "Gluten-free Plate"
             elif any(pref.lower() == "halal" for pref in preferences):
-                ingredients.extend(["Halal chicken", "Basmati rice", "Mixed vegetables"])
+                meal_name = "Halal Special"
             else:
-                ingredients.extend(["Protein of choice", "Whole grains", "Mixed vegetables"])
+                meal_name = f"{meal_type} Special"
             
-            # Add appropriate instructions
-            instructions = "Cook ingredients according to dietary preferences. Season to taste and serve fresh."
+        # Intelligently create ingredients based on preferences
+        ingredients = []
+        if any(pref.lower() == "vegetarian" or pref.lower() == "vegan" for pref in preferences):
+            ingredients.extend(["Tofu", "Chickpeas", "Quinoa", "Mixed vegetables"])
+            if any(pref.lower() == "vegetarian" for pref in preferences) and not any(pref.lower() == "vegan" for pref in preferences):
+                ingredients.append("Feta cheese")
+        elif any(pref.lower() == "halal" for pref in preferences):
+            ingredients.extend(["Halal chicken", "Basmati rice", "Mixed vegetables"])
+        else:
+            ingredients.extend(["Protein of choice", "Whole grains", "Mixed vegetables"])
             
-            fallback_meal = {
-                "meal_type": meal_type,
-                "calories": int(calories) if calories else 500,
-                "dietary_preferences": preferences,
-                "dishes": [{
-                    "name": meal_name if meal_name else f"{meal_type} Special",
-                    "ingredients": ingredients,
-                    "instructions": instructions,
-                    "protein": 25,
-                    "carbs": 35,
-                    "fat": 15
-                }]
-            }
-            return json.dumps(fallback_meal)
+        # Add appropriate instructions
+        instructions = FALLBACK_INSTRUCTIONS
             
-    except Exception as e:
-        print(f"Exception in meal generation: {e}")
-        # Even more basic fallback
-        basic_fallback = {
+        fallback_meal = {
             "meal_type": meal_type,
             "calories": int(calories) if calories else 500,
             "dietary_preferences": preferences,
             "dishes": [{
-                "name": meal_request if meal_request else f"Healthy {meal_type}",
-                "ingredients": [
-                    f"Ingredients suitable for {', '.join(preferences) if preferences else 'your preferences'}"
-                ],
-                "instructions": "Prepare according to dietary preferences",
+                "name": meal_name if meal_name else f"{meal_type} Special",
+                "ingredients": ingredients,
+                "instructions": instructions,
                 "protein": 25,
                 "carbs": 35,
                 "fat": 15
             }]
         }
-        return json.dumps(basic_fallback)
\ No newline at end of file
+        return json.dumps(fallback_meal)
+
+
+def basic_fallback_meal(meal_type, preferences, meal_request=None, calories=None):
+    """Used when the call itself fails"""
+    basic_fallback = {
+        "meal_type": meal_type,
+        "calories": int(calories) if calories else 500,
+        "dietary_preferences": preferences,
+        "dishes": [{
+            "name": meal_request if meal_request else f"Healthy {meal_type}",
+            "ingredients": [
+                f"Ingredients suitable for {', '.join(preferences) if preferences else 'your preferences'}"
+            ],
+            "instructions": BASIC_FALLBACK_INSTRUCTIONS,
+            "protein": 25,
+            "carbs": 35,
+            "fat": 15
+        }]
+    }
+    return json.dumps(basic_fallback)
+
+
+def stream_meal(meal_type, preferences, meal_request=None, calories=None):
+    """Same prompt as generate_meal, streamed - yields the text as it arrives; pass the joined text to finalize_meal"""
+    return llm.stream("generate_meal", **meal_request_args(meal_type, preferences, meal_request, calories))
+
+
+def generate_meal(meal_type, preferences, meal_request=None, calories=None, seed=None):
+    try:
+        response = llm.complete("generate_meal", **meal_request_args(meal_type, preferences, meal_request, calories, seed))
+        
+        meal_plan = response['choices'][0]['message']['content'].strip()
+        
+        return finalize_meal(meal_plan, meal_type, preferences, meal_request, calories)
+            
+    except Exception as e:
+        print(f"Exception in meal generation: {e}")
+        # Even more basic fallback
+        return basic_fallback_meal(meal_type, preferences, meal_request, calories)
+
+
+def generate_meals(slots, preferences, max_workers=MEAL_BATCH_CONCURRENCY):
+    """
+    Generate a meal for each slot ({"meal_type", "calories", "meal_request"}) with at most max_workers
+    calls running at once. Yields (index, meal) in the order they finish, not the order of slots.
+    Each slot gets its own seed, so the three identical dinners of a week aren't one shared call.
+    """
+    if not slots:
+        return
+    base_seed = random.randint(1, 10000)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(slots)))) as executor:
+        futures = {
+            executor.submit(generate_meal, slot.get("meal_type"), preferences, slot.get("meal_request"), slot.get("calories"),
+                            base_seed + index): index
+            for index, slot in enumerate(slots)
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # the caller stopped early (client gone, a slot failed) - don't start calls nobody will read
+            executor.shutdown(wait=False, cancel_futures=True)
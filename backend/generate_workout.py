@@ -1,13 +1,69 @@
 import openai
 from dotenv import load_dotenv
+from llm_client import llm
+from llm_json import WORKOUT_SCHEMA, LLMJSONError, parse_llm_json
+import json
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Bump this whenever the prompt below changes so cached workouts from the old prompt stop being served (see llm_cache.py)
+PROMPT_VERSION = "workout-json-v1"
+
+def workout_request(goal, experience_level, time_available):
+    """Chat completion arguments for the JSON workout prompt - shared by the blocking and streamed calls"""
+    return dict(
+        model="gpt-3.5-turbo",
+        messages = [
+    {"role": "system", "content": "You are a fitness AI assistant that creates structured JSON workouts."},
+    {
+        "role": "user",
+        "content": f"""
+        Generate a {time_available}-minute workout plan for a {experience_level} user with the goal of {goal}.
+        
+        Return the workout plan **strictly** in JSON format with this structure:
+        {{
+            "goal": "{goal}",
+            "experience_level": "{experience_level}",
+            "time_available": {time_available},
+            "exercises": [
+                {{
+                    "name": "Exercise Name",
+                    "sets": 3,
+                    "reps": 12
+                }},
+                {{
+                    "name": "Another Exercise",
+                    "sets": 3,
+                    "reps": 10
+                }}
+            ]
+        }}
+        Do **not** include explanations, just return JSON.
+        """
+    }
+]
+,
+        max_tokens=600,
+        temperature=0.7,
+    )
+
+
+def parse_workout(text):
+    """Completion text -> clean workout JSON string, or {"error"} when no valid workout can be recovered from it"""
+    try:
+        return json.dumps(parse_llm_json(text, WORKOUT_SCHEMA))
+    except LLMJSONError as e:
+        return {"error": f"Invalid workout from the model: {e}"}
+
+
+def stream_workout(goal, experience_level, time_available):
+    """Same prompt as generate_workout, streamed - yields the text as it arrives (see llm_client.LLMClient.stream)"""
+    return llm.stream("generate_workout", **workout_request(goal, experience_level, time_available))
+
+
 def generate_workout(goal, experience_level, time_available):
-    # Get API key from environment variable
-    openai.api_key = os.getenv('OPENAI_API_KEY')
 #below is not used in final implementation
     system_prompt = """You are Alex, a friendly and supportive personal trainer. 
     Write in a casual, encouraging tone as if talking to a friend.
@@ -40,47 +96,14 @@ def generate_workout(goal, experience_level, time_available):
     ]
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages = [
-    {"role": "system", "content": "You are a fitness AI assistant that creates structured JSON workouts."},
-    {
-        "role": "user",
-        "content": f"""
-        Generate a {time_available}-minute workout plan for a {experience_level} user with the goal of {goal}.
-        
-        Return the workout plan **strictly** in JSON format with this structure:
-        {{
-            "goal": "{goal}",
-            "experience_level": "{experience_level}",
-            "time_available": {time_available},
-            "exercises": [
-                {{
-                    "name": "Exercise Name",
-                    "sets": 3,
-                    "reps": 12
-                }},
-                {{
-                    "name": "Another Exercise",
-                    "sets": 3,
-                    "reps": 10
-                }}
-            ]
-        }}
-        Do **not** include explanations, just return JSON.
-        """
-    }
-]
-,
-            max_tokens=600,
-            temperature=0.7,
-        )
+        # timeouts, retries and the circuit breaker live in llm_client - an error here means use the local generator
+        response = llm.complete("generate_workout", **workout_request(goal, experience_level, time_available))
         
         workout_plan = response['choices'][0]['message']['content'].strip()
         if not workout_plan:
             return {"error": "Failed to generate a workout plan. Please try again."}
             
-        return workout_plan
+        return parse_workout(workout_plan)
 
     except openai.OpenAIError as e:
         return {"error": str(e)}
\ No newline at end of file
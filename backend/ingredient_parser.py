@@ -0,0 +1,174 @@
+# ingredient_parser.py
+# Turns recipe ingredient lines ("1 1/2 cups brown rice", "200g chicken breast") into shopping list items.
+# Category keywords come from ingredient_categories.json and are compiled once into a word trie, so each
+# line is categorised in a single pass over its words however big the dictionary gets. The longest phrase
+# wins ("peanut butter" -> Condiments, not Dairy) and ties go to the category listed first in the file.
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+CATEGORIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingredient_categories.json")
+DEFAULT_CATEGORY = "Other"
+DEFAULT_QUANTITY = "1"
+
+UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+
+# spelling -> unit we store
+UNITS = {
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tbl": "tbsp",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp", "tsps": "tsp",
+    "gram": "g", "grams": "g", "g": "g", "gr": "g",
+    "kilogram": "kg", "kilograms": "kg", "kg": "kg", "kgs": "kg",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "ml": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l", "l": "l",
+    "ounce": "oz", "ounces": "oz", "oz": "oz",
+    "pound": "lb", "pounds": "lb", "lb": "lb", "lbs": "lb",
+    "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash",
+    "clove": "clove", "cloves": "clove", "can": "can", "cans": "can", "tin": "can", "tins": "can",
+    "slice": "slice", "slices": "slice", "piece": "piece", "pieces": "piece",
+    "handful": "handful", "handfuls": "handful", "bunch": "bunch", "bunches": "bunch",
+    "stick": "stick", "sticks": "stick", "pack": "pack", "packs": "pack", "packet": "pack", "packets": "pack",
+}
+
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?\s*[½⅓⅔¼¾⅛]?|[½⅓⅔¼¾⅛])"
+_UNIT = "|".join(sorted((re.escape(u) for u in UNITS), key=len, reverse=True))
+QUANTITY_RE = re.compile(
+    rf"^\s*(?P<amount>{_NUMBER})(?:\s*(?:-|–|to)\s*{_NUMBER})?\s*(?:(?P<unit>{_UNIT})\.?(?![a-z]))?\s*(?:of\s+)?",
+    re.IGNORECASE
+)
+WORD_RE = re.compile(r"[a-z]+")
+
+
+@lru_cache(maxsize=8192)
+def singular(word):
+    """Crude plural folding, applied to both the dictionary and the ingredient so they line up"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def words(text):
+    return [singular(word) for word in WORD_RE.findall(text.lower())]
+
+
+def parse_amount(text):
+    """'1 1/2' -> 1.5, '½' -> 0.5, '2½' -> 2.5"""
+    text = text.strip()
+    total = 0.0
+    for char, value in UNICODE_FRACTIONS.items():
+        if char in text:
+            total += value
+            text = text.replace(char, "").strip()
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            total += float(numerator) / float(denominator) if float(denominator) else 0
+        elif part:
+            total += float(part)
+    return total
+
+
+def ingredient_line(ingredient):
+    """
+    An ingredient as one line of text. Meals can list structured ingredients (llm_json.MEAL_SCHEMA allows
+    objects), so {"quantity": 2, "unit": "cups", "name": "rice"} becomes "2 cups rice"; anything else is str()'d.
+    """
+    if isinstance(ingredient, str):
+        return ingredient
+    if isinstance(ingredient, dict):
+        parts = [ingredient.get(key) for key in ("quantity", "amount", "unit", "name", "item")]
+        return " ".join(str(part).strip() for part in parts
+                        if isinstance(part, (str, int, float)) and not isinstance(part, bool))
+    return "" if ingredient is None else str(ingredient)
+
+
+class IngredientEngine:
+    """Compiled categoriser + quantity parser. Build once (see default_engine) and reuse."""
+
+    def __init__(self, categories):
+        # category order in the file is the tie-break priority
+        self.categories = list(categories)
+        priority = {category: n for n, category in enumerate(self.categories)}
+        self.trie = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                phrase = words(keyword)
+                if not phrase:
+                    continue
+                node = self.trie
+                for word in phrase:
+                    node = node.setdefault(word, {})
+                existing = node.get(None)
+                # a keyword listed under two categories keeps the higher priority one
+                if existing is None or priority[category] < existing[1]:
+                    node[None] = (category, priority[category])
+
+    def categorize(self, text):
+        tokens = words(text)
+        best = None  # (phrase length, -priority, category)
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                match = node.get(None)
+                if match:
+                    candidate = (end - start + 1, -match[1], match[0])
+                    if best is None or candidate > best:
+                        best = candidate
+        return best[2] if best else DEFAULT_CATEGORY
+
+    def parse(self, line):
+        """{"item_name", "quantity" (display text), "amount", "unit", "category"} for one ingredient line"""
+        line = ingredient_line(line).strip()
+        quantity, amount, unit, name = DEFAULT_QUANTITY, None, None, line
+        match = QUANTITY_RE.match(line)
+        if match:
+            quantity = line[match.start("amount"):match.end()].strip()
+            quantity = re.sub(r"\s+of$", "", quantity, flags=re.IGNORECASE)
+            amount = parse_amount(match.group("amount"))
+            unit = UNITS.get(match.group("unit").lower()) if match.group("unit") else None
+            name = line[match.end():].strip() or line
+        return {
+            "item_name": name,
+            "quantity": quantity,
+            "amount": amount,
+            "unit": unit,
+            "category": self.categorize(name)
+        }
+
+    def parse_many(self, lines):
+        """parse() for each ingredient, leaving out blank ones"""
+        return [self.parse(line) for line in lines if ingredient_line(line).strip()]
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def load_categories(path=CATEGORIES_PATH):
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def default_engine():
+    """Engine compiled from ingredient_categories.json on first use"""
+    global _default_engine
+    if _default_engine is None:
+        with _default_lock:
+            if _default_engine is None:
+                _default_engine = IngredientEngine(load_categories())
+    return _default_engine
+
+
+def parse_ingredients(lines):
+    """Batch API used by the shopping list routes"""
+    return default_engine().parse_many(lines)
@@ -0,0 +1,74 @@
+# json_provider.py
+# Flask JSON provider backed by orjson (several times faster than the stdlib encoder on the history routes).
+# ObjectId, datetime and date are serialised natively - ObjectIds as their hex string, dates as ISO 8601 -
+# so routes can jsonify mongo documents without converting _id by hand first. Naive datetimes are UTC (that's how
+# pymongo returns them, see dates.py) and go out with a +00:00 offset so browsers don't read them as local time.
+# orjson is optional: without it the stdlib encoder is used with the same conversions.
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pip install orjson for the fast path
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC if orjson else 0
+
+
+def _default(value):
+    """Types neither encoder knows about"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON for obj - what the provider and the NDJSON streams use"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits - let the stdlib encoder deal with it
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json = FastJSONProvider(app) - jsonify() and request.json then go through orjson"""
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # someone asked for indent/sort_keys etc - the stdlib encoder understands those options
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # straight from bytes - no str round trip
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,167 @@
+# lift_sets.py
+# workout_sets: one small document per logged set, derived from workout_logs (where sets sit nested under
+# exercises[].sets[] in one document per session). Per-exercise questions - "all my bench sets this year",
+# the top set of each squat session - read just those sets through the (user_id, exercise, date) index instead of
+# loading and unpacking every session.
+#   {user_id, exercise: "bench press", name: "Bench Press", date, log_id, set_number, weight, reps}
+# A flat collection rather than a mongo time-series one: sets are replaced whenever their log is edited, which
+# time-series collections only partly support, and mongomock/older servers don't have them at all.
+# log_workout / update_workout_log keep it in step; `python lift_sets.py backfill` rebuilds it from workout_logs.
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from dates import parse_date
+
+load_dotenv()
+
+BACKFILL_BATCH_SIZE = 500
+# most sets a count-only exercise ("sets": 3) expands to - the count comes straight from client JSON
+MAX_SETS = 100
+
+
+def exercise_key(name):
+    """What sets are grouped and looked up by - 'Bench  press' and 'bench press' are the same lift"""
+    return " ".join(str(name or "").split()).lower()
+
+
+def _number(value):
+    """Weights/reps come from form inputs, so they can be strings or empty"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def set_count(value):
+    """An older log's "sets": 3 as a number of sets, 0..MAX_SETS - 1e9, NaN and junk can't blow it up"""
+    count = _number(value)
+    if count != count:  # NaN
+        return 0
+    return int(min(max(count, 0), MAX_SETS))
+
+
+def sets_from_log(log):
+    """The workout_sets documents for one workout log (it must have its _id)"""
+    date = parse_date(log.get("date"))
+    records = []
+    for exercise in log.get("exercises") or []:
+        if not isinstance(exercise, dict):
+            continue
+        key = exercise_key(exercise.get("name"))
+        if not key:
+            continue
+        sets = exercise.get("sets")
+        if isinstance(sets, list):
+            rows = [(s.get("set_number"), s.get("weight"), s.get("reps")) for s in sets if isinstance(s, dict)]
+        else:
+            # older logs only have counts: "sets": 3, "reps": 12
+            rows = [(None, 0, exercise.get("reps"))] * set_count(sets)
+        for index, (set_number, weight, reps) in enumerate(rows, 1):
+            records.append({
+                "user_id": log.get("user_id"),
+                "exercise": key,
+                "name": " ".join(str(exercise.get("name")).split()),
+                "date": date,
+                "log_id": log["_id"],
+                "set_number": int(_number(set_number)) or index,
+                "weight": _number(weight),
+                "reps": _number(reps),
+            })
+    return records
+
+
+def replace_log_sets(db, log):
+    """Swap the sets stored for a log for the ones it has now - after an edit"""
+    db.workout_sets.delete_many({"log_id": log["_id"]})
+    records = sets_from_log(log)
+    if records:
+        db.workout_sets.insert_many(records)
+    return len(records)
+
+
+def backfill(db, batch_size=BACKFILL_BATCH_SIZE):
+    """Rebuild workout_sets from every workout log, batch by batch in _id order - safe to re-run"""
+    logs_done = sets_written = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        logs = list(db.workout_logs.find(query, {"user_id": 1, "date": 1, "exercises": 1})
+                    .sort("_id", 1).limit(batch_size))
+        if not logs:
+            break
+        last_id = logs[-1]["_id"]
+        db.workout_sets.delete_many({"log_id": {"$in": [log["_id"] for log in logs]}})
+        records = [record for log in logs for record in sets_from_log(log)]
+        if records:
+            db.workout_sets.insert_many(records, ordered=False)
+        logs_done += len(logs)
+        sets_written += len(records)
+    return logs_done, sets_written
+
+
+# Queries
+
+# e1RM (Epley): what the set suggests the lifter could do for one rep
+E1RM = {"$multiply": ["$weight", {"$add": [1, {"$divide": ["$reps", 30]}]}]}
+
+
+def exercises_pipeline(user_id):
+    """Every exercise a user has logged sets for, with counts, best set and when it was last done"""
+    return [
+        {"$match": {"user_id": user_id}},
+        # per session first, so sessions are counted without collecting every log id
+        {"$group": {
+            "_id": {"exercise": "$exercise", "log_id": "$log_id"},
+            "name": {"$last": "$name"},
+            "sets": {"$sum": 1},
+            "max_weight": {"$max": "$weight"},
+            "date": {"$max": "$date"},
+        }},
+        {"$group": {
+            "_id": "$_id.exercise",
+            "name": {"$last": "$name"},
+            "sets": {"$sum": "$sets"},
+            "sessions": {"$sum": 1},
+            "max_weight": {"$max": "$max_weight"},
+            "last_date": {"$max": "$date"},
+        }},
+        {"$project": {"_id": 0, "exercise": "$_id", "name": 1, "sets": 1, "sessions": 1, "max_weight": 1,
+                      "last_date": 1}},
+        {"$sort": {"last_date": -1}},
+    ]
+
+
+def sessions_pipeline(query):
+    """One row per session for the sets matching query: top weight, best e1RM, total volume, set count"""
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": "$log_id",
+            "date": {"$first": "$date"},
+            "sets": {"$sum": 1},
+            "reps": {"$sum": "$reps"},
+            "top_weight": {"$max": "$weight"},
+            "best_e1rm": {"$max": E1RM},
+            "volume": {"$sum": {"$multiply": ["$weight", "$reps"]}},
+        }},
+        {"$sort": {"date": -1, "_id": -1}},
+        {"$project": {
+            "_id": 0, "log_id": {"$toString": "$_id"}, "date": 1, "sets": 1, "reps": 1, "top_weight": 1,
+            "best_e1rm": {"$round": ["$best_e1rm", 1]}, "volume": 1,
+        }},
+    ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("usage: python lift_sets.py backfill")
+        sys.exit(1)
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    start = time.perf_counter()
+    logs_done, sets_written = backfill(client["fitness_app"])
+    print(f"Rebuilt {sets_written} sets from {logs_done} workout logs in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,168 @@
+# llm_cache.py
+# Cache for generated LLM responses (e.g. AI workouts) so repeat requests don't pay for another completion.
+# Two tiers: an in-process LRU in front of a mongo collection whose documents expire through a TTL index.
+# Each key keeps up to `variants` different responses so users asking for the same thing still get some variety.
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Defaults, overridable from .env
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+CACHE_VARIANTS = int(os.getenv("LLM_CACHE_VARIANTS", 3))
+CACHE_HIT_RATIO = float(os.getenv("LLM_CACHE_HIT_RATIO", 1.0))
+
+
+def normalize_part(value):
+    if isinstance(value, str):
+        value = " ".join(value.lower().split())
+        return int(value) if value.isdigit() else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def make_cache_key(namespace, prompt_version, parts):
+    """Stable key for a request - case/whitespace differences and "30" vs 30 map to the same entry"""
+    normalized = [normalize_part(part) for part in parts]
+    raw = json.dumps([namespace, prompt_version, normalized], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    get_or_generate(parts, generate) returns a cached response for the request parts, or calls generate()
+    and stores the result. Error responses ({"error": ...}) are never cached.
+    """
+
+    def __init__(self, collection, namespace, prompt_version, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_entries=CACHE_MAX_ENTRIES, variants=CACHE_VARIANTS, hit_ratio=CACHE_HIT_RATIO):
+        self.collection = collection
+        self.namespace = namespace
+        self.prompt_version = prompt_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.hit_ratio = hit_ratio
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expiry on the time.monotonic() clock, [responses]) - full sets only
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, responses = entry
+            if time.monotonic() >= expires_at:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return responses
+
+    def _memory_put(self, key, responses, ttl_seconds):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl_seconds, responses)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _mongo_load(self, key):
+        """(responses, seconds until the first of them expires) - the TTL monitor only sweeps once a minute"""
+        try:
+            now = datetime.utcnow()
+            docs = list(self.collection.find(
+                {"key": key, "expires_at": {"$gt": now}}, {"_id": 0, "response": 1, "expires_at": 1}
+            ).sort("created_at", -1).limit(self.variants))
+            ttl = min((doc["expires_at"] - now).total_seconds() for doc in docs) if docs else 0
+            return [doc["response"] for doc in docs], ttl
+        except Exception as e:
+            print(f"LLM cache read failed: {e}")
+            self._count("errors")
+            return [], 0
+
+    def _mongo_store(self, key, response):
+        try:
+            now = datetime.utcnow()
+            self.collection.insert_one({
+                "key": key,
+                "namespace": self.namespace,
+                "prompt_version": self.prompt_version,
+                "response": response,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            })
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+            self._count("errors")
+
+    def lookup(self, parts):
+        """
+        (key, cached response) - the response is None on a miss, and the caller generates one and passes it to
+        store(). get_or_generate does both; the streaming routes use them separately.
+        """
+        key = make_cache_key(self.namespace, self.prompt_version, parts)
+
+        responses = self._memory_get(key)
+        tier = "memory_hits"
+        if responses is None:
+            responses, ttl = self._mongo_load(key)
+            # an incomplete set stays out of memory, so variants other workers store are picked up next time
+            if len(responses) >= self.variants:
+                self._memory_put(key, responses, ttl)
+            tier = "mongo_hits"
+
+        # Only serve from cache once the key has a full set of variants, and then only hit_ratio of the time
+        if len(responses) >= self.variants and random.random() < self.hit_ratio:
+            self._count(tier)
+            return key, random.choice(responses)
+
+        self._count("misses")
+        return key, None
+
+    def store(self, key, response):
+        if isinstance(response, dict) and "error" in response:
+            return
+
+        # a memoized (full) set gets the new variant in place of a random one; otherwise mongo is the only copy
+        responses = self._memory_get(key)
+        if responses is not None:
+            with self._lock:
+                responses[random.randrange(len(responses))] = response
+        self._mongo_store(key, response)
+
+    def get_or_generate(self, parts, generate):
+        key, cached = self.lookup(parts)
+        if cached is not None:
+            return cached
+        response = generate()
+        self.store(key, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._memory)
+        lookups = counters["memory_hits"] + counters["mongo_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["mongo_hits"]
+        return {
+            **counters,
+            "namespace": self.namespace,
+            "prompt_version": self.prompt_version,
+            "memory_entries": entries,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+        }
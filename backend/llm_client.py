@@ -0,0 +1,293 @@
+# llm_client.py
+# The one place the app talks to OpenAI. generate_workout, generate_meal and analyze_logged_workouts go through
+# the shared `llm` client instead of calling openai.ChatCompletion.create themselves, which gives every call
+#   - a request timeout (openai waits forever by default)
+#   - retries with jittered exponential backoff on transient errors (timeouts, 429, 5xx, dropped connections)
+#   - a circuit breaker - after enough failures in a row calls fail straight away with LLMUnavailable, so
+#     routes drop to their local fallbacks (local_workout, basic meal) instead of waiting on a dead API
+#   - a process wide cap on concurrent calls, with a bounded wait for a free slot
+#   - single-flight: identical prompts already in flight share that call instead of starting another
+# Retries, rejections and breaker state are exported through metrics.py, stats() backs /api/llm-client/stats.
+# Point OPENAI_API_BASE at benchmarks/fake_openai.py to exercise all of this locally.
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import openai
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+# set once here rather than on every call
+openai.api_key = os.getenv("OPENAI_API_KEY")
+
+# Defaults, overridable from .env
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 0.5))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 8))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 5))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
+# worth another attempt - anything else (bad request, auth) will fail the same way again
+TRANSIENT_ERRORS = (
+    openai.error.Timeout, openai.error.APIConnectionError, openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError, openai.error.TryAgain,
+)
+
+
+class LLMUnavailable(openai.error.OpenAIError):
+    """The call was refused locally (circuit open or no free slot) - use the fallback"""
+
+
+def is_transient(error):
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # plain APIError is what openai raises for 500/502/504
+    return isinstance(error, openai.error.APIError) and (error.http_status or 500) >= 500
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` transient errors in a row; open fails fast for `reset_seconds`, then lets
+    one trial call through (half open) - its success closes the breaker again, its failure re-opens it.
+    """
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, reset_seconds=LLM_BREAKER_RESET_SECONDS):
+        self.failures = max(1, failures)
+        self.reset_seconds = reset_seconds
+        self._set_state("closed")
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state("half_open")
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.consecutive = 0
+            self._trial_running = False
+            if self.state != "closed":
+                print("LLM circuit breaker closed")
+                self._set_state("closed")
+
+    def failure(self):
+        with self._lock:
+            self.consecutive += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.state == "closed" and self.consecutive >= self.failures):
+                print(f"LLM circuit breaker open for {self.reset_seconds}s after {self.consecutive} failure(s)")
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+    def end_trial(self):
+        """The call let through didn't get an answer either way (refused locally, cancelled) - allow another"""
+        with self._lock:
+            self._trial_running = False
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.LLM_CIRCUIT_OPEN.set({"closed": 0, "half_open": 0.5, "open": 1}[state])
+
+
+class _Call:
+    """An in-flight request the followers of a single-flight key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class LLMClient:
+    def __init__(self, timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE_SECONDS, backoff_max=LLM_BACKOFF_MAX_SECONDS,
+                 max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS,
+                 breaker=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._in_flight = {}  # single-flight key -> _Call
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "upstream": 0, "coalesced": 0, "retries": 0, "rejected": 0, "failed": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    # Pieces shared by complete() and stream()
+
+    def _backoff(self, attempt, error):
+        """Full jitter: random between 0 and base * 2^attempt (capped); a 429's Retry-After wins when given"""
+        retry_after = (getattr(error, "headers", None) or {}).get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _reject(self, operation, reason, message):
+        self._count("rejected")
+        metrics.LLM_REJECTED.inc(operation, reason)
+        raise LLMUnavailable(message)
+
+    def _acquire(self, operation):
+        if not self.breaker.allow():
+            self._reject(operation, "circuit_open", "OpenAI is failing, circuit breaker open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.end_trial()
+            self._reject(operation, "busy", f"All {self.max_concurrency} OpenAI slots busy")
+        metrics.LLM_IN_FLIGHT.inc(amount=1)
+
+    def _release(self):
+        # no-op when the call already reported success/failure; covers non-transient errors and cancelled streams
+        self.breaker.end_trial()
+        metrics.LLM_IN_FLIGHT.inc(amount=-1)
+        self._slots.release()
+
+    def _should_retry(self, operation, attempt, error):
+        """Record a failed attempt; True when it's worth going again (after the backoff sleep)"""
+        if not is_transient(error):
+            return False
+        self.breaker.failure()
+        if attempt >= self.max_retries or not self.breaker.allow():
+            return False
+        self._count("retries")
+        metrics.LLM_RETRIES.inc(operation, type(error).__name__)
+        delay = self._backoff(attempt, error)
+        print(f"OpenAI {operation} attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+        time.sleep(delay)
+        return True
+
+    # Blocking completions
+
+    @staticmethod
+    def flight_key(kwargs):
+        return hashlib.sha1(json.dumps(kwargs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def complete(self, operation, **kwargs):
+        """
+        openai.ChatCompletion.create(**kwargs) with the timeout / retry / breaker / concurrency rules above.
+        Concurrent calls with identical kwargs get the same response object - treat it as read only.
+        Raises LLMUnavailable (an OpenAIError) when refused locally, or the last OpenAI error.
+        """
+        self._count("calls")
+        key = self.flight_key(kwargs)
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+        if not leader:
+            self._count("coalesced")
+            metrics.LLM_COALESCED.inc(operation)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = self._complete(operation, kwargs)
+            return call.response
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+
+    def _complete(self, operation, kwargs):
+        kwargs.setdefault("request_timeout", self.timeout)
+        self._acquire(operation)
+        try:
+            attempt = 0
+            while True:
+                self._count("upstream")
+                try:
+                    response = metrics.chat_completion(operation, **kwargs)
+                except openai.error.OpenAIError as e:
+                    if self._should_retry(operation, attempt, e):
+                        attempt += 1
+                        continue
+                    self._count("failed")
+                    raise
+                self.breaker.success()
+                return response
+        finally:
+            self._release()
+
+    # Streamed completions
+
+    def stream(self, operation, **kwargs):
+        """
+        Streamed completion, yields the content deltas (see metrics.stream_chat_completion). A failure before
+        the first delta is retried like complete(); once text has been yielded it can't be taken back, so a
+        later failure is raised to the caller. Streams aren't coalesced - each caller needs its own tokens.
+        The concurrency slot is held until the stream is finished or closed.
+        """
+        self._count("calls")
+        kwargs.setdefault("request_timeout", self.timeout)
+        self._acquire(operation)
+        try:
+            attempt = 0
+            while True:
+                self._count("upstream")
+                started = False
+                try:
+                    for delta in metrics.stream_chat_completion(operation, **kwargs):
+                        started = True
+                        yield delta
+                except openai.error.OpenAIError as e:
+                    if not started and self._should_retry(operation, attempt, e):
+                        attempt += 1
+                        continue
+                    if started and is_transient(e):
+                        self.breaker.failure()
+                    self._count("failed")
+                    raise
+                self.breaker.success()
+                return
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._in_flight)
+        return {
+            **counters,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive,
+            "coalescing_now": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+        }
+
+
+# Shared by every module that calls the model
+llm = LLMClient()
@@ -0,0 +1,234 @@
+# llm_json.py
+# One pass JSON extraction and repair for model output, shared by workouts, meals and insights.
+# extract_json walks the text once: it skips any chatter or ```json fence before the first "{", copies the
+# object out while tracking strings and brackets, and fixes the usual model mistakes on the way -
+#   - raw newlines / tabs / control characters inside strings are escaped
+#   - invalid escapes (\' or a lone backslash) are repaired, valid ones are left alone
+#   - trailing commas before } or ] are dropped
+#   - output cut off mid-way is closed at the last complete value
+# The result is then checked against a small schema so callers can fall back instead of storing junk.
+import json
+import re
+
+# a value is "string", "number", "integer", "boolean", a nested schema (dict, {} = any object), [item] for
+# a list, or a tuple of alternatives
+WORKOUT_SCHEMA = {
+    "required": {"exercises": [{
+        "required": {"name": "string"},
+        "optional": {"sets": ("number", "string"), "reps": ("number", "string"), "duration": ("number", "string")},
+    }]},
+    "optional": {"goal": "string", "experience_level": "string", "time_available": ("number", "string")},
+    "min_items": {"exercises": 1},
+}
+
+MEAL_SCHEMA = {
+    "required": {"dishes": [{
+        "required": {"name": "string"},
+        "optional": {
+            "ingredients": [("string", {})], "instructions": ("string", ["string"]),
+            "protein": ("number", "string"), "carbs": ("number", "string"), "fat": ("number", "string"),
+        },
+    }]},
+    "optional": {"meal_type": "string", "calories": ("number", "string"), "dietary_preferences": ["string"]},
+    "min_items": {"dishes": 1},
+}
+
+INSIGHTS_SCHEMA = {
+    "required": {"recommendations": ("string", ["string"])},
+    "optional": {
+        "consistency": "string", "progress": "string", "mood_patterns": "string",
+        "focus_areas": ("string", ["string"]), "strength_areas": ("string", ["string"]),
+        "improvement_areas": ("string", ["string"]),
+    },
+}
+
+VALID_ESCAPES = set('"\\/bfnrtu')
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+HEX = set("0123456789abcdefABCDEF")
+STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')  # string content that needs no attention
+BARE_RUN = re.compile(r'[^"{}\[\]:,\s]+')
+LITERAL = re.compile(r'-?\d+(\.\d+)?([eE][+-]?\d+)?|true|false|null')
+
+
+class LLMJSONError(ValueError):
+    """No usable JSON object in the model output (or it didn't match the schema)"""
+
+
+def extract_json(text):
+    """
+    The first balanced JSON object in text, repaired, as a string - parse it with json.loads.
+    Raises LLMJSONError when there's no object at all.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise LLMJSONError("No JSON object in the response")
+
+    out = []
+    stack = []  # open brackets
+    in_string = False
+    after_colon = False  # the next string is an object value, not a key
+    # (length of out, open brackets) after the last complete value - where truncated output gets cut
+    safe_len, safe_stack = None, None
+    length = len(text)
+    i = start
+    while i < length:
+        char = text[i]
+        if in_string:
+            run = STRING_RUN.match(text, i)
+            if run:
+                out.append(run.group())
+                i = run.end()
+                continue
+            if char == '"':
+                out.append(char)
+                in_string = False
+                if after_colon or stack[-1] == "[":
+                    safe_len, safe_stack = len(out), stack[:]
+                after_colon = False
+            elif char == "\\":
+                following = text[i + 1] if i + 1 < length else ""
+                if following == "u" and i + 6 <= length and all(c in HEX for c in text[i + 2:i + 6]):
+                    out.append(text[i:i + 6])
+                    i += 6
+                    continue
+                if following in VALID_ESCAPES and following != "u":
+                    out.append(char + following)
+                    i += 2
+                    continue
+                if following == "'":
+                    out.append("'")
+                    i += 2
+                    continue
+                out.append("\\\\")  # a lone backslash - keep it as a literal one
+            elif char < " ":
+                out.append(CONTROL_ESCAPES.get(char, ""))
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            after_colon = False
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            # close whatever is actually open, even if the model used the wrong bracket
+            out.append("}" if stack.pop() == "{" else "]")
+            if not stack:
+                return "".join(out)
+            safe_len, safe_stack = len(out), stack[:]
+            after_colon = False
+        elif char == ":":
+            out.append(char)
+            after_colon = True
+        elif char == ",":
+            out.append(char)
+            after_colon = False
+        elif char.isspace():
+            pass  # whitespace outside strings (NBSP, \v, U+2028 included) isn't needed
+        else:
+            # a number / true / false / null, taken whole - complete once something follows it
+            run = BARE_RUN.match(text, i)
+            end = run.end() if run else i
+            if end == i or not LITERAL.fullmatch(text, i, end):
+                break  # prose after a cut off object - it ends at the last complete value
+            out.append(text[i:end])
+            if end < length:
+                safe_len, safe_stack = len(out), stack[:]
+                after_colon = False
+            i = end
+            continue
+        i += 1
+
+    # ran out of text with brackets still open - close them at the last complete value
+    if safe_len is None:
+        raise LLMJSONError("JSON object is incomplete")
+    out = out[:safe_len]
+    _drop_trailing_comma(out)
+    for bracket in reversed(safe_stack):
+        out.append("}" if bracket == "{" else "]")
+    return "".join(out)
+
+
+def _drop_trailing_comma(out):
+    if out and out[-1] == ",":
+        out.pop()
+
+
+TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+
+def _matches(value, expected, path, errors):
+    if isinstance(expected, tuple):
+        # any of the alternatives
+        for option in expected:
+            attempt = []
+            _matches(value, option, path, attempt)
+            if not attempt:
+                return
+        errors.append(f"{path}: unexpected {type(value).__name__}")
+    elif isinstance(expected, list):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected a list")
+            return
+        for n, item in enumerate(value):
+            _matches(item, expected[0], f"{path}[{n}]", errors)
+    elif isinstance(expected, dict):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object")
+            return
+        errors.extend(validate(value, expected, path))
+    elif not TYPE_CHECKS[expected](value):
+        errors.append(f"{path}: expected {expected}")
+
+
+def validate(obj, schema, path="$"):
+    """List of problems with obj against schema - empty when it's fine. Unknown keys are allowed."""
+    errors = []
+    if not isinstance(obj, dict):
+        return [f"{path}: expected an object"]
+    for key, expected in schema.get("required", {}).items():
+        if key not in obj:
+            errors.append(f"{path}.{key}: missing")
+        else:
+            _matches(obj[key], expected, f"{path}.{key}", errors)
+    for key, expected in schema.get("optional", {}).items():
+        if obj.get(key) is not None:
+            _matches(obj[key], expected, f"{path}.{key}", errors)
+    for key, minimum in schema.get("min_items", {}).items():
+        if isinstance(obj.get(key), list) and len(obj[key]) < minimum:
+            errors.append(f"{path}.{key}: needs at least {minimum} item(s)")
+    return errors
+
+
+def parse_llm_json(text, schema=None):
+    """extract_json + json.loads + validate. Raises LLMJSONError (a ValueError) with the reason."""
+    if not text:
+        raise LLMJSONError("Empty response")
+    obj = None
+    start, end = text.find("{"), text.rfind("}")
+    if -1 < start < end:
+        # most responses are fine apart from a fence or some chatter - skip the repair pass for those
+        try:
+            obj = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+    if obj is None:
+        try:
+            obj = json.loads(extract_json(text))
+        except json.JSONDecodeError as e:
+            raise LLMJSONError(f"Could not repair JSON: {e}") from e
+    if schema is not None:
+        errors = validate(obj, schema)
+        if errors:
+            raise LLMJSONError("; ".join(errors[:5]))
+    return obj
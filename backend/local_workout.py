@@ -0,0 +1,194 @@
+# local_workout.py
+# Rule-based workout generator that works from the exercise library - no OpenAI call.
+# The routes pass the ExerciseIndex reference_cache.py keeps over the exercise_library collection (rebuilt when its
+# version stamp moves); exercises.json is used when that collection is empty or no index is passed.
+# Used as a fast path and as the fallback when the AI generator fails. Returns the same JSON
+# string shape as generate_workout: {"goal", "experience_level", "time_available", "exercises": [{"name", "sets", "reps"}]}
+import json
+import os
+import re
+import threading
+
+EXERCISES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercises.json")
+
+# The library uses a mix of specific and general muscle names, these are grouped for balancing
+MUSCLE_GROUPS = {
+    "chest": "chest",
+    "shoulders": "shoulders", "rear deltoids": "shoulders",
+    "triceps": "arms", "biceps": "arms", "forearms": "arms",
+    "back": "back", "upper back": "back", "lower back": "back", "lats": "back",
+    "quadriceps": "legs", "quads": "legs", "hamstrings": "legs", "glutes": "legs", "calves": "legs",
+    "legs": "legs", "hip flexors": "legs",
+    "core": "core", "abdominals": "core", "lower abdominals": "core", "obliques": "core",
+    "full body": "full body",
+}
+
+# Which difficulties each level may use
+LEVEL_DIFFICULTIES = {
+    "beginner": {"beginner"},
+    "intermediate": {"beginner", "intermediate"},
+    "advanced": {"beginner", "intermediate", "advanced"},
+}
+
+# Share of the session given to each category, picked from keywords in the (free text) goal
+GOAL_PLANS = [
+    (("lose", "loss", "fat", "cut", "lean", "tone"), {"cardio": 0.4, "strength": 0.4, "core": 0.2}),
+    (("endurance", "stamina", "cardio", "run"), {"cardio": 0.5, "strength": 0.3, "core": 0.2}),
+    (("muscle", "strength", "strong", "gain", "bulk", "build", "mass"), {"strength": 0.8, "core": 0.2}),
+]
+DEFAULT_PLAN = {"strength": 0.6, "cardio": 0.2, "core": 0.2}
+
+# Seconds of rest between sets by category, and seconds per rep
+REST_SECONDS = {"strength": 75, "core": 45, "cardio": 30}
+SECONDS_PER_REP = 3
+WARM_UP_MINUTES = 5
+MAX_EXERCISES = 10
+MAX_SETS = 5
+
+
+def muscle_group(muscle):
+    return MUSCLE_GROUPS.get(muscle.lower(), muscle.lower())
+
+
+def set_seconds(reps):
+    """How long one set takes - reps are either a count or text like '30 seconds'"""
+    if isinstance(reps, (int, float)):
+        return reps * SECONDS_PER_REP
+    match = re.match(r"\s*(\d+)\s*(sec|second|s\b|min|minute)?", str(reps).lower())
+    if not match:
+        return 30
+    amount = int(match.group(1))
+    unit = match.group(2) or ""
+    if unit.startswith("min"):
+        return amount * 60
+    if unit:
+        return amount
+    return amount * SECONDS_PER_REP
+
+
+class ExerciseIndex:
+    """Exercise library with lookups by category, difficulty and muscle group built once up front"""
+
+    def __init__(self, exercises):
+        self.exercises = list(exercises)
+        self.by_category = {}
+        self.by_difficulty = {}
+        self.by_muscle_group = {}
+        self.groups = []
+        for i, exercise in enumerate(self.exercises):
+            groups = frozenset(muscle_group(m) for m in exercise.get("muscles_targeted", []))
+            self.groups.append(groups)
+            self.by_category.setdefault(exercise.get("category", "").lower(), set()).add(i)
+            self.by_difficulty.setdefault(exercise.get("difficulty", "").lower(), set()).add(i)
+            for group in groups:
+                self.by_muscle_group.setdefault(group, set()).add(i)
+
+    def candidates(self, category, difficulties):
+        allowed = set()
+        for difficulty in difficulties:
+            allowed |= self.by_difficulty.get(difficulty, set())
+        return self.by_category.get(category, set()) & allowed
+
+    def minutes(self, i, sets):
+        exercise = self.exercises[i]
+        rest = REST_SECONDS.get(exercise.get("category", "").lower(), 60)
+        return sets * (set_seconds(exercise.get("recommended_reps", 10)) + rest) / 60
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """Index over exercises.json, built on first use"""
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                with open(EXERCISES_PATH, "r") as file:
+                    _default_index = ExerciseIndex(json.load(file))
+    return _default_index
+
+
+def goal_plan(goal):
+    text = (goal or "").lower()
+    for keywords, plan in GOAL_PLANS:
+        if any(keyword in text for keyword in keywords):
+            return plan
+    return DEFAULT_PLAN
+
+
+def build_workout(goal, experience_level, time_available, index=None):
+    """The workout as a dict - greedy fill of the time budget, always preferring exercises that hit untrained muscle groups"""
+    index = index or default_index()
+    level = (experience_level or "beginner").lower()
+    difficulties = LEVEL_DIFFICULTIES.get(level, LEVEL_DIFFICULTIES["beginner"])
+    try:
+        minutes = float(time_available)
+    except (TypeError, ValueError):
+        minutes = 30
+    budget = minutes - WARM_UP_MINUTES if minutes >= 15 else minutes
+    extra_sets = 1 if level == "advanced" else 0
+
+    plan = goal_plan(goal)
+    chosen = []  # (index, sets)
+    covered = set()
+    used = set()
+    spent = 0.0
+
+    # Fill each category's share of the budget, biggest share first
+    categories = sorted(plan.items(), key=lambda item: -item[1])
+    for position, (category, share) in enumerate(categories):
+        category_budget = budget * share
+        category_spent = 0.0
+        pool = index.candidates(category, difficulties) - used
+        # keep a slot for each category still to come, so long sessions don't spend the cap on the first one
+        reserved = sum(1 for later, _ in categories[position + 1:] if index.candidates(later, difficulties))
+        while pool and len(chosen) < MAX_EXERCISES - reserved and category_spent < category_budget:
+            def score(i):
+                new_groups = len(index.groups[i] - covered)
+                return (-new_groups, index.exercises[i]["name"])
+            best = None
+            for i in sorted(pool, key=score):
+                sets = min(int(index.exercises[i].get("recommended_sets", 3)) + extra_sets, MAX_SETS)
+                # a category keeps adding exercises until its share is used, as long as the session still fits
+                if spent + index.minutes(i, sets) <= budget or not chosen:
+                    best = (i, sets)
+                    break
+            if best is None:
+                break
+            i, sets = best
+            cost = index.minutes(i, sets)
+            chosen.append(best)
+            used.add(i)
+            pool.discard(i)
+            covered |= index.groups[i]
+            category_spent += cost
+            spent += cost
+
+    # Left-over time goes into extra sets, round robin
+    while chosen:
+        added = False
+        for n, (i, sets) in enumerate(chosen):
+            cost = index.minutes(i, 1)
+            if sets < MAX_SETS and spent + cost <= budget:
+                chosen[n] = (i, sets + 1)
+                spent += cost
+                added = True
+        if not added:
+            break
+
+    return {
+        "goal": goal,
+        "experience_level": experience_level,
+        "time_available": time_available,
+        "exercises": [
+            {"name": index.exercises[i]["name"], "sets": sets, "reps": index.exercises[i].get("recommended_reps", 10)}
+            for i, sets in chosen
+        ]
+    }
+
+
+def generate_local_workout(goal, experience_level, time_available, index=None):
+    """Same return type as generate_workout.generate_workout (a JSON string)"""
+    return json.dumps(build_workout(goal, experience_level, time_available, index))
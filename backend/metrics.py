@@ -0,0 +1,299 @@
+# metrics.py
+# Lightweight in-process metrics rendered in Prometheus text format at /metrics - no client library or
+# collector service needed, point Prometheus (or just curl) at the endpoint.
+#   - route latency / status / response size from flask before_request + after_request hooks
+#   - mongo command timings per collection through a pymongo CommandListener
+#   - OpenAI call duration and token usage through chat_completion() / stream_chat_completion(), plus the
+#     retry / circuit breaker / coalescing counters llm_client.py keeps
+# Each observation is a dict lookup plus a bisect under a lock, so it's cheap enough to leave on.
+import bisect
+import os
+import threading
+import time
+
+import openai
+from dotenv import load_dotenv
+from flask import Response, g, request
+from pymongo import monitoring
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+OPENAI_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling a request", ("method", "route")))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requests handled, by status code", ("method", "route", "status")))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "http_response_size_bytes", "Response body size (streamed responses are not counted)", ("method", "route"),
+    buckets=SIZE_BUCKETS))
+MONGO_LATENCY = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds", "Mongo command round trip time", ("collection", "command")))
+MONGO_FAILURES = REGISTRY.register(Counter(
+    "mongo_command_failures_total", "Mongo commands that returned an error", ("collection", "command")))
+OPENAI_LATENCY = REGISTRY.register(Histogram(
+    "openai_request_duration_seconds", "OpenAI completion call time", ("operation", "outcome"),
+    buckets=OPENAI_BUCKETS))
+OPENAI_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "openai_first_token_seconds", "Time until a streamed completion sends its first content", ("operation",),
+    buckets=OPENAI_BUCKETS))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "openai_tokens_total", "Tokens reported in OpenAI usage", ("operation", "type")))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "llm_retries_total", "OpenAI calls retried after a transient error", ("operation", "error")))
+LLM_REJECTED = REGISTRY.register(Counter(
+    "llm_rejected_total", "OpenAI calls refused without reaching the API", ("operation", "reason")))
+LLM_COALESCED = REGISTRY.register(Counter(
+    "llm_coalesced_total", "Calls that shared an identical in-flight request", ("operation",)))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "llm_in_flight", "OpenAI calls currently holding a concurrency slot"))
+LLM_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "llm_circuit_open", "1 while the OpenAI circuit breaker is failing calls fast (0.5 half open)"))
+WRITE_BEHIND_DOCS = REGISTRY.register(Counter(
+    "write_behind_documents_total", "Inserts by how they were written (queued, inline, overflow, failed)",
+    ("collection", "outcome")))
+WRITE_BEHIND_DEPTH = REGISTRY.register(Gauge(
+    "write_behind_queue_depth", "Documents waiting in the write-behind queue"))
+WRITE_BEHIND_FLUSH = REGISTRY.register(Histogram(
+    "write_behind_flush_seconds", "Time to write one write-behind batch", ("collection",)))
+WRITE_BEHIND_BATCH = REGISTRY.register(Histogram(
+    "write_behind_batch_size", "Documents per write-behind insert_many", ("collection",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500, 1000)))
+RECIPE_LOOKUPS = REGISTRY.register(Counter(
+    "recipe_index_lookups_total", "Meal requests checked against the local recipe index", ("outcome",)))
+
+
+# Mongo
+
+# commands that aren't about a collection (hello, ping, endSessions...) are grouped under this
+NO_COLLECTION = "-"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Pass to MongoClient(event_listeners=[...]); the started event carries the collection, the
+    succeeded/failed events carry the duration, so the two are joined on request_id"""
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else NO_COLLECTION
+        self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event):
+        return self._pending.pop((event.connection_id, event.request_id), NO_COLLECTION)
+
+    def succeeded(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, self._finish(event), event.command_name)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_FAILURES.inc(collection, event.command_name)
+
+
+mongo_listener = MongoCommandMetrics()
+
+
+# OpenAI
+
+def chat_completion(operation, **kwargs):
+    """openai.ChatCompletion.create with its duration and token usage recorded under `operation`"""
+    start = time.perf_counter()
+    try:
+        response = openai.ChatCompletion.create(**kwargs)
+    except Exception:
+        OPENAI_LATENCY.observe(time.perf_counter() - start, operation, "error")
+        raise
+    OPENAI_LATENCY.observe(time.perf_counter() - start, operation, "ok")
+    usage = response.get("usage") or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            OPENAI_TOKENS.inc(operation, kind.split("_")[0], amount=usage[kind])
+    return response
+
+
+def stream_chat_completion(operation, **kwargs):
+    """
+    Streamed openai.ChatCompletion.create - yields the content deltas as they arrive and records the time to
+    the first one as well as the total. Streams carry no usage block, so completion tokens are counted per chunk.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    chunks = 0
+    try:
+        for chunk in openai.ChatCompletion.create(stream=True, **kwargs):
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if not delta:
+                continue
+            if chunks == 0:
+                OPENAI_FIRST_TOKEN.observe(time.perf_counter() - start, operation)
+            chunks += 1
+            yield delta
+        outcome = "ok"
+    except GeneratorExit:
+        outcome = "cancelled"  # the client went away and the route closed the stream
+        raise
+    finally:
+        OPENAI_LATENCY.observe(time.perf_counter() - start, operation, outcome)
+        if chunks:
+            OPENAI_TOKENS.inc(operation, "completion", amount=chunks)
+
+
+# Flask
+
+def _route_label():
+    # the url rule ("/api/workout-logs/<user_id>"), not the path, so labels stay bounded
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _record_response(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    route = _route_label()
+    HTTP_LATENCY.observe(time.perf_counter() - start, request.method, route)
+    HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+    size = None if response.is_streamed else response.content_length
+    if size is not None:
+        HTTP_RESPONSE_SIZE.observe(size, request.method, route)
+    return response
+
+
+def metrics_view():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app, path="/metrics"):
+    """Register the timing hooks and the /metrics route (no-op when METRICS_ENABLED=0)"""
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_response)
+    app.add_url_rule(path, "metrics", metrics_view)
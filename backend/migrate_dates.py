@@ -0,0 +1,81 @@
+# migrate_dates.py
+# One-off (and safe to re-run) conversion of the string dates older documents carry to BSON datetimes - see dates.py.
+#   python migrate_dates.py                      -> convert every field in dates.DATE_FIELDS
+#   python migrate_dates.py workout_logs         -> just these collections
+#   python migrate_dates.py --dry-run            -> count what would change, write nothing
+# Documents are read in _id order, BATCH at a time, and each batch is one unordered bulk_write, so the app can keep
+# running: an update only applies while the field still holds the string that was read, and only strings are
+# selected, so an interrupted run just picks up where it stopped.
+# '%Y-%m-%d %H:%M:%S' values were written with datetime.now(), so they're read as this machine's local time and
+# stored as UTC (--assume-utc if the server ran in UTC anyway); plain '%Y-%m-%d' days become midnight UTC.
+# Values that don't parse are left alone and reported.
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from dates import DATE_FIELDS, parse_date
+
+load_dotenv()
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def migrate_field(collection, field, batch_size=DEFAULT_BATCH_SIZE, local=True, dry_run=False):
+    """Convert collection.field from strings to datetimes - returns (converted, unparseable)"""
+    converted = unparseable = 0
+    last_id = None
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        docs = list(collection.find(query, {field: 1}).sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        writes = []
+        for doc in docs:
+            value = parse_date(doc[field], local=local)
+            if value is None:
+                unparseable += 1
+                print(f"  {collection.name}.{field}: can't parse {doc[field]!r} on {doc['_id']}")
+                continue
+            writes.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if writes and not dry_run:
+            collection.bulk_write(writes, ordered=False)
+        converted += len(writes)
+    return converted, unparseable
+
+
+def migrate(db, collections=None, batch_size=DEFAULT_BATCH_SIZE, local=True, dry_run=False):
+    """Run migrate_field for every date field of the given collections (all of DATE_FIELDS by default)"""
+    results = {}
+    for name, fields in DATE_FIELDS.items():
+        if collections and name not in collections:
+            continue
+        for field in fields:
+            start = time.perf_counter()
+            converted, unparseable = migrate_field(db[name], field, batch_size, local, dry_run)
+            results[f"{name}.{field}"] = (converted, unparseable)
+            print(f"{name + '.' + field:34} {'would convert' if dry_run else 'converted'} {converted:>8}"
+                  f"   unparseable {unparseable:>4}   {time.perf_counter() - start:.1f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert string dates to BSON datetimes")
+    parser.add_argument("collections", nargs="*", help=f"default: {', '.join(DATE_FIELDS)}")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--assume-utc", action="store_true", help="the strings were written in UTC, not local time")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    unknown = set(args.collections) - set(DATE_FIELDS)
+    if unknown:
+        parser.error(f"no date fields known for: {', '.join(sorted(unknown))}")
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    migrate(client["fitness_app"], args.collections, max(1, args.batch_size), not args.assume_utc, args.dry_run)
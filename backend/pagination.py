@@ -0,0 +1,123 @@
+# pagination.py
+# Keyset (cursor) pagination and NDJSON streaming for the history routes in app.py.
+# Pages are ordered newest first on (date, _id) so the (user_id, date) indexes can be walked
+# without skip(), and the "next" token is just the last (date, _id) seen, base64 encoded.
+import base64
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Response, jsonify, request
+
+from json_provider import dumps_bytes
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(doc, date_field):
+    """Build the opaque next token from the last document on a page"""
+    payload = {"id": str(doc["_id"])}
+    if date_field:
+        value = doc.get(date_field)
+        if isinstance(value, datetime):
+            payload["d"] = value.isoformat()
+            payload["t"] = "dt"
+        else:
+            payload["d"] = value
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Reverse of encode_cursor - raises ValueError if the token was tampered with"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        date_value = payload.get("d")
+        if payload.get("t") == "dt":
+            date_value = datetime.fromisoformat(date_value)
+        return date_value, ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_query(query, date_field, cursor):
+    """Add the 'older than the cursor' condition to a query (sort is date desc, _id desc)"""
+    if not cursor:
+        return query
+    date_value, last_id = decode_cursor(cursor)
+    if not date_field:
+        return {**query, "_id": {"$lt": last_id}}
+    older = [
+        {date_field: {"$lt": date_value}},
+        {date_field: date_value, "_id": {"$lt": last_id}}
+    ]
+    if isinstance(date_value, datetime):
+        # strings sort below dates, so documents migrate_dates.py hasn't converted yet come after every datetime
+        older.append({date_field: {"$type": "string"}})
+    return {**query, "$or": older}
+
+
+def sort_keys(date_field):
+    return [(date_field, -1), ("_id", -1)] if date_field else [("_id", -1)]
+
+
+def find_page(collection, query, projection=None, date_field="date", limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Fetch one page, returns (documents, next_token). next_token is None on the last page.
+    One extra document is read to know if there is another page without a count() query.
+    """
+    docs = list(
+        collection.find(keyset_query(query, date_field, cursor), projection)
+        .sort(sort_keys(date_field))
+        .limit(limit + 1)
+    )
+    next_token = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_token = encode_cursor(docs[-1], date_field)
+    return docs, next_token
+
+
+def stream_ndjson(cursor, include_id=False):
+    """Yield one JSON line per document straight from the pymongo cursor, so the full history is never held in memory"""
+    for doc in cursor:
+        if not include_id:
+            doc.pop("_id", None)
+        yield dumps_bytes(doc) + b"\n"
+
+
+def wants_paging():
+    return any(arg in request.args for arg in ("limit", "cursor", "stream"))
+
+
+def paged_response(collection, query, key, projection=None, date_field="date", include_id=False):
+    """
+    Handles ?limit=&cursor= (keyset pages) and ?stream=ndjson for a history route.
+    Returns None when the request asked for neither, so the route can fall back to its full response.
+    projection should not exclude _id - it's needed for the cursor and removed here unless include_id.
+    """
+    if not wants_paging():
+        return None
+
+    cursor = request.args.get("cursor")
+    try:
+        page_query = keyset_query(query, date_field, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("stream") == "ndjson":
+        results = collection.find(page_query, projection).sort(sort_keys(date_field))
+        return Response(stream_ndjson(results, include_id), mimetype="application/x-ndjson")
+
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    docs, next_token = find_page(collection, query, projection, date_field, limit, cursor)
+    if not include_id:
+        for doc in docs:
+            doc.pop("_id", None)
+    return jsonify({key: docs, "next": next_token}), 200
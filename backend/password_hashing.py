@@ -0,0 +1,99 @@
+# password_hashing.py
+# pbkdf2 hashing is deliberately slow, so signup/login run it in a process pool instead of on the request thread.
+# Admission is bounded - once PASSWORD_HASH_QUEUE hashes are waiting, new ones are refused (HashingBusy -> 503)
+# instead of piling up. Logins also upgrade old hashes when the configured work factor changes.
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+load_dotenv()
+
+# e.g. "pbkdf2:sha256:1000000" - bump the iterations and users are rehashed next time they log in
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", 8))
+# 0 workers = hash inline on the request thread (handy for debugging)
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# max hashes running + waiting before requests get a 503
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", max(HASH_WORKERS, 1) * 4))
+
+
+class HashingBusy(Exception):
+    """Too many hashes already queued"""
+
+
+def full_method(method):
+    """'pbkdf2:sha256' -> 'pbkdf2:sha256:<werkzeug default iterations>' so it can be compared with stored hashes"""
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        if len(parts) == 1:
+            parts.append("sha256")
+        if len(parts) == 2:
+            parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ":".join(parts)
+
+
+def needs_rehash(stored_hash, method=HASH_METHOD):
+    return stored_hash.split("$", 1)[0] != full_method(method)
+
+
+# These two run inside the worker processes, so they have to be plain module level functions
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify(stored_hash, password, method, salt_length):
+    """(matches, new hash if the stored one uses an old work factor) - one trip to the pool for both"""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, method):
+        return True, _hash(password, method, salt_length)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE, method=HASH_METHOD, salt_length=SALT_LENGTH):
+        self.workers = workers
+        self.method = method
+        self.salt_length = salt_length
+        self._slots = threading.BoundedSemaphore(max(queue_size, 1))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self.rejected = 0
+
+    def _executor(self):
+        # created on first use so the flask reloader's parent process doesn't start workers it never uses
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._count_lock:
+                self.rejected += 1
+            raise HashingBusy("Too many sign-in requests right now, please try again shortly")
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash_password(self, password):
+        return self._run(_hash, password, self.method, self.salt_length)
+
+    def verify_password(self, stored_hash, password):
+        """Returns (matches, new_hash) - new_hash is set when the stored hash should be replaced"""
+        return self._run(_verify, stored_hash, password, self.method, self.salt_length)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -2,6 +2,8 @@
 import json
 from pymongo import MongoClient
 
+from reference_cache import bump_version
+
 # Connect to MongoDB
 client = MongoClient("mongodb://localhost:27017/")
 db = client["fitness_app"]
@@ -15,4 +17,7 @@ with open('exercises.json', 'r') as file:
 
 # Insert exercises into the database
 result = db.exercise_library.insert_many(exercises)
-print(f"Added {len(result.inserted_ids)} exercises to the database")
\ No newline at end of file
+print(f"Added {len(result.inserted_ids)} exercises to the database")
+
+# Tell running servers to rebuild their cached copy of the library
+bump_version(db, "exercise_library")
\ No newline at end of file
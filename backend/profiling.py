@@ -0,0 +1,163 @@
+# profiling.py
+# Opt-in profiling of single requests. With PROFILING_ENABLED=1 a request carrying "X-Profile: cpu|memory|all"
+# (or ?_profile=cpu) runs under cProfile and/or tracemalloc and the results are written to PROFILE_DIR:
+#   <id>.prof      pstats dump - python -m pstats profiles/<id>.prof, or snakeviz
+#   <id>.txt       top functions by cumulative time
+#   <id>.mem.txt   top allocation sites and peak traced memory
+# PROFILE_SAMPLE_RATE (0-1) profiles that share of ordinary requests too, for continuous sampling.
+# It wraps the WSGI app so streamed responses (meal plan batches) are profiled until the last chunk is sent.
+# When disabled nothing is installed, so it costs nothing.
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") in ("1", "true", "True")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SAMPLE_MODE = os.getenv("PROFILE_SAMPLE_MODE", "cpu")
+# when set, X-Profile is only honoured together with a matching X-Profile-Token header
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", 30))
+
+MODES = {"cpu": (True, False), "memory": (False, True), "all": (True, True)}
+
+
+class ProfiledRequest:
+    """cProfile / tracemalloc session for one request, written out by finish()"""
+
+    def __init__(self, mode, method, path, directory, top):
+        self.cpu, self.memory = MODES[mode]
+        self.directory = directory
+        self.top = top
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}-{uuid.uuid4().hex[:6]}"
+        self.profiler = cProfile.Profile() if self.cpu else None
+        self.started = time.perf_counter()
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start(10)
+        if self.profiler:
+            self.profiler.enable()
+
+    def finish(self):
+        if self.profiler:
+            self.profiler.disable()
+        elapsed = time.perf_counter() - self.started
+        # snapshot before writing anything so the report doesn't include our own pstats work
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.id)
+
+        if self.profiler:
+            self.profiler.dump_stats(base + ".prof")
+            summary = io.StringIO()
+            summary.write(f"{self.id}  {elapsed * 1000:.1f} ms wall\n\n")
+            pstats.Stats(self.profiler, stream=summary).sort_stats("cumulative").print_stats(self.top)
+            with open(base + ".txt", "w") as file:
+                file.write(summary.getvalue())
+
+        if self.memory:
+            with open(base + ".mem.txt", "w") as file:
+                file.write(f"{self.id}  peak {peak / 1024:.1f} KiB, still allocated {current / 1024:.1f} KiB\n\n")
+                for stat in snapshot.statistics("lineno")[:self.top]:
+                    file.write(f"{stat}\n")
+
+        print(f"Profiled request written to {base}.*")
+
+
+class _ProfiledBody:
+    """Keeps the session open while the server iterates a (possibly streamed) response"""
+
+    def __init__(self, body, on_close):
+        self.body = body
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            self.on_close()
+
+
+class ProfilingMiddleware:
+    def __init__(self, wsgi_app, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE,
+                 sample_mode=PROFILE_SAMPLE_MODE, token=PROFILE_TOKEN, top=PROFILE_TOP):
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.sample_mode = sample_mode
+        self.token = token
+        self.top = top
+        # cProfile and tracemalloc are process wide, so only one request is profiled at a time -
+        # anything that asks while another is running is simply served unprofiled
+        self._busy = threading.Lock()
+
+    def requested_mode(self, environ):
+        mode = environ.get("HTTP_X_PROFILE")
+        if not mode and "_profile=" in environ.get("QUERY_STRING", ""):
+            mode = parse_qs(environ["QUERY_STRING"]).get("_profile", [""])[0]
+        if mode:
+            if self.token and environ.get("HTTP_X_PROFILE_TOKEN") != self.token:
+                return None
+            return mode if mode in MODES else "cpu"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.sample_mode
+        return None
+
+    def __call__(self, environ, start_response):
+        mode = self.requested_mode(environ)
+        if mode is None or not self._busy.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        session = ProfiledRequest(mode, environ.get("REQUEST_METHOD", "GET"), environ.get("PATH_INFO", "/"),
+                                  self.directory, self.top)
+
+        def finish():
+            try:
+                session.finish()
+            except Exception as e:
+                print(f"Could not write profile {session.id}: {e}")
+            finally:
+                self._busy.release()
+
+        def profiled_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [("X-Profile-Id", session.id)], exc_info)
+
+        session.start()
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except Exception:
+            finish()
+            raise
+        return _ProfiledBody(body, finish)
+
+
+def init_app(app):
+    """Wrap app.wsgi_app when PROFILING_ENABLED=1, otherwise leave the app untouched"""
+    if PROFILING_ENABLED:
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+        print(f"Request profiling on - profiles go to {PROFILE_DIR} (sample rate {PROFILE_SAMPLE_RATE})")
@@ -0,0 +1,60 @@
+# projections.py
+# ?view=summary and ?fields=a,b,c for the list routes, turned into mongo projections so the big fields
+# (workout_details text, meal_details JSON, recipe instructions) never leave the database when a list view
+# only shows a name and a date. Either option returns _id (as a string) so the client can fetch the full
+# document from the matching detail route when an item is opened. ?view=full (the default) is unchanged.
+import re
+
+from flask import request
+
+# What each list view actually renders
+SUMMARY_FIELDS = {
+    "workout_history": ["date", "goal", "experience_level", "time_available", "source"],
+    "workout_logs": ["date", "duration", "mood", "exercises.name"],
+    "meal_history": ["date", "meal_type", "calories", "day"],
+    "saved_recipes": ["recipe_name", "date_saved", "nutrition"],
+    "workout_plans": ["plan_name", "exercises.name"],
+    "workout_bank": ["exercise_name", "sets", "reps"],
+}
+VIEWS = ("full", "summary")
+MAX_FIELDS = 20
+FIELD_RE = re.compile(r"^[A-Za-z_]\w*(?:\.\w+)*$")
+
+
+def parse_fields(raw):
+    fields = [field.strip() for field in raw.split(",") if field.strip()]
+    if not fields:
+        raise ValueError("fields must list at least one field")
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be requested")
+    for field in fields:
+        if not FIELD_RE.match(field):
+            raise ValueError(f"Invalid field name: {field}")
+    return fields
+
+
+def list_projection(collection_name, date_field="date"):
+    """
+    Projection for the request's ?fields= / ?view=, or None for full documents.
+    The date field is always kept since pages are keyed on it. Raises ValueError on bad input.
+    """
+    raw_fields = request.args.get("fields")
+    view = request.args.get("view", "full")
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(VIEWS)}")
+
+    if raw_fields:
+        fields = parse_fields(raw_fields)
+    elif view == "summary":
+        fields = SUMMARY_FIELDS[collection_name]
+    else:
+        return None
+
+    projection = {field: 1 for field in fields}
+    if date_field:
+        projection[date_field] = 1
+    # a parent and its child ("exercises" and "exercises.name") is a path collision in mongo - the parent wins
+    for field in list(projection):
+        if any(field.startswith(parent + ".") for parent in projection if parent != field):
+            del projection[field]
+    return projection
@@ -0,0 +1,365 @@
+# recipe_index.py
+# Local retrieval layer in front of the meal generator. Every meal in meal_history and every saved recipe is
+# indexed as a TF-IDF vector over its dish names, ingredients and the meal_request that produced it. A new
+# request is scored against the meals that pass the hard filters (meal type, dietary preferences, calorie band)
+# and when the best cosine similarity clears RECIPE_MATCH_THRESHOLD the stored meal is served in milliseconds
+# instead of waiting seconds for a completion.
+# Vectors live in growing CSR arrays (term ids + weights per meal), so adding a meal is an append; idf and the
+# meal norms are recomputed with NumPy on the next query, which is O(non-zeros), vectorised and always exact.
+# Meals saved by this process are added as they are inserted, refresh() picks up ones other processes saved.
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+
+import metrics
+from generate_meal import PLACEHOLDER_INSTRUCTIONS
+
+load_dotenv()
+
+# Defaults, overridable from .env
+RECIPE_CACHE_ENABLED = os.getenv("RECIPE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+RECIPE_MATCH_THRESHOLD = float(os.getenv("RECIPE_MATCH_THRESHOLD", 0.6))
+RECIPE_CALORIE_TOLERANCE = float(os.getenv("RECIPE_CALORIE_TOLERANCE", 0.15))  # share of the requested calories
+RECIPE_CALORIE_MIN_BAND = float(os.getenv("RECIPE_CALORIE_MIN_BAND", 50))
+RECIPE_MATCH_CHOICES = int(os.getenv("RECIPE_MATCH_CHOICES", 3))  # pick at random among the best few, for variety
+RECIPE_INDEX_REFRESH_SECONDS = float(os.getenv("RECIPE_INDEX_REFRESH_SECONDS", 30))
+
+# a word in a dish name or the request says more about the meal than one in the ingredient list
+FIELD_WEIGHTS = {"name": 2.0, "request": 2.0, "ingredient": 1.0}
+# quantities and units are noise when comparing recipes
+STOP_WORDS = {
+    "a", "an", "and", "or", "of", "the", "with", "to", "for", "in", "on", "some", "my", "me", "i", "want",
+    "g", "kg", "mg", "ml", "l", "oz", "lb", "lbs", "cup", "cups", "tbsp", "tsp", "tablespoon", "tablespoons",
+    "teaspoon", "teaspoons", "handful", "pinch", "slice", "slices", "piece", "pieces", "large", "small", "medium",
+    "fresh", "chopped", "diced", "sliced", "optional", "taste", "something", "meal", "dish",
+}
+TOKEN_RE = re.compile(r"[a-z]+")
+REFRESH_OVERLAP = timedelta(seconds=5)  # ObjectIds from different processes aren't ordered within a second
+MAX_DIETS = 63  # dietary preferences are a bitmask
+
+
+def tokenize(text):
+    words = []
+    for word in TOKEN_RE.findall((text or "").lower()):
+        if len(word) < 2 or word in STOP_WORDS:
+            continue
+        # crude plural folding so "eggs" and "egg" meet
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _ingredient_text(ingredient):
+    if isinstance(ingredient, dict):
+        return " ".join(str(value) for value in ingredient.values() if isinstance(value, str))
+    return str(ingredient)
+
+
+def _calories(*values):
+    for value in values:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            return value
+    return math.nan
+
+
+class _Buffer:
+    """Append-only NumPy array with amortised growth"""
+
+    def __init__(self, dtype):
+        self.data = np.zeros(1024, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.zeros(max(end, len(self.data) * 2), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class RecipeIndex:
+    def __init__(self, db, threshold=RECIPE_MATCH_THRESHOLD, calorie_tolerance=RECIPE_CALORIE_TOLERANCE,
+                 calorie_min_band=RECIPE_CALORIE_MIN_BAND, choices=RECIPE_MATCH_CHOICES,
+                 refresh_seconds=RECIPE_INDEX_REFRESH_SECONDS):
+        self.db = db
+        self.threshold = threshold
+        self.calorie_tolerance = calorie_tolerance
+        self.calorie_min_band = calorie_min_band
+        self.choices = max(1, choices)
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._last_ids = {"meal_history": None, "saved_recipes": None}
+
+        self.vocabulary = {}  # word -> term id
+        self._df = _Buffer(np.float64)  # meals containing each term
+        self._indices = _Buffer(np.int32)  # CSR: term ids of every meal, back to back
+        self._weights = _Buffer(np.float32)  # CSR: 1 + log(field weighted tf)
+        self._indptr = _Buffer(np.int64)
+        self._indptr.extend([0])
+        self._meal_types = _Buffer(np.int32)  # -1 = unknown (saved recipes), fits any meal type
+        self._calories = _Buffer(np.float64)  # nan = unknown
+        self._diets = _Buffer(np.uint64)
+        self._meal_type_codes = {}
+        self._diet_bits = {}
+        self.meals = []  # served meal dict per row
+        self._seen = set()  # source document ids
+        self._signatures = set()  # (dish names, diets, calories) already indexed - the same meal twice adds nothing
+        self._names = set()  # dish names already indexed, so a saved copy of a generated dish isn't added again
+        self._cached = None  # (meal count, weights * idf, norms, idf)
+        self.counters = {"hits": 0, "misses": 0, "no_text": 0, "indexed": 0, "skipped": 0}
+
+    def __len__(self):
+        return len(self.meals)
+
+    # Building
+
+    def _diet_mask(self, preferences, create):
+        mask = 0
+        for preference in preferences or []:
+            key = str(preference).strip().lower()
+            if not key:
+                continue
+            bit = self._diet_bits.get(key)
+            if bit is None:
+                if not create or len(self._diet_bits) >= MAX_DIETS:
+                    return None  # nothing can carry a preference the index has never seen
+                bit = self._diet_bits[key] = len(self._diet_bits)
+            mask |= 1 << bit
+        return mask
+
+    def _add(self, doc_id, meal, fields, meal_type, diets, calories, names_only=False):
+        """Index one meal; fields is [(field, text)]. Caller holds the lock."""
+        if doc_id in self._seen:
+            return False
+        self._seen.add(doc_id)
+        names = tuple(sorted(str(dish.get("name") or "").strip().lower() for dish in meal.get("dishes", [])))
+        signature = (names, tuple(sorted(str(diet).lower() for diet in diets or [])),
+                     None if math.isnan(calories) else round(calories / 50))
+        if signature in self._signatures or (names_only and names in self._names):
+            self.counters["skipped"] += 1
+            return False
+
+        counts = {}
+        for field, text in fields:
+            for word in tokenize(text):
+                counts[word] = counts.get(word, 0.0) + FIELD_WEIGHTS[field]
+        if not counts:
+            self.counters["skipped"] += 1
+            return False
+        self._signatures.add(signature)
+        self._names.add(names)
+
+        term_ids = []
+        for word in counts:
+            term = self.vocabulary.get(word)
+            if term is None:
+                term = self.vocabulary[word] = len(self.vocabulary)
+                self._df.extend([0.0])
+            term_ids.append(term)
+        self._df.data[term_ids] += 1
+        self._indices.extend(term_ids)
+        self._weights.extend([1.0 + math.log(tf) for tf in counts.values()])
+        self._indptr.extend([self._indices.size])
+
+        code = -1
+        if meal_type:
+            code = self._meal_type_codes.setdefault(meal_type.strip().lower(), len(self._meal_type_codes))
+        self._meal_types.extend([code])
+        self._calories.extend([calories])
+        self._diets.extend([self._diet_mask(diets, create=True) or 0])
+        self.meals.append(meal)
+        self._cached = None
+        self.counters["indexed"] += 1
+        return True
+
+    def add_meal(self, entry):
+        """Index a meal_history document (meal_details is the JSON string the generator returned)"""
+        if entry.get("source") == "recipe_cache":
+            return False  # served from here in the first place
+        try:
+            meal = entry.get("meal_details")
+            meal = json.loads(meal) if isinstance(meal, str) else dict(meal or {})
+        except (TypeError, ValueError):
+            return False
+        dishes = meal.get("dishes")
+        if not isinstance(dishes, list) or not dishes or any(
+                not isinstance(dish, dict) or dish.get("instructions") in PLACEHOLDER_INSTRUCTIONS for dish in dishes):
+            return False  # fallback meals aren't worth serving again
+
+        fields = [("request", entry.get("meal_request"))]
+        for dish in dishes:
+            fields.append(("name", dish.get("name")))
+            ingredients = dish.get("ingredients") or []
+            fields.extend(("ingredient", _ingredient_text(item)) for item in (ingredients if isinstance(ingredients, list) else [ingredients]))
+        meal_type = entry.get("meal_type") or meal.get("meal_type")
+        with self._lock:
+            return self._add(("meal_history", str(entry.get("_id"))), meal, fields, meal_type,
+                             meal.get("dietary_preferences"), _calories(meal.get("calories"), entry.get("calories")))
+
+    def add_recipe(self, recipe):
+        """Index a saved_recipes document. Saved recipes carry no dietary preferences or meal type, so they only
+        match requests without preferences, for any meal type."""
+        nutrition = recipe.get("nutrition") or {}
+        dish = {
+            "name": recipe.get("recipe_name"),
+            "ingredients": recipe.get("ingredients") or [],
+            "instructions": recipe.get("instructions"),
+            **{key: nutrition[key] for key in ("protein", "carbs", "fat") if nutrition.get(key)},
+        }
+        if not dish["name"] or dish["instructions"] in PLACEHOLDER_INSTRUCTIONS:
+            return False
+        calories = _calories(nutrition.get("calories"))
+        meal = {"calories": None if math.isnan(calories) else int(calories), "dietary_preferences": [], "dishes": [dish]}
+        ingredients = dish["ingredients"] if isinstance(dish["ingredients"], list) else [dish["ingredients"]]
+        fields = [("name", dish["name"])] + [("ingredient", _ingredient_text(item)) for item in ingredients]
+        with self._lock:
+            return self._add(("saved_recipes", str(recipe.get("_id"))), meal, fields, None, [], calories, names_only=True)
+
+    def refresh(self, force=False):
+        """Index meals/recipes saved since the last refresh (all of them the first time)"""
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < self.refresh_seconds:
+            return 0
+        if not self._refresh_lock.acquire(blocking=force):
+            return 0  # another request is already refreshing
+        try:
+            self._refreshed_at = now
+            added = 0
+            for collection, add in (("meal_history", self.add_meal), ("saved_recipes", self.add_recipe)):
+                query = {}
+                last_id = self._last_ids[collection]
+                if last_id is not None:
+                    query = {"_id": {"$gt": ObjectId.from_datetime(last_id.generation_time - REFRESH_OVERLAP)}}
+                for doc in self.db[collection].find(query).sort("_id", 1):
+                    added += add(doc)
+                    self._last_ids[collection] = doc["_id"]
+            return added
+        finally:
+            self._refresh_lock.release()
+
+    def load(self):
+        added = self.refresh(force=True)
+        print(f"Recipe index: {len(self)} meals, {len(self.vocabulary)} terms ({added} loaded)")
+        return added
+
+    # Matching
+
+    def _weighted(self):
+        """Per-meal tf-idf weights and norms for the current corpus, recomputed only after meals were added"""
+        count = len(self.meals)
+        if self._cached is None or self._cached[0] != count:
+            idf = np.log((1.0 + count) / (1.0 + self._df.view())) + 1.0
+            indices = self._indices.view()
+            weights = self._weights.view() * idf[indices]
+            norms = np.sqrt(np.add.reduceat(weights * weights, self._indptr.view()[:-1]))
+            self._cached = (count, weights, norms, idf)
+        return self._cached
+
+    def match(self, meal_type, preferences, meal_request, calories=None, exclude=()):
+        """
+        A stored meal (dict, same shape as the generator's JSON) close enough to the request, or None.
+        Only requests with some meal_request text are matched - without it there's nothing to compare.
+        exclude is a set of rows already used (e.g. by earlier slots of the same meal plan).
+        """
+        self.refresh()
+        counts = {}
+        for word in tokenize(meal_request):
+            counts[word] = counts.get(word, 0.0) + 1.0
+        if not counts:
+            self.counters["no_text"] += 1
+            metrics.RECIPE_LOOKUPS.inc("no_text")
+            return None
+
+        with self._lock:
+            if not self.meals:
+                self.counters["misses"] += 1
+                metrics.RECIPE_LOOKUPS.inc("miss")
+                return None
+            count, weights, norms, idf = self._weighted()
+            unseen_idf = math.log(1.0 + count) + 1.0
+            query = np.zeros(len(self.vocabulary))
+            query_norm = 0.0
+            for word, tf in counts.items():
+                weight = 1.0 + math.log(tf)
+                term = self.vocabulary.get(word)
+                if term is None:
+                    query_norm += (weight * unseen_idf) ** 2  # a word no meal has still counts against the match
+                else:
+                    query[term] = weight * idf[term]
+                    query_norm += query[term] ** 2
+            indptr = self._indptr.view()
+            dots = np.add.reduceat(weights * query[self._indices.view()], indptr[:-1])
+            scores = dots / (norms * math.sqrt(query_norm))
+
+            mask = scores >= self.threshold
+            code = self._meal_type_codes.get((meal_type or "").strip().lower())
+            if meal_type:
+                types = self._meal_types.view()
+                mask &= (types == -1) | (types == (code if code is not None else -2))
+            diet_mask = self._diet_mask(preferences, create=False)
+            if diet_mask is None:
+                mask[:] = False
+            elif diet_mask:
+                diet_mask = np.uint64(diet_mask)
+                mask &= (self._diets.view() & diet_mask) == diet_mask
+            target = _calories(calories)
+            if not math.isnan(target):
+                band = max(self.calorie_min_band, target * self.calorie_tolerance)
+                mask &= np.abs(self._calories.view() - target) <= band  # nan (unknown) compares False
+
+            candidates = [row for row in np.flatnonzero(mask) if row not in exclude]
+            if not candidates:
+                self.counters["misses"] += 1
+                metrics.RECIPE_LOOKUPS.inc("miss")
+                return None
+            best = sorted(candidates, key=lambda row: -scores[row])[:self.choices]
+            row = random.choice(best)
+            self.counters["hits"] += 1
+            metrics.RECIPE_LOOKUPS.inc("hit")
+            return {"meal": self.meals[row], "row": int(row), "similarity": round(float(scores[row]), 3)}
+
+    def serve(self, match, meal_type, preferences, calories=None):
+        """The matched meal as the JSON string the routes store and return, filled in for this request"""
+        meal = dict(match["meal"])
+        meal["meal_type"] = meal_type or meal.get("meal_type")
+        meal["dietary_preferences"] = list(preferences or meal.get("dietary_preferences") or [])
+        if meal.get("calories") is None:
+            meal.pop("calories", None)
+            if calories:
+                meal["calories"] = int(calories)
+        return json.dumps(meal)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            meals, terms = len(self.meals), len(self.vocabulary)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "meals": meals,
+            "terms": terms,
+            "threshold": self.threshold,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
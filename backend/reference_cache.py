@@ -0,0 +1,119 @@
+# reference_cache.py
+# In-process cache for the near-static reference data (exercise_library, workouts, tips) and the exercise search index.
+# Everything is loaded once, each response body is serialised up front together with a strong ETag,
+# and the whole snapshot is rebuilt when a version stamp in mongo changes - populate_exercise_db.py
+# (and db_setup.py) bump it with bump_version() whenever they reload a collection.
+# Only writes followed by bump_version() are noticed: anything else that changes exercise_library or workouts
+# (a new seed script, a mongo shell, a benchmark) has to call it too, or running apps keep serving the old data.
+import hashlib
+import random
+import threading
+import time
+
+from exercise_search import ExerciseSearchIndex
+from local_workout import ExerciseIndex
+from json_provider import dumps_bytes
+
+VERSIONS_COLLECTION = "reference_versions"
+CACHED_COLLECTIONS = ("exercise_library", "workouts")
+
+# How often (seconds) a request may check mongo for a new version stamp
+VERSION_CHECK_SECONDS = 5
+
+
+def bump_version(db, collection):
+    """Call after reloading a reference collection so every running app rebuilds its cache"""
+    db[VERSIONS_COLLECTION].update_one({"_id": collection}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def serialize(payload, status=200):
+    """(status, body bytes, strong etag) for a JSON payload"""
+    body = dumps_bytes(payload)
+    return status, body, hashlib.sha1(body).hexdigest()
+
+
+class ReferenceCache:
+    def __init__(self, db, tips, check_interval=VERSION_CHECK_SECONDS):
+        self.db = db
+        self.tips = list(tips)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._versions = None
+        self._checked_at = 0.0
+
+    def _current_versions(self):
+        docs = self.db[VERSIONS_COLLECTION].find({"_id": {"$in": list(CACHED_COLLECTIONS)}})
+        versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+        return tuple(versions.get(name, 0) for name in CACHED_COLLECTIONS)
+
+    def _build(self):
+        exercises = list(self.db.exercise_library.find({}, {"_id": 0}))
+        workouts = list(self.db.workouts.find({}, {"_id": 0}))
+
+        by_category = {}
+        for exercise in exercises:
+            by_category.setdefault(exercise.get("category"), []).append(exercise)
+        by_goal = {}
+        for workout in workouts:
+            by_goal.setdefault(workout.get("goal"), []).append(workout)
+
+        return {
+            "exercise_library": serialize({"exercises": exercises}),
+            "exercise_library_by_category": {
+                category: serialize({"exercises": items}) for category, items in by_category.items()
+            },
+            "workouts_by_goal": {goal: serialize({"workouts": items}) for goal, items in by_goal.items()},
+            "workout_lists": by_goal,
+            "tips": [serialize({"tip": tip}) for tip in self.tips],
+            "exercise_search": ExerciseSearchIndex(exercises),
+            # None until populate_exercise_db.py has filled the collection - local_workout then uses exercises.json
+            "workout_index": ExerciseIndex(exercises) if exercises else None,
+        }
+
+    def load(self):
+        """(Re)build the snapshot - called at startup and whenever the version stamp moves"""
+        versions = self._current_versions()
+        snapshot = self._build()
+        with self._lock:
+            self._snapshot = snapshot
+            self._versions = versions
+            self._checked_at = time.monotonic()
+
+    def _get(self):
+        now = time.monotonic()
+        if self._snapshot is None:
+            self.load()
+        elif now - self._checked_at > self.check_interval:
+            self._checked_at = now
+            if self._current_versions() != self._versions:
+                self.load()
+        return self._snapshot
+
+    def exercise_library(self, category=None):
+        snapshot = self._get()
+        if not category:
+            return snapshot["exercise_library"]
+        return snapshot["exercise_library_by_category"].get(category) or serialize({"exercises": []})
+
+    def workouts_for_goal(self, goal):
+        entry = self._get()["workouts_by_goal"].get(goal)
+        return entry or serialize({"error": "No workouts found for this goal"}, status=404)
+
+    def workout_list(self, goal):
+        """The workouts for a goal as plain documents, for responses that embed them (the dashboard)"""
+        return self._get()["workout_lists"].get(goal, [])
+
+    def exercise_search(self):
+        """Search index over the same snapshot of the library"""
+        return self._get()["exercise_search"]
+
+    def workout_index(self):
+        """local_workout.ExerciseIndex over the same snapshot of the library (None when it's empty)"""
+        return self._get()["workout_index"]
+
+    def tip(self):
+        return random.choice(self._get()["tips"])
+
+    def tip_text(self):
+        return random.choice(self.tips)
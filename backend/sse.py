@@ -0,0 +1,19 @@
+# sse.py
+# Server-sent events for the streaming generation routes. Each event is "event: <name>\ndata: <json>\n\n";
+# the front end reads them with fetch() + a stream reader (EventSource can't POST a body).
+from flask import Response, stream_with_context
+
+from json_provider import dumps
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def sse_response(events):
+    """Stream an iterator of sse_event() strings - compression and proxy buffering are kept out of the way"""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,71 @@
+# stream_json.py
+# Incremental scanner for a JSON completion that is still arriving token by token.
+# ArrayItemStream("exercises") is fed the text as it streams in and hands back each element of the top level
+# "exercises" array the moment its closing brace arrives, so the first exercise (or dish) can be shown
+# long before the model has finished. Text is scanned once - each feed() only looks at the new characters.
+# Leading chatter or ```json fences are skipped naturally since only braces/brackets/strings move the state.
+import json
+
+
+class ArrayItemStream:
+    def __init__(self, key):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_string = None  # most recent string closed at depth 1, i.e. the key before a value
+        self._array_depth = None  # depth inside the target array once it has been entered
+        self._item_start = None
+        self.done = False  # target array closed
+
+    def feed(self, chunk):
+        """Add streamed text, returns the list of array items completed by it (usually 0 or 1)"""
+        self.text += chunk
+        items = []
+        text = self.text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._array_depth is None:
+                        self._last_string = text[self._string_start + 1:index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in "{[":
+                self._depth += 1
+                if (char == "[" and self._depth == 2 and self._array_depth is None and not self.done
+                        and self._last_string == self.key):
+                    self._array_depth = 2
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item_start = index
+            elif char in "}]":
+                if (char == "}" and self._array_depth is not None and self._depth == self._array_depth + 1
+                        and self._item_start is not None):
+                    item = self._parse(text[self._item_start:index + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+                elif char == "]" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self.done = True
+                self._depth = max(0, self._depth - 1)
+        self._pos = len(text)
+        return items
+
+    @staticmethod
+    def _parse(raw):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None  # a malformed element is left for the final parse to deal with
@@ -1,38 +1,173 @@
 import openai
+import hashlib
 import json
 import os
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 
+from dates import utcnow
+from lift_sets import set_count
+from local_workout import default_index
+from llm_client import llm
+from llm_json import INSIGHTS_SCHEMA, LLMJSONError, parse_llm_json
+
 # Load environment variables
 load_dotenv()
 
-def analyze_logged_workouts(workout_logs):
+def _number(value):
+    """Weights/reps come from form inputs, so they can be strings or empty"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _log_day(log):
+    value = log.get("date")
+    if isinstance(value, datetime):
+        return value.date()
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _exercise_sets(exercise):
+    """[(weight, reps)] for an exercise - sets are normally a list of {weight, reps}, older logs just have counts"""
+    sets = exercise.get("sets")
+    if isinstance(sets, list):
+        return [(_number(s.get("weight")), _number(s.get("reps"))) for s in sets if isinstance(s, dict)]
+    return [(0.0, _number(exercise.get("reps")))] * set_count(sets)
+
+
+def _exercise_muscles():
+    """exercise name (lowercase) -> muscle groups, from the exercise library"""
+    index = default_index()
+    return {exercise["name"].lower(): sorted(index.groups[i]) for i, exercise in enumerate(index.exercises)}
+
+
+def _streaks(days):
+    """(longest run of consecutive days, longest and current run of consecutive weeks) with a workout"""
+    ordered = sorted(days)
+    longest_days = run = 1 if ordered else 0
+    for previous, current in zip(ordered, ordered[1:]):
+        run = run + 1 if (current - previous).days == 1 else 1
+        longest_days = max(longest_days, run)
+
+    weeks = sorted({d - timedelta(days=d.weekday()) for d in ordered})
+    longest_weeks = run = 1 if weeks else 0
+    for previous, current in zip(weeks, weeks[1:]):
+        run = run + 1 if (current - previous).days == 7 else 1
+        longest_weeks = max(longest_weeks, run)
+
+    today = utcnow().date()  # log dates are stored in UTC
+    this_week = today - timedelta(days=today.weekday())
+    current_weeks = 0
+    if weeks and (this_week - weeks[-1]).days <= 7:
+        current_weeks = 1
+        for previous, current in zip(reversed(weeks[:-1]), reversed(weeks)):
+            if (current - previous).days != 7:
+                break
+            current_weeks += 1
+    return longest_days, longest_weeks, current_weeks
+
+
+def compute_workout_stats(workout_logs, max_exercises=10):
     """
-    Analyze user workout logs using OpenAI
+    Everything we can work out exactly from the logs ourselves - frequency, streaks, volume per muscle group,
+    per-exercise progression and how mood lines up with duration/volume. This compact summary is what gets
+    sent to the model instead of the raw logs.
+    """
+    muscles = _exercise_muscles()
+    days = []
+    durations = []
+    volume_by_muscle = {}
+    progression = {}
+    moods = {}
+
+    # oldest first so progression reads first -> last
+    for log in sorted(workout_logs, key=lambda l: str(l.get("date"))):
+        day = _log_day(log)
+        if day:
+            days.append(day)
+        duration = _number(log.get("duration"))
+        durations.append(duration)
+
+        session_volume = 0.0
+        for exercise in log.get("exercises", []) or []:
+            name = (exercise.get("name") or "").strip()
+            if not name:
+                continue
+            sets = _exercise_sets(exercise)
+            volume = sum(weight * reps for weight, reps in sets)
+            session_volume += volume
+            for group in muscles.get(name.lower(), ["other"]):
+                volume_by_muscle[group] = volume_by_muscle.get(group, 0) + volume
+
+            top_weight = max((weight for weight, _ in sets), default=0)
+            entry = progression.setdefault(name, {"sessions": 0, "first": top_weight, "last": top_weight, "best": top_weight})
+            entry["sessions"] += 1
+            entry["last"] = top_weight
+            entry["best"] = max(entry["best"], top_weight)
+
+        mood = log.get("mood") or "Unknown"
+        mood_entry = moods.setdefault(mood, {"sessions": 0, "duration": 0.0, "volume": 0.0})
+        mood_entry["sessions"] += 1
+        mood_entry["duration"] += duration
+        mood_entry["volume"] += session_volume
+
+    span_weeks = max(1, ((max(days) - min(days)).days + 1) / 7) if days else 1
+    longest_days, longest_weeks, current_weeks = _streaks(set(days))
+    month_ago = utcnow().date() - timedelta(days=30)
+
+    top_exercises = sorted(progression.items(), key=lambda item: -item[1]["sessions"])[:max_exercises]
+    for _, entry in top_exercises:
+        entry["change_pct"] = round((entry["last"] - entry["first"]) / entry["first"] * 100, 1) if entry["first"] else None
+
+    return {
+        "total_workouts": len(workout_logs),
+        "first_workout": min(days).isoformat() if days else None,
+        "last_workout": max(days).isoformat() if days else None,
+        "workouts_per_week": round(len(workout_logs) / span_weeks, 1),
+        "workouts_last_30_days": sum(1 for d in days if d >= month_ago),
+        "longest_day_streak": longest_days,
+        "longest_week_streak": longest_weeks,
+        "current_week_streak": current_weeks,
+        "avg_duration": round(sum(durations) / len(durations)) if durations else 0,
+        "volume_by_muscle": {group: round(volume) for group, volume in sorted(volume_by_muscle.items(), key=lambda item: -item[1])},
+        "exercise_progression": dict(top_exercises),
+        "mood": {
+            mood: {
+                "sessions": m["sessions"],
+                "avg_duration": round(m["duration"] / m["sessions"]),
+                "avg_volume": round(m["volume"] / m["sessions"])
+            } for mood, m in moods.items()
+        }
+    }
+
+
+def logs_hash(workout_logs):
+    """Content hash of a user's log set - same logs, same hash, so insights don't need regenerating"""
+    canonical = sorted(json.dumps(log, sort_keys=True, default=str) for log in workout_logs)
+    return hashlib.sha256("\n".join(canonical).encode()).hexdigest()
+
+
+def analyze_logged_workouts(workout_logs, stats=None):
+    """
+    Analyze user workout logs using OpenAI - the model gets the precomputed stats, not the raw logs
     """
     if not workout_logs or len(workout_logs) < 3:
         return {"message": "Need at least 3 logged workouts for meaningful analysis."}
-    
-    # Prepare the data for analysis in a compact format
-    analysis_data = []
-    for log in workout_logs:
-        # Extract only the needed fields
-        log_data = {
-            "date": log.get("date"),
-            "exercises": [f"{e.get('name')} - {e.get('sets')}x{e.get('reps')}" for e in log.get("exercises", [])],
-            "duration": log.get("duration"),
-            "mood": log.get("mood"),
-            "notes": log.get("notes", "")[:50]  # shorten long notes
-        }
-        analysis_data.append(log_data)
-    
+
+    if stats is None:
+        stats = compute_workout_stats(workout_logs)
+
     # Prompt for OpenAI
     prompt = f"""
-    Analyze these workout logs and provide insights in JSON format:
-    
-    {json.dumps(analysis_data[:20], indent=2)}  # Limit to 20 most recent workouts
-    
-    Provide analysis in this JSON structure:
+    Here are exact statistics computed from a user's workout logs (weights in the units they logged, volume = weight x reps):
+    {json.dumps(stats, separators=(",", ":"))}
+
+    Interpret them and provide insights in this JSON structure:
     {{
         "consistency": "Analysis of workout frequency and regularity",
         "progress": "Patterns in exercise progression",
@@ -46,8 +181,9 @@ def analyze_logged_workouts(workout_logs):
     
     # Call OpenAI
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo-16k",
+        response = llm.complete(
+            "analyze_logged_workouts",
+            model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a fitness analytics AI that provides data-driven insights from workout logs."},
                 {"role": "user", "content": prompt}
@@ -58,11 +194,10 @@ def analyze_logged_workouts(workout_logs):
         
         analysis = response['choices'][0]['message']['content'].strip()
         
-        # Ensure it's valid JSON
+        # Ensure it's valid JSON with the fields the insights page shows
         try:
-            analysis_json = json.loads(analysis)
-            return analysis_json
-        except json.JSONDecodeError:
+            return parse_llm_json(analysis, INSIGHTS_SCHEMA)
+        except LLMJSONError:
             # If not valid JSON, return as text
             return {"text_analysis": analysis}
             
@@ -71,3 +206,98 @@ def analyze_logged_workouts(workout_logs):
         return {"error": "Failed to analyze workout data."}
 
 
+
+
+# Bucket sizes accepted by the analytics endpoint, mapped to the $dateTrunc unit
+ANALYTICS_BUCKETS = {"day": "day", "week": "week", "month": "month"}
+
+def build_analytics_pipeline(user_id, date_condition=None, bucket="day", recent_since=None):
+    """
+    Build the aggregation pipeline behind /api/analytics - summarises a user's workout_logs
+    inside mongo so only the numbers leave the database, not every log.
+    date_condition is the range from dates.date_range(), recent_since is the cut-off for the "this week" numbers
+    """
+    match = {"user_id": user_id}
+    if date_condition:
+        match["date"] = date_condition
+
+    unit = ANALYTICS_BUCKETS.get(bucket, "day")
+
+    return [
+        # Uses the (user_id, date) index from db_setup
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            "day": {"$toDate": "$date"},  # still converts logs migrate_dates.py hasn't reached
+            # duration is sometimes saved as a string by the tracker form
+            "duration": {"$convert": {"input": "$duration", "to": "double", "onError": 0, "onNull": 0}},
+            "exercise_count": {"$size": {"$ifNull": ["$exercises", []]}},
+            "mood": {"$ifNull": ["$mood", "Unknown"]},
+            "plan": {"$ifNull": ["$plan_used", "Workout"]}
+        }},
+        {"$facet": {
+            "summary": [
+                {"$group": {
+                    "_id": None,
+                    "total_workouts": {"$sum": 1},
+                    "total_duration": {"$sum": "$duration"},
+                    "avg_duration": {"$avg": "$duration"}
+                }}
+            ],
+            "activity": [
+                {"$group": {
+                    "_id": {"$dateTrunc": {"date": "$day", "unit": unit, "startOfWeek": "monday"}},
+                    "workouts": {"$sum": 1},
+                    "duration": {"$sum": "$duration"},
+                    "exercises": {"$avg": "$exercise_count"}
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {
+                    "_id": 0,
+                    "period": {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id"}},
+                    "workouts": 1,
+                    "duration": 1,
+                    "exercises": {"$round": ["$exercises", 1]}
+                }}
+            ],
+            "moods": [
+                {"$group": {"_id": "$mood", "value": {"$sum": 1}}},
+                {"$sort": {"value": -1}},
+                {"$project": {"_id": 0, "name": "$_id", "value": 1}}
+            ],
+            "recent": [
+                {"$match": {"day": {"$gte": recent_since}}} if recent_since else {"$match": {}},
+                {"$sort": {"day": 1}},
+                {"$project": {
+                    "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$day"}},
+                    "plan": 1
+                }}
+            ]
+        }}
+    ]
+
+
+def format_analytics(result):
+    """
+    Turn the single $facet document into the response for the analytics page,
+    adding the running total for the cumulative workouts chart
+    """
+    summary = result["summary"][0] if result.get("summary") else {}
+    activity = result.get("activity", [])
+
+    running_total = 0
+    for period in activity:
+        running_total += period["workouts"]
+        period["total"] = running_total
+
+    return {
+        "summary": {
+            "total_workouts": summary.get("total_workouts", 0),
+            "total_duration": round(summary.get("total_duration") or 0),
+            "avg_duration": round(summary.get("avg_duration") or 0),
+            "workouts_this_week": len(result.get("recent", []))
+        },
+        "activity": activity,
+        "moods": result.get("moods", []),
+        "recent": result.get("recent", [])
+    }
@@ -0,0 +1,246 @@
+# write_behind.py
+# Optional write-behind for the append-only inserts on busy request paths (workout / meal history, workout logs,
+# shopping list items). insert() gives the document its _id up front and hands it to a bounded in-process queue;
+# a background thread groups queued documents per collection and writes each group with one insert_many once
+# WRITE_BEHIND_BATCH_SIZE are waiting or the oldest has waited WRITE_BEHIND_FLUSH_MS - one round trip for many
+# requests instead of one each.
+# Durability knobs:
+#   - WRITE_BEHIND_ENABLED=0 (the default) writes inline, exactly as before
+#   - insert(..., sync=True) - the routes pass it for requests sent with "X-Write-Sync: 1" - writes inline
+#   - reads registered with init_app() flush the collections they read first, so a client reading back what it
+#     just wrote through this process sees it
+#   - a full queue falls back to an inline insert rather than blocking or dropping the write
+#   - close() drains the queue at interpreter exit (atexit), and transient mongo errors are retried
+# Queue depth, batch size and flush latency are exported through metrics.py.
+import atexit
+import os
+import queue
+import threading
+import time
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from flask import request
+from pymongo.errors import AutoReconnect, BulkWriteError, NetworkTimeout
+
+import metrics
+
+load_dotenv()
+
+# Defaults, overridable from .env
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "0") in ("1", "true", "True")
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", 10000))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 200))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", 50))
+WRITE_BEHIND_RETRIES = int(os.getenv("WRITE_BEHIND_RETRIES", 3))
+
+DUPLICATE_KEY = 11000  # a retried batch whose first attempt did reach the server
+
+
+class _Barrier:
+    """Queued behind the documents it has to wait for; set once they are written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    def __init__(self, db, enabled=WRITE_BEHIND_ENABLED, max_queue=WRITE_BEHIND_MAX_QUEUE,
+                 batch_size=WRITE_BEHIND_BATCH_SIZE, flush_ms=WRITE_BEHIND_FLUSH_MS, retries=WRITE_BEHIND_RETRIES):
+        self.db = db
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_ms / 1000
+        self.retries = retries
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._pending = {}  # collection -> documents queued but not written yet
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.counters = {"queued": 0, "inline": 0, "overflow": 0, "written": 0, "failed": 0, "batches": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    # Producers (request threads)
+
+    def insert(self, collection, doc, sync=False):
+        """Insert doc into collection, now or shortly. Returns its _id either way."""
+        if not self.enabled or sync or self._closed:
+            self._count("inline")
+            metrics.WRITE_BEHIND_DOCS.inc(collection, "inline")
+            return self.db[collection].insert_one(doc).inserted_id
+
+        doc.setdefault("_id", ObjectId())
+        self._start()
+        with self._lock:
+            self._pending[collection] = self._pending.get(collection, 0) + 1
+        try:
+            self._queue.put_nowait((collection, doc))
+        except queue.Full:
+            with self._lock:
+                self._pending[collection] -= 1
+            self._count("overflow")
+            metrics.WRITE_BEHIND_DOCS.inc(collection, "overflow")
+            return self.db[collection].insert_one(doc).inserted_id
+        self._count("queued")
+        metrics.WRITE_BEHIND_DOCS.inc(collection, "queued")
+        metrics.WRITE_BEHIND_DEPTH.set(self._queue.qsize())
+        return doc["_id"]
+
+    def insert_many(self, collection, docs, sync=False):
+        """insert() for several documents - list of _ids"""
+        if not self.enabled or sync or self._closed:
+            self._count("inline", len(docs))
+            metrics.WRITE_BEHIND_DOCS.inc(collection, "inline", amount=len(docs))
+            return self.db[collection].insert_many(docs).inserted_ids if docs else []
+        return [self.insert(collection, doc) for doc in docs]
+
+    def barrier(self, *collections, timeout=5.0):
+        """Wait until everything already queued for these collections is written (no-op when nothing is)"""
+        with self._lock:
+            waiting = any(self._pending.get(collection) for collection in collections)
+        if not waiting or self._thread is None:
+            return True
+        marker = _Barrier()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def flush(self, timeout=5.0):
+        """Write everything queued so far"""
+        if self._thread is None:
+            return True
+        marker = _Barrier()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Stop taking writes and drain the queue - registered with atexit"""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        # anything a request managed to queue behind the stop marker
+        batches = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                batches.setdefault(item[0], []).append(item[1])
+            elif isinstance(item, _Barrier):
+                item.done.set()
+        self._flush_all(batches)
+
+    # Flusher thread
+
+    def _start(self):
+        # started on first use so the flask reloader's parent process doesn't run one it never uses
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        batches = {}  # collection -> documents taken off the queue
+        oldest = None  # when the oldest of them was taken
+        while True:
+            timeout = None if oldest is None else max(0.0, oldest + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP or isinstance(item, _Barrier):
+                self._flush_all(batches)
+                oldest = None
+                if item is _STOP:
+                    return
+                item.done.set()
+                continue
+            if item is not None:
+                collection, doc = item
+                batch = batches.setdefault(collection, [])
+                batch.append(doc)
+                if oldest is None:
+                    oldest = time.monotonic()
+                if len(batch) >= self.batch_size:
+                    self._write(collection, batches.pop(collection))
+                    if not batches:
+                        oldest = None
+            if oldest is not None and time.monotonic() - oldest >= self.flush_seconds:
+                self._flush_all(batches)
+                oldest = None
+
+    def _flush_all(self, batches):
+        for collection in list(batches):
+            self._write(collection, batches.pop(collection))
+
+    def _write(self, collection, docs):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                self.db[collection].insert_many(docs, ordered=False)
+                written, failed = len(docs), 0
+                break
+            except BulkWriteError as e:
+                # documents whose _id is already there came from an earlier attempt that did get through
+                errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+                written, failed = len(docs) - len(errors), len(errors)
+                if errors:
+                    print(f"Write-behind: {len(errors)} {collection} document(s) rejected: {errors[0].get('errmsg')}")
+                break
+            except (AutoReconnect, NetworkTimeout) as e:
+                if attempt >= self.retries:
+                    print(f"Write-behind: gave up on {len(docs)} {collection} document(s): {e}")
+                    written, failed = 0, len(docs)
+                    break
+                attempt += 1
+                time.sleep(min(2.0, 0.1 * 2 ** attempt))
+            except Exception as e:
+                print(f"Write-behind: failed to write {len(docs)} {collection} document(s): {e}")
+                written, failed = 0, len(docs)
+                break
+
+        with self._lock:
+            self._pending[collection] -= len(docs)
+            self.counters["written"] += written
+            self.counters["failed"] += failed
+            self.counters["batches"] += 1
+        metrics.WRITE_BEHIND_FLUSH.observe(time.perf_counter() - start, collection)
+        metrics.WRITE_BEHIND_BATCH.observe(len(docs), collection)
+        if failed:
+            metrics.WRITE_BEHIND_DOCS.inc(collection, "failed", amount=failed)
+        metrics.WRITE_BEHIND_DEPTH.set(self._queue.qsize())
+
+    # Flask
+
+    def init_app(self, app, reads):
+        """reads maps endpoint names to the collections they read - those are flushed before the view runs"""
+        def read_barrier():
+            collections = reads.get(request.endpoint)
+            if collections:
+                self.barrier(*collections)
+        app.before_request(read_barrier)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            pending = {collection: count for collection, count in self._pending.items() if count}
+        return {**counters, "enabled": self.enabled, "pending": pending, "queue_depth": self._queue.qsize(),
+                "batch_size": self.batch_size, "flush_ms": self.flush_seconds * 1000}
@@ -39,73 +39,43 @@ const Analytics = () => {
         );
         setUserData(user);
 
-        // 2) Fetch workout logs
-        const { data: logsData } = await axios.get(
-          `http://127.0.0.1:5000/api/workout-logs/${userId}`
-        ); // :contentReference[oaicite:0]{index=0}&#8203;:contentReference[oaicite:1]{index=1}
-        const logs = logsData.workout_logs || [];
+        // 2) Fetch analytics summarised on the server
+        const { data: analytics } = await axios.get(
+          `http://127.0.0.1:5000/api/analytics/${userId}`
+        );
+
+        const shortDate = (value) =>
+          new Date(value).toLocaleDateString(undefined, { month: 'short', day: 'numeric' });
 
         // 3) Cumulative Workouts over time
-        let total = 0;
-        const cumulative = logs
-          .sort((a, b) => new Date(a.date) - new Date(b.date))
-          .map(l => {
-            total += 1;
-            const d = new Date(l.date);
-            return {
-              date: d.toLocaleDateString(undefined, { month: 'short', day: 'numeric' }),
-              total
-            };
-          });
-        setCumulativeWorkouts(cumulative);
+        setCumulativeWorkouts(
+          analytics.activity.map(p => ({ date: shortDate(p.period), total: p.total }))
+        );
 
         // 4) Exercises per Session
-        const exercisesPerSession = logs.map(l => {
-          const d = new Date(l.date);
-          return {
-            date: d.toLocaleDateString(undefined, { month: 'short', day: 'numeric' }),
-            count: (l.exercises && l.exercises.length) || 0
-          };
-        });
-        setExerciseHistory(exercisesPerSession);
+        setExerciseHistory(
+          analytics.activity.map(p => ({ date: shortDate(p.period), count: p.exercises }))
+        );
 
         // 5) Weekly Activity (last 7 days, binary)
-        const today = new Date();
-        const sevenDaysAgo = new Date();
-        sevenDaysAgo.setDate(today.getDate() - 7);
-        const activity = logs
-          .filter(l => new Date(l.date) >= sevenDaysAgo)
-          .map(l => {
-            const d = new Date(l.date);
-            const dayLabel = d.toLocaleDateString(undefined, {
+        setWorkoutActivity(
+          analytics.recent.map(r => ({
+            day: new Date(r.date).toLocaleDateString(undefined, {
               weekday: 'short',
               day: 'numeric',
               month: 'short'
-            });
-            return {
-              day: dayLabel,
-              workouts: 1,
-              plan: l.plan_used || 'Workout'
-            };
-          });
-        setWorkoutActivity(activity);
+            }),
+            workouts: 1,
+            plan: r.plan
+          }))
+        );
 
         // 6) Compute avg duration and workouts this week
-        const totalDur = logs.reduce((sum, l) => sum + Number(l.duration || 0), 0);
-        setAvgDuration(logs.length ? Math.round(totalDur / logs.length) : 0);
-        setWorkoutsThisWeek(activity.length);
+        setAvgDuration(analytics.summary.avg_duration);
+        setWorkoutsThisWeek(analytics.summary.workouts_this_week);
 
         // 7) Workout Focus by mood distribution
-        const moodCounts = logs.reduce((acc, log) => {
-          const m = log.mood || 'Unknown';
-          acc[m] = (acc[m] || 0) + 1;
-          return acc;
-        }, {});
-        const dynamicFocus = Object.entries(moodCounts).map(([name, value]) => ({
-          name,
-          value
-        }));
-        setWorkoutFocus(dynamicFocus);
+        setWorkoutFocus(analytics.moods);
 
         setLoading(false);
       } catch (err) {
@@ -34,7 +34,7 @@ const Dashboard = () => {
     const navigate = useNavigate();
 
     useEffect(() => {
-        const fetchUserData = async () => {
+        const fetchDashboard = async () => { // profile, goal workouts, latest AI workouts and a tip in one request
             try {
                 const userId = localStorage.getItem('user_id');
                 if (!userId) {
@@ -42,48 +42,21 @@ const Dashboard = () => {
                     return;
                 }
 
-                const response = await axios.get(`http://127.0.0.1:5000/api/users/${userId}`);
-                setUserData(response.data);
+                const response = await axios.get(`http://127.0.0.1:5000/api/dashboard/${userId}`);
+                const data = response.data;
+                setUserData(data.user);
+                setWorkouts(data.workouts || []);
+                setTip(data.tip);
+                // the dashboard only renders the latest AI workout in full, the rest come back as summaries
+                setAIGeneratedWorkouts(data.latest_ai_workout ? [data.latest_ai_workout] : []);
                 setError('');
-
-                if (response.data.goals) {
-                    console.log("Fetching workouts for goal:", response.data.goals);
-                    const workoutResponse = await axios.get(
-                        `http://127.0.0.1:5000/api/workouts/${encodeURIComponent(response.data.goals)}`
-                    );
-                    console.log("Fetched workouts:", workoutResponse.data.workouts);
-                    setWorkouts(workoutResponse.data.workouts || []);
-                }
             } catch (err) {
                 console.error(err);
                 setError('Failed to fetch user data or workouts.');
             }
         };
 
-        const fetchTip = async () => { //fetch motivational tip
-            try {
-                const response = await axios.get('http://127.0.0.1:5000/api/tip');
-                setTip(response.data.tip);
-            } catch (err) {
-                console.error('Failed to fetch the motivational tip.');
-            }
-        };
-        
-
-        const fetchAIGeneratedWorkouts = async () => { //fetch AI-generated workouts
-            const userId = localStorage.getItem('user_id');
-            try {
-                const response = await axios.get(`http://127.0.0.1:5000/api/workout-history/${userId}`);
-                console.log("Fetched AI-generated workouts:", response.data.workout_logs);
-                setAIGeneratedWorkouts(response.data.workout_logs || []);
-            } catch (err) {
-                console.error('Failed to fetch AI-generated workouts.');
-            }
-        };
-
-        fetchUserData();
-        fetchTip();
-        fetchAIGeneratedWorkouts();
+        fetchDashboard();
     }, []);
 
     const formatDate = (dateString) => {
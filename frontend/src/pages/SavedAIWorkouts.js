@@ -35,7 +35,7 @@ const SavedWorkouts = () => {
                 ) : (
                     workoutHistory.map((workout, index) => (
                         <div key={index} className="bg-white rounded-lg p-4 mb-4 shadow-md">
-                            <h2 className="font-semibold">Date: {workout.date}</h2>
+                            <h2 className="font-semibold">Date: {new Date(workout.date).toLocaleString()}</h2>
                             <p className="mt-2">{workout.workout_details}</p>
                         </div>
                     ))